@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of analysis results.
+
+Entries are keyed by a hash of the cleaned C source together with every
+setting that influences the analysis (compiler flags, CodeQL query suite,
+KLEE options), so an identical program analyzed with identical settings can
+skip CodeQL and KLEE entirely. Each entry is one small JSON file; the cache
+is size-bounded and evicts the least recently used entries first.
+"""
+
+import getpass
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+CACHE_ROOT = f"/scratch/{getpass.getuser()}/workflow/analysis_cache"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Bump when the cached fields or their meaning change
+CACHE_VERSION = 2
+
+
+def cache_key(clean_source, settings):
+    """Hash of the cleaned source plus the analysis settings it was analyzed with."""
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}\n".encode())
+    h.update(json.dumps(settings, sort_keys=True).encode())
+    h.update(b"\0")
+    h.update(clean_source.encode())
+    return h.hexdigest()
+
+
+class AnalysisCache:
+    """On-disk LRU cache mapping cache_key() -> analysis summary.
+
+    Recency is the file's mtime, refreshed on every hit, so it survives
+    restarts and is shared by every process pointing at the same directory.
+    """
+
+    def __init__(self, root=CACHE_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._size = sum(size for _, _, size in self._entries())
+
+    def _path(self, key):
+        # Two-level fan-out keeps directories small on /scratch
+        return os.path.join(self.root, key[:2], key + ".json")
+
+    def _entries(self):
+        for sub in os.listdir(self.root):
+            subdir = os.path.join(self.root, sub)
+            if not os.path.isdir(subdir):
+                continue
+            for name in os.listdir(subdir):
+                if name.endswith(".json"):
+                    path = os.path.join(subdir, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    yield path, st.st_mtime, st.st_size
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(entry, sort_keys=True)
+        # Write to a temp file and rename so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        with self._lock:
+            self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is below 90% of its cap."""
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self._size = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in entries:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self._size -= size
+
+    def size(self):
+        return self._size
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"💾 Analysis cache: {self.hits} hits, {self.misses} misses ({rate:.1%} hit rate), {self._size / 1e6:.1f} MB"
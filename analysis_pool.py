@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+"""
+Parallel analysis of generated completions.
+
+Every completion is analyzed in its own workspace (generated code, Makefile,
+CodeQL database, SARIF, feedback and KLEE output), so analyze_only.sh can run
+for several prompts at once without the items overwriting each other's files.
+Before any of that, a `clang -fsyntax-only` gate short-circuits programs that
+do not parse; their results record the diagnostics and the skipped stages.
+"""
+
+import getpass
+import os
+import re
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from analysis_cache import cache_key
+from artifact_pack import workspace_artifacts
+from clean_code import clean_source
+from run_codeql import DUMMY_FEEDBACK, analyze_batch, analyze_single, item_makefile, write_feedback
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ANALYSIS_SCRIPT = os.path.join(SCRIPT_DIR, "analyze_only.sh")
+WORKSPACE_ROOT = f"/scratch/{getpass.getuser()}/workflow/workspaces"
+ANALYSIS_TIMEOUT = 300
+# The LLVM install analyze_only.sh takes clang from
+LLVM_BIN = f"/scratch/{getpass.getuser()}/llvm-14/bin"
+SYNTAX_CHECK_TIMEOUT = 30
+# Diagnostics kept per item that fails the syntax check
+MAX_DIAGNOSTICS = 20
+
+# Settings exported to analyze_only.sh. They decide what the analysis reports,
+# so they are also hashed into the analysis cache key.
+ANALYSIS_SETTINGS = {
+    "ANALYSIS_CFLAGS": "-g",
+    "SYNTAX_FLAGS": "-fsyntax-only",
+    "CODEQL_SUITE": "codeql/cpp-queries:codeql-suites/cpp-security-and-quality.qls",
+    "KLEE_TIMEOUT": "120",
+    "KLEE_FLAGS": "--write-test-info --write-kqueries --search=nurs:covnew --use-merge --max-memory=1024 --max-forks=10",
+}
+
+# run_codeql.py writes this message instead of rule IDs when the analysis fails
+DUMMY_FEEDBACK_MARKERS = ("CodeQL analysis completed", "No query pack errors found")
+# Skip reason of items whose batched CodeQL run failed; such results are never reused
+CODEQL_BATCH_FAILED = "batched analysis failed"
+# Skip reason of every later stage of an item that fails the syntax check
+SYNTAX_CHECK_FAILED = "syntax check failed"
+
+
+def default_workers():
+    """Default pool size: one analysis worker per core."""
+    return os.cpu_count() or 1
+
+
+class Workspace:
+    """Directory layout for analyzing a single completion."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.code_dir = os.path.join(self.path, "generated_code")
+        self.klee_output = os.path.join(self.path, "klee_output")
+        self.feedback_dir = os.path.join(self.path, "feedback")
+        self.codeql_db = os.path.join(self.path, "codeql_db")
+        self.sarif = os.path.join(self.path, "results.sarif")
+        self.log = os.path.join(self.path, "analysis.log")
+
+    @property
+    def generated_file(self):
+        return os.path.join(self.code_dir, "generated_code.c")
+
+    @property
+    def clean_file(self):
+        return os.path.join(self.code_dir, "clean_code.c")
+
+    @property
+    def bitcode_file(self):
+        return os.path.join(self.code_dir, "clean_code.bc")
+
+    @property
+    def build_log(self):
+        """Diagnostics of the one compile that produces the object and the bitcode."""
+        return os.path.join(self.code_dir, "build.log")
+
+    @property
+    def feedback_file(self):
+        return os.path.join(self.feedback_dir, "codeql_feedback.txt")
+
+    def create(self):
+        """Start from an empty workspace so no artifact leaks in from an earlier item."""
+        self.remove()
+        os.makedirs(self.code_dir)
+        os.makedirs(self.feedback_dir)
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def env(self, settings=ANALYSIS_SETTINGS, **flags):
+        """Environment that points analyze_only.sh and run_codeql.py at this workspace."""
+        env = dict(os.environ)
+        env.update(settings)
+        env.update(flags)
+        env.update({
+            "WORK_DIR": self.code_dir,
+            "KLEE_OUTPUT": self.klee_output,
+            "FEEDBACK_DIR": self.feedback_dir,
+            "CODEQL_DB": self.codeql_db,
+            "CODEQL_RESULTS": self.sarif,
+            "CODEQL_FEEDBACK": self.feedback_file,
+        })
+        return env
+
+
+def workspace_name(model_name, prompt_index):
+    """Filesystem-safe workspace directory name for one (model, prompt) item."""
+    return f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)}_{prompt_index}"
+
+
+def run_script(cmd, workspace, timeout, env=None):
+    """Run an analysis command inside the workspace; returns the exit code or None on timeout.
+
+    The command runs in its own process group so a timeout also kills the
+    CodeQL and KLEE processes it started, not just the bash wrapper.
+    """
+    with open(workspace.log, "a") as log:
+        proc = subprocess.Popen(cmd, cwd=SCRIPT_DIR, env=env or workspace.env(), stdout=log,
+                                stderr=subprocess.STDOUT, start_new_session=True)
+        try:
+            return proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+            return None
+
+
+def collect_results(workspace, returncode=0):
+    """Derive the results.csv columns from a finished workspace and the analysis script's exit code."""
+    # compile_ok = True iff clean_code.bc was successfully generated and the script succeeded
+    compile_ok = os.path.exists(workspace.bitcode_file) and returncode == 0
+
+    # KLEE .err files indicate semantic (runtime memory safety) errors
+    klee_errors = []
+    if os.path.isdir(workspace.klee_output):
+        klee_errors = sorted(f for f in os.listdir(workspace.klee_output) if f.endswith(".err"))
+    klee_summary = [{"file": name, "error": first_line(os.path.join(workspace.klee_output, name))}
+                    for name in klee_errors]
+
+    # CodeQL rule IDs indicate security errors; ignore the dummy failure message
+    feedback = ""
+    if os.path.exists(workspace.feedback_file):
+        with open(workspace.feedback_file) as f:
+            feedback = f.read().strip()
+    if any(marker in feedback for marker in DUMMY_FEEDBACK_MARKERS):
+        feedback = ""
+
+    # The build's error lines explain a compile failure the syntax check did not catch
+    diagnostics = []
+    if not compile_ok and os.path.exists(workspace.build_log):
+        with open(workspace.build_log, errors="replace") as f:
+            diagnostics = [line.rstrip("\n") for line in f if "error:" in line][:MAX_DIAGNOSTICS]
+
+    return {
+        "compile_ok": compile_ok,
+        "semantic_err": bool(klee_errors),
+        "security_err": bool(feedback),
+        "klee_errors": klee_errors,
+        "klee_summary": klee_summary,
+        "findings": feedback.splitlines(),
+        "feedback": feedback,
+        "diagnostics": diagnostics,
+    }
+
+
+def first_line(path):
+    """First line of a KLEE .err file, e.g. "Error: memory error: out of bound pointer"."""
+    try:
+        with open(path, errors="replace") as f:
+            return f.readline().strip()
+    except OSError:
+        return ""
+
+
+def find_clang():
+    """clang from the LLVM install analyze_only.sh uses, else from PATH; None without one."""
+    return shutil.which("clang", path=os.pathsep.join([LLVM_BIN, os.environ.get("PATH", "")]))
+
+
+def syntax_check(source_file, flags, clang, timeout=SYNTAX_CHECK_TIMEOUT):
+    """Tier-0 gate: parse source_file with `clang -fsyntax-only`, no codegen, no linking.
+
+    Returns (ok, diagnostics). ok is None when the check could not run (no
+    clang, or it timed out), so the caller falls back to the full analysis;
+    diagnostics are the error lines with the file name stripped.
+    """
+    if clang is None:
+        return None, []
+    try:
+        proc = subprocess.run([clang] + flags + [source_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return None, []
+    prefix = source_file + ":"
+    diagnostics = [line[len(prefix):] if line.startswith(prefix) else line
+                   for line in proc.stderr.splitlines() if "error:" in line]
+    return proc.returncode == 0, diagnostics[:MAX_DIAGNOSTICS]
+
+
+def results_from_cache(entry):
+    """Rebuild the collect_results() dict from a cached summary."""
+    findings = entry["findings"]
+    klee_summary = entry["klee_summary"]
+    return {
+        "compile_ok": entry["compile_ok"],
+        "semantic_err": bool(klee_summary),
+        "security_err": bool(findings),
+        "klee_errors": [e["file"] for e in klee_summary],
+        "klee_summary": klee_summary,
+        "findings": findings,
+        "feedback": "\n".join(findings),
+        "timeout": False,
+        "cached": True,
+        "skipped": entry.get("skipped", {}),
+        "diagnostics": entry.get("diagnostics", []),
+    }
+
+
+def syntax_failure(diagnostics):
+    """Results of an item whose cleaned source fails the syntax check: nothing else ran."""
+    reason = SYNTAX_CHECK_FAILED
+    return {
+        "compile_ok": False,
+        "semantic_err": False,
+        "security_err": False,
+        "klee_errors": [],
+        "klee_summary": [],
+        "findings": [],
+        "feedback": "",
+        "timeout": False,
+        "cached": False,
+        "skipped": {"codeql": reason, "bitcode": reason, "klee": reason},
+        "diagnostics": diagnostics,
+    }
+
+
+def cache_entry(results):
+    """The part of an item's results stored in the analysis cache."""
+    return {
+        "compile_ok": results["compile_ok"],
+        "findings": results["findings"],
+        "klee_summary": results["klee_summary"],
+        "skipped": results.get("skipped", {}),
+        "diagnostics": results.get("diagnostics", []),
+    }
+
+
+class ItemAnalyzer:
+    """Analyzes one completion at a time in a fresh per-item workspace.
+
+    Holds everything that is the same for every item of a run (workspace root,
+    analysis script and settings, timeout and the optional result cache), so
+    AnalysisPool and Pipeline only have to decide when items run.
+    """
+
+    def __init__(self, root=WORKSPACE_ROOT, keep_workspaces=False, script=ANALYSIS_SCRIPT,
+                 timeout=ANALYSIS_TIMEOUT, settings=ANALYSIS_SETTINGS, cache=None, skip_codeql=False,
+                 codeql_backend=None, klee_scheduler=None, cleaner=clean_source, pack=None, syntax_gate=True,
+                 clang=None, pch=None):
+        self.root = root
+        self.keep_workspaces = keep_workspaces
+        self.script = script
+        self.timeout = timeout
+        self.settings = settings
+        self.cache = cache
+        # Cleaning runs in-process; the script gets SKIP_CLEAN=1
+        self.cleaner = cleaner
+        # With skip_codeql the results carry the cleaned source for CodeQLBatcher
+        self.skip_codeql = skip_codeql
+        # With a backend (e.g. the long-lived CodeQL server) CodeQL runs from
+        # this process instead of a fresh run_codeql.py per item
+        self.codeql_backend = codeql_backend
+        # With a KleeScheduler, KLEE runs from here under the batch-wide budget
+        self.klee_scheduler = klee_scheduler
+        # With an ArtifactPack, each item's artifacts are packed before its workspace goes
+        self.pack = pack
+        # Code that fails `clang -fsyntax-only` skips the Makefile, CodeQL, bitcode and KLEE. By
+        # default only with the LLVM install's clang: another clang may reject what it accepts
+        self.clang = (clang or shutil.which("clang", path=LLVM_BIN)) if syntax_gate else None
+        # With build_stage.PrecompiledHeaders, the build and the syntax check
+        # -include a precompiled copy of the program's leading standard includes
+        self.pch = pch
+
+    def workspace(self, key):
+        model_name, prompt_index = key
+        return Workspace(os.path.join(self.root, workspace_name(model_name, prompt_index)))
+
+    def analysis_key(self, code):
+        """Key of code's analysis inputs: its cleaned source and the analysis settings."""
+        return cache_key(self.cleaner(code), self.cache_settings())
+
+    def cache_settings(self):
+        if self.klee_scheduler is None:
+            return self.settings
+        return dict(self.settings, KLEE_SCHEDULER=self.klee_scheduler.settings())
+
+    def __call__(self, key, code):
+        """Analyze the completion for key = (model_name, prompt_index) and return its results."""
+        workspace = self.workspace(key)
+        start = time.perf_counter()
+        try:
+            results = self.run(code, workspace)
+            results.setdefault("timings", {})["analysis"] = time.perf_counter() - start
+            if self.pack is not None and "clean_source" in results:
+                # CodeQLBatcher adds the SARIF and feedback, then packs them (the workspace is gone by then)
+                results["artifacts"] = workspace_artifacts(workspace)
+            elif self.pack is not None:
+                self.pack.add(*key, workspace_artifacts(workspace))
+            return results
+        finally:
+            if not self.keep_workspaces:
+                workspace.remove()
+
+    def run(self, code, workspace):
+        """Write one completion into a fresh workspace, analyze it and return its results."""
+        workspace.create()
+        clean = self.cleaner(code)
+        with open(workspace.generated_file, "w") as f:
+            f.write(code)
+        with open(workspace.clean_file, "w") as f:
+            f.write(clean)
+
+        # Everything the results depend on; recorded so reanalyze.py can skip unchanged items
+        analysis_key = cache_key(clean, self.cache_settings())
+        key = None
+        if self.cache is not None:
+            # The cache is keyed on the cleaned source
+            key = analysis_key
+            entry = self.cache.get(key)
+            if entry is not None:
+                return dict(results_from_cache(entry), analysis_key=analysis_key)
+
+        flags = {"SKIP_CLEAN": "1"}
+        timings = {}
+        start = time.perf_counter()
+        syntax_flags = self.settings.get("SYNTAX_FLAGS", ANALYSIS_SETTINGS["SYNTAX_FLAGS"]).split()
+        header = self.pch.for_source(clean) if self.pch is not None else None
+        if header is not None:
+            # A PCH only loads into the compiler that built it
+            flags["ANALYSIS_CC"] = self.pch.cc
+            flags["ANALYSIS_PCH"] = header
+            if self.pch.cc == self.clang:
+                syntax_flags += ["-include", header]
+        ok, diagnostics = syntax_check(workspace.clean_file, syntax_flags, self.clang)
+        if ok is not None:
+            # Checked here, so the script does not parse the source again
+            flags["SKIP_SYNTAX_CHECK"] = "1"
+            timings["syntax_check"] = time.perf_counter() - start
+        if ok is False:
+            results = syntax_failure(diagnostics)
+            results["analysis_key"] = analysis_key
+            results["timings"] = timings
+            if key is not None:
+                self.cache.put(key, cache_entry(results))
+            return results
+        if self.skip_codeql or self.codeql_backend is not None:
+            flags["SKIP_CODEQL"] = "1"
+        if self.klee_scheduler is not None:
+            flags["SKIP_KLEE"] = "1"
+        if not self.skip_codeql and self.codeql_backend is not None:
+            # CodeQL first: its traced build is the item's only compile, and the
+            # script then finds the object and bitcode already built
+            self.run_codeql(workspace, header)
+        returncode = run_script(["bash", self.script], workspace, self.timeout,
+                                workspace.env(self.settings, **flags))
+        klee_run = None
+        if returncode is not None and self.klee_scheduler is not None and os.path.exists(workspace.bitcode_file):
+            klee_run = self.run_klee(workspace)
+        results = collect_results(workspace, returncode)
+        results["timeout"] = returncode is None
+        results["cached"] = False
+        results["analysis_key"] = analysis_key
+        results["skipped"] = {}
+        results["diagnostics"] = diagnostics or results["diagnostics"]
+        results["timings"] = timings
+        if returncode is not None and not os.path.exists(workspace.bitcode_file):
+            results["skipped"]["klee"] = "no bitcode"
+        if klee_run is not None:
+            results["klee_stop"] = klee_run["stop"]
+            results["klee_seconds"] = klee_run["seconds"]
+            if klee_run.get("strategy"):
+                # Portfolio run: the search strategy whose output was kept
+                results["klee_strategy"] = klee_run["strategy"]
+            timings["klee"] = klee_run["seconds"]
+            if klee_run["stop"] == "budget":
+                # Cut short by the batch budget, not by the program: don't cache it
+                key = None
+        if returncode is None:
+            # Mirror the old drivers: a timed-out item counts as not compiling
+            results["compile_ok"] = False
+        elif self.skip_codeql:
+            # Not complete yet: CodeQLBatcher adds the findings and fills the cache
+            results["cache_key"] = key
+            results["clean_source"] = clean
+        elif key is not None:
+            self.cache.put(key, cache_entry(results))
+        return results
+
+    def run_codeql(self, workspace, header=None):
+        """CodeQL stage through self.codeql_backend, tracing the item's build (run_codeql.ITEM_MAKEFILE)."""
+        with open(os.path.join(workspace.code_dir, "Makefile"), "w") as f:
+            # The server's environment may not have the LLVM install on PATH
+            if header is not None:
+                f.write(item_makefile(self.pch.cc, header))
+            else:
+                f.write(item_makefile(self.clang or find_clang()))
+        # A fresh workspace has nothing to `make clean`
+        findings = analyze_single(workspace.code_dir, workspace.codeql_db, workspace.sarif,
+                                  self.settings["CODEQL_SUITE"], self.codeql_backend, clean=False)
+        write_feedback(workspace.feedback_file, findings)
+
+    def run_klee(self, workspace):
+        """KLEE stage through self.klee_scheduler, on the bitcode analyze_only.sh produced."""
+        with open(workspace.log, "a") as log:
+            return self.klee_scheduler.run(workspace.bitcode_file, workspace.klee_output,
+                                           int(self.settings["KLEE_TIMEOUT"]), self.settings["KLEE_FLAGS"].split(),
+                                           log=log)
+
+
+class AnalysisPool:
+    """Runs analyze_only.sh for many completions concurrently.
+
+    Items are identified by a caller-chosen key, typically (model_name, prompt_index).
+    Use completed() to pick up finished items without blocking and drain() to
+    wait for everything that is still running.
+    """
+
+    def __init__(self, workers=None, analyzer=None):
+        self.workers = workers or default_workers()
+        self.analyzer = analyzer or ItemAnalyzer()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, key, code):
+        future = self._executor.submit(self.analyzer, key, code)
+        self._pending[future] = key
+        return future
+
+    def pending(self):
+        return len(self._pending)
+
+    def _finished(self, futures):
+        for future in futures:
+            key = self._pending.pop(future)
+            try:
+                results = future.result()
+            except Exception as e:
+                # No row is written, so a resumed run retries the item
+                print(f"✗ Analysis failed for {key}: {e}")
+                continue
+            yield key, results
+
+    def completed(self):
+        """Yield (key, results) for items that have already finished."""
+        done = [f for f in self._pending if f.done()]
+        yield from self._finished(done)
+
+    def wait_any(self):
+        """Block until at least one item finishes, then yield every finished item."""
+        if self._pending:
+            done, _ = wait(list(self._pending), return_when=FIRST_COMPLETED)
+            yield from self._finished(done)
+
+    def drain(self):
+        """Yield (key, results) for every outstanding item as it finishes."""
+        while self._pending:
+            yield from self.wait_any()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class CodeQLBatcher:
+    """Wraps an AnalysisPool or Pipeline whose analyzer runs with skip_codeql and
+    adds CodeQL findings by analyzing batch_size programs per database.
+
+    Exposes the same submit()/completed()/drain() interface as the wrapped
+    pool. Batches run on a background thread so generation and the other
+    analysis stages keep going while CodeQL works. With the analyzer's
+    ArtifactPack as pack, each item is packed once its CodeQL results are in.
+    """
+
+    def __init__(self, pool, batch_size, root, suite=ANALYSIS_SETTINGS["CODEQL_SUITE"], cache=None,
+                 backend=None, pack=None):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.root = root
+        self.suite = suite
+        self.cache = cache
+        self.backend = backend
+        self.pack = pack
+        self._buffer = []
+        self._ready = []
+        self._batches = []
+        self._count = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __getattr__(self, name):
+        # generation / report() etc. come from the wrapped Pipeline
+        return getattr(self.pool, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, key, code):
+        self.pool.submit(key, code)
+
+    def pending(self):
+        return self.pool.pending() + len(self._buffer) + len(self._ready) + \
+            sum(len(items) for _, items in self._batches)
+
+    def _add(self, key, results):
+        if results.get("cached") or results.get("timeout") or "codeql" in results.get("skipped", {}):
+            self._ready.append((key, results))
+            return
+        self._buffer.append((key, results))
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            items, self._buffer = self._buffer, []
+            self._batches.append((self._executor.submit(self._run, items, self._count), items))
+            self._count += 1
+
+    def _run(self, items, batch_number):
+        programs = {f"item_{i}": results["clean_source"]
+                    for i, (_, results) in enumerate(items) if results.get("clean_source") is not None}
+        start = time.perf_counter()
+        # Shards and other runs may share the root, so each batch gets a directory of its own
+        os.makedirs(self.root, exist_ok=True)
+        directory = tempfile.mkdtemp(prefix=f"batch_{batch_number}_", dir=self.root)
+        try:
+            findings = analyze_batch(programs, directory, self.suite, backend=self.backend)
+        except Exception as e:
+            print(f"✗ Batched CodeQL analysis failed: {e}")
+            findings = {}
+        elapsed = time.perf_counter() - start
+        for i, (key, results) in enumerate(items):
+            # The batch's time is shared evenly by the programs in it
+            results.setdefault("timings", {})["codeql_batch"] = elapsed / len(items)
+            rule_ids = findings.get(f"item_{i}")
+            cache_key = results.pop("cache_key", None)
+            results.pop("clean_source", None)
+            self._pack(key, results.pop("artifacts", None), os.path.join(directory, "src", f"item_{i}"), rule_ids)
+            if rule_ids is None:
+                # No findings for this program: the per-item dummy feedback
+                results["findings"] = []
+                results["feedback"] = DUMMY_FEEDBACK
+                results["security_err"] = False
+                if results["compile_ok"]:
+                    # It builds, so CodeQL failed: not cached, so a later run analyzes it again
+                    results.setdefault("skipped", {})["codeql"] = CODEQL_BATCH_FAILED
+                    continue
+            else:
+                results["findings"] = rule_ids
+                results["feedback"] = "\n".join(rule_ids)
+                results["security_err"] = bool(rule_ids)
+            if self.cache is not None and cache_key is not None:
+                self.cache.put(cache_key, cache_entry(results))
+        shutil.rmtree(directory, ignore_errors=True)
+        return items
+
+    def _pack(self, key, artifacts, program_dir, rule_ids):
+        """Pack an item with its share of the batch's SARIF and the feedback a per-item run writes."""
+        if self.pack is None or artifacts is None:
+            return
+        sarif = os.path.join(program_dir, "results.sarif")
+        if os.path.exists(sarif):
+            with open(sarif, "rb") as f:
+                artifacts["results.sarif"] = f.read()
+        artifacts["feedback.txt"] = DUMMY_FEEDBACK if rule_ids is None else "\n".join(rule_ids)
+        self.pack.add(*key, artifacts)
+
+    def _finished_batches(self, block):
+        while self._batches and (block or self._batches[0][0].done()):
+            future, _ = self._batches.pop(0)
+            yield from future.result()
+
+    def completed(self):
+        for key, results in self.pool.completed():
+            self._add(key, results)
+        ready, self._ready = self._ready, []
+        yield from ready
+        yield from self._finished_batches(block=False)
+
+    def drain(self):
+        for key, results in self.pool.drain():
+            self._add(key, results)
+        self._flush()
+        ready, self._ready = self._ready, []
+        yield from ready
+        yield from self._finished_batches(block=True)
+
+    def close(self):
+        self.pool.close()
+        self._executor.shutdown(wait=True)
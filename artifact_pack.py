@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Append-only, compressed pack of per-item analysis artifacts.
+
+Workspaces are deleted once an item's results are collected, so a run used
+to keep nothing but its result rows. ArtifactPack keeps the raw completion,
+cleaned source, bitcode, build diagnostics, SARIF and KLEE .err files of
+every item in one file per run, without one small file (and inode) per
+artifact on /scratch.
+
+Each item is one frame:
+
+    b"APK1" | header length (u32) | payload length (u64) | header JSON | payload
+
+The header names the item (model, prompt_index), the codec and the
+artifact names and sizes; the payload is the artifacts concatenated and
+compressed together (zstd when the zstandard module is installed, else
+gzip). A side file <pack>.idx holds one JSON line per frame with its
+offset, so get(model, prompt_index) seeks straight to the item; frames
+written after the last index line (an interrupted run) are found by
+scanning the frame headers, and a missing index is rebuilt the same way.
+Iterating a pack streams the frames in the order they were written.
+
+    python artifact_pack.py results.run3.pack                # list items
+    python artifact_pack.py results.run3.pack --extract 42   # write prompt 42's artifacts to ./artifacts_42
+"""
+
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"APK1"
+FRAME = struct.Struct(">4sIQ")
+
+
+class PackError(RuntimeError):
+    pass
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return zlib.compress(data, 6)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise PackError("this pack holds zstd frames: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def default_codec():
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def workspace_artifacts(workspace):
+    """{artifact name: bytes} of a finished analysis workspace (analysis_pool.Workspace)."""
+    paths = {
+        "generated_code.c": workspace.generated_file,
+        "clean_code.c": workspace.clean_file,
+        "clean_code.bc": workspace.bitcode_file,
+        "build.log": workspace.build_log,
+        "results.sarif": workspace.sarif,
+        "feedback.txt": workspace.feedback_file,
+    }
+    if os.path.isdir(workspace.klee_output):
+        for name in sorted(os.listdir(workspace.klee_output)):
+            if name.endswith(".err"):
+                paths["klee/" + name] = os.path.join(workspace.klee_output, name)
+    artifacts = {}
+    for name, path in paths.items():
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                artifacts[name] = f.read()
+    return artifacts
+
+
+class ArtifactPack:
+    """One pack file: add() appends an item (thread-safe), get() and iteration read them back."""
+
+    def __init__(self, path, codec=None):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.codec = codec or default_codec()
+        self._lock = threading.Lock()
+        self._offsets = {}  # (model, prompt_index) -> offset of its latest frame
+        self._writer = None
+        self._index = None
+        self._load_index()
+
+    def _load_index(self):
+        end = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # a torn last line; the scan below recovers it
+                    self._offsets[(entry["model"], entry["prompt_index"])] = entry["offset"]
+                    end = max(end, entry["end"])
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if end > size:
+            # Index from another pack or a truncated file: rebuild from the frames
+            self._offsets, end = {}, 0
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+        if size > end:
+            with open(self.index_path, "a") as index:
+                for offset, end, header in list(self._scan(end)):
+                    self._offsets[(header["model"], header["prompt_index"])] = offset
+                    index.write(self._index_line(header, offset, end))
+        self._end = end  # end of the last complete frame
+
+    @staticmethod
+    def _index_line(header, offset, end):
+        return json.dumps({"model": header["model"], "prompt_index": header["prompt_index"],
+                           "offset": offset, "end": end}) + "\n"
+
+    def _scan(self, offset):
+        """(offset, end, header) of every complete frame from offset on."""
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while True:
+                fixed = f.read(FRAME.size)
+                if len(fixed) < FRAME.size:
+                    return
+                magic, header_length, payload_length = FRAME.unpack(fixed)
+                if magic != MAGIC:
+                    raise PackError(f"{self.path}: no frame at offset {offset}")
+                header = f.read(header_length)
+                end = offset + FRAME.size + header_length + payload_length
+                if len(header) < header_length or os.fstat(f.fileno()).st_size < end:
+                    return  # torn last frame of an interrupted run
+                yield offset, end, json.loads(header)
+                f.seek(end)
+                offset = end
+
+    def add(self, model, prompt_index, artifacts, meta=None):
+        """Append the artifacts ({name: bytes or str}) of one item."""
+        names, blobs = [], []
+        for name, data in artifacts.items():
+            data = data.encode() if isinstance(data, str) else data
+            names.append([name, len(data)])
+            blobs.append(data)
+        payload = compress(b"".join(blobs), self.codec)
+        header = {"model": model, "prompt_index": prompt_index, "codec": self.codec, "files": names,
+                  "time": time.time()}
+        if meta:
+            header["meta"] = meta
+        header_bytes = json.dumps(header).encode()
+        frame = FRAME.pack(MAGIC, len(header_bytes), len(payload)) + header_bytes + payload
+        with self._lock:
+            if self._writer is None:
+                self._writer = open(self.path, "ab")
+                self._index = open(self.index_path, "a")
+                # Drop a torn frame left by an interrupted run before appending after it
+                if self._writer.seek(0, os.SEEK_END) > self._end:
+                    self._writer.truncate(self._end)
+            offset = self._writer.seek(0, os.SEEK_END)
+            self._writer.write(frame)
+            self._writer.flush()
+            # The frame is complete on disk before the index points at it
+            self._index.write(self._index_line(header, offset, offset + len(frame)))
+            self._index.flush()
+            self._offsets[(model, prompt_index)] = offset
+
+    def _read(self, f, offset):
+        f.seek(offset)
+        magic, header_length, payload_length = FRAME.unpack(f.read(FRAME.size))
+        if magic != MAGIC:
+            raise PackError(f"{self.path}: no frame at offset {offset}")
+        header = json.loads(f.read(header_length))
+        data = decompress(f.read(payload_length), header["codec"])
+        artifacts, position = {}, 0
+        for name, size in header["files"]:
+            artifacts[name] = data[position:position + size]
+            position += size
+        return header, artifacts
+
+    def get(self, model, prompt_index):
+        """{name: bytes} of the latest frame for the item; KeyError if it has none."""
+        offset = self._offsets[(model, prompt_index)]
+        with open(self.path, "rb") as f:
+            return self._read(f, offset)[1]
+
+    def __contains__(self, key):
+        return key in self._offsets
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def keys(self):
+        return sorted(self._offsets)
+
+    def headers(self):
+        """Frame headers (item, codec, artifact names and sizes) in write order, without decompressing."""
+        if not os.path.exists(self.path):
+            return
+        for _, _, header in self._scan(0):
+            yield header
+
+    def __iter__(self):
+        """Yield (header, artifacts) for every frame in write order, one at a time."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for offset, _, _ in self._scan(0):
+                yield self._read(f, offset)
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._index.close()
+                self._writer = self._index = None
+
+    def stats(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return f"📦 Artifact pack: {len(self)} items in {self.path} ({size / 1e6:.1f} MB, {self.codec})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or extract the items of an artifact pack")
+    parser.add_argument("pack")
+    parser.add_argument("--model", default=None, help="model of the item to extract (default: the only one)")
+    parser.add_argument("--extract", type=int, default=None, metavar="PROMPT_INDEX")
+    parser.add_argument("--out", default=None, help="directory for --extract (default: artifacts_<index>)")
+    args = parser.parse_args()
+
+    pack = ArtifactPack(args.pack)
+    if args.extract is None:
+        for header in pack.headers():
+            names = ", ".join(f"{name} ({size} B)" for name, size in header["files"])
+            print(f"  {header['model']} #{header['prompt_index']}: {names}")
+        print(pack.stats())
+        return
+    models = sorted({model for model, index in pack.keys() if index == args.extract})
+    model = args.model or (models[0] if len(models) == 1 else None)
+    if (model, args.extract) not in pack:
+        raise SystemExit(f"✗ No single item #{args.extract} in {args.pack} (models: {', '.join(models) or 'none'})")
+    out = args.out or f"artifacts_{args.extract}"
+    for name, data in pack.get(model, args.extract).items():
+        path = os.path.join(out, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+    print(f"✓ Extracted {model} #{args.extract} to {out}/")
+
+
+if __name__ == "__main__":
+    main()
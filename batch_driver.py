@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+Shared generation loop for the batch drivers (run_in_batch.py, run_xlcost_batch.py, ...).
+
+Completions are generated batch by batch and handed to an AnalysisPool, so
+compile/CodeQL/KLEE for earlier prompts run in parallel with each other and
+with generation of the next batch. Rows go to the SQLite results store
+(results_store.py) as soon as an item's analysis finishes.
+"""
+
+import argparse
+import os
+import time
+from contextlib import nullcontext
+from functools import partial
+
+import model_cache
+
+# Before transformers is imported: huggingface_hub reads the cache variables at import
+model_cache.configure_environment()
+
+import torch
+from transformers import AutoTokenizer, AutoModelForCausalLM
+
+from analysis_cache import AnalysisCache, CACHE_ROOT, DEFAULT_MAX_BYTES
+from analysis_pool import (AnalysisPool, CodeQLBatcher, ItemAnalyzer, ANALYSIS_SETTINGS, ANALYSIS_TIMEOUT,
+                           SYNTAX_CHECK_FAILED, WORKSPACE_ROOT, default_workers)
+from artifact_pack import ArtifactPack
+from build_stage import PrecompiledHeaders
+from batching import AdaptiveBatcher, bucketed_batches, fixed_batches, padding_ratio
+from continuous_batching import ContinuousBatcher
+from cpu_inference import CPU_MODES
+from dataset import parse_shard, shard_range
+from generation_backends import BACKENDS, DEFAULT_BACKEND, HFBackend, backend_settings, load_backend
+from generation_cache import (DEFAULT_MAX_BYTES as GENERATION_CACHE_MAX_BYTES, GENERATION_CACHE_ROOT, GenerationCache,
+                              MemoizedGenerate)
+from generation_server import GenerationClient, GenerationServerError
+from klee_runner import KleeBudget, KleeScheduler, DEFAULT_PLATEAU, parse_portfolio
+from model_cache import ModelCache
+from pipeline import Pipeline
+from results_store import ResultsStore
+from run_codeql import make_backend
+from stopping import MainClosedCriteria
+
+
+def parse_args(description, analysis_timeout=ANALYSIS_TIMEOUT):
+    settings = backend_settings()
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="number of parallel analysis workers (default: number of cores)")
+    parser.add_argument("--workspace-root", default=WORKSPACE_ROOT,
+                        help="directory holding the per-item analysis workspaces")
+    parser.add_argument("--keep-workspaces", action="store_true",
+                        help="keep each item's workspace after its results are collected")
+    parser.add_argument("--analysis-timeout", type=int, default=analysis_timeout,
+                        help="seconds allowed for analyzing one item")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="overlap generation and analysis through a bounded queue and report stage utilization")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="completions allowed to wait for analysis in --pipeline mode (default: 2 x workers)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run the full analysis instead of reusing cached results")
+    parser.add_argument("--cache-dir", default=CACHE_ROOT,
+                        help="directory of the content-addressed analysis result cache")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="size cap of the analysis cache; least recently used entries are evicted")
+    parser.add_argument("--no-generation-cache", action="store_true",
+                        help="always generate instead of replaying stored greedy completions")
+    parser.add_argument("--generation-cache-dir", default=GENERATION_CACHE_ROOT,
+                        help="directory of the completion store keyed by model revision, prompt and parameters")
+    parser.add_argument("--generation-cache-mb", type=int, default=GENERATION_CACHE_MAX_BYTES // (1024 * 1024),
+                        help="size cap of the completion store; least recently used entries are evicted")
+    parser.add_argument("--no-artifact-pack", action="store_true",
+                        help="do not keep each item's completion, cleaned source, bitcode, SARIF and KLEE errors "
+                             "in the run's pack file")
+    parser.add_argument("--pch", action="store_true",
+                        help="build each program with a precompiled copy of its leading standard includes")
+    parser.add_argument("--codeql-batch", type=int, default=0, metavar="N",
+                        help="build one CodeQL database per N programs instead of one per program")
+    parser.add_argument("--codeql-backend", choices=["subprocess", "server"],
+                        default=os.environ.get("CODEQL_BACKEND") or "subprocess",
+                        help="one-shot codeql processes, or long-lived `codeql execute cli-server` processes")
+    parser.add_argument("--codeql-servers", type=int, default=1,
+                        help="number of CodeQL server processes for --codeql-backend server")
+    parser.add_argument("--klee-adaptive", action="store_true",
+                        help="stop KLEE once coverage plateaus and lend the saved time to programs still finding paths")
+    parser.add_argument("--klee-plateau", type=float, default=DEFAULT_PLATEAU,
+                        help="seconds without new coverage or tests before --klee-adaptive stops KLEE")
+    parser.add_argument("--klee-budget", type=int, default=None, metavar="SECONDS",
+                        help="total KLEE CPU seconds for the whole run (--klee-adaptive)")
+    parser.add_argument("--klee-memory-mb", type=int, default=None,
+                        help="memory budget split across --workers KLEE runs (each portfolio strategy is "
+                             "a run); their --max-memory never adds up to more (--klee-adaptive)")
+    parser.add_argument("--klee-portfolio", type=parse_portfolio, default=None, metavar="STRATEGIES",
+                        help="run one KLEE per search strategy on each program (e.g. covnew,dfs,random-path,bfs) "
+                             "through the --klee-adaptive scheduler; the first to find an error wins")
+    parser.add_argument("--klee-portfolio-deadline", action="store_true",
+                        help="run every --klee-portfolio strategy to the deadline and keep the one with most errors")
+    parser.add_argument("--shard", type=parse_shard, default=None, metavar="I/N",
+                        help="process only the I-th of N contiguous slices of the prompt range (0-based)")
+    parser.add_argument("--offset", type=int, default=None,
+                        help="first prompt index to process (default: the driver's start index)")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="process at most this many prompts from --offset")
+    parser.add_argument("--bucket", action="store_true",
+                        help="batch prompts of similar tokenized length together to cut padding")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="bucket prompts and size each batch by rows x (longest prompt + max new tokens) "
+                             "instead of a fixed prompt count")
+    parser.add_argument("--no-structure-stop", action="store_true",
+                        help="generate every completion to max new tokens instead of stopping once main is closed")
+    parser.add_argument("--model-cache-gb", type=float, default=model_cache.DEFAULT_MAX_BYTES / 1024 ** 3,
+                        help="size cap of the shared model cache; least recently used models are evicted")
+    parser.add_argument("--offline", action="store_true", default=model_cache.offline_default(),
+                        help="load models only from local snapshots in the model cache, never from the hub")
+    parser.add_argument("--continuous", type=int, default=0, metavar="SLOTS",
+                        help="continuous batching: keep SLOTS sequences decoding and refill a slot as soon as its "
+                             "sequence finishes (instead of fixed batches)")
+    parser.add_argument("--prefix-cache", action="store_true",
+                        help="encode the prompts' shared prefix once per model and reuse its key/values")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default=settings.get("BACKEND", DEFAULT_BACKEND),
+                        help="local generation backend (default: BACKEND in config.json, else hf)")
+    parser.add_argument("--threads", type=int, default=settings.get("THREADS"),
+                        help="CPU threads for generation (default: THREADS in config.json, else every core)")
+    parser.add_argument("--cpu-mode", choices=CPU_MODES, default=settings.get("CPU_MODE", "fp32"),
+                        help="without a GPU: int8 (dynamic quantization) or bf16 weights, threads pinned to "
+                             "physical cores and a static KV cache (default: CPU_MODE in config.json, else fp32)")
+    parser.add_argument("--generation-server", default=os.environ.get("GENERATION_SERVER"), metavar="URL",
+                        help="generate through a running generation_server.py instead of loading the models here")
+    parser.add_argument("--results-db", default=None,
+                        help="SQLite results store (default: the results CSV name with a .db extension)")
+    return parser.parse_args()
+
+
+def server_model_key(client, model_name):
+    """(revision, params) the generation server reports for model_name, or (None, why not)."""
+    try:
+        info = client.model_info(model_name)
+    except GenerationServerError as e:
+        # Servers without /info do not say what they serve
+        return None, str(e)
+    missing = [name for name in ("revision", "backend", "variant") if info.get(name) is None]
+    if missing:
+        return None, f"the server does not report its {', '.join(missing)}"
+    return info["revision"], {"backend": info["backend"], "variant": info["variant"]}
+
+
+def load_model(model_name, weights):
+    """Load model_name through the ModelCache weights (a local snapshot when it has one)."""
+    print(f"\n=== Loading model: {model_name} ===")
+
+    def load(path):
+        tokenizer = AutoTokenizer.from_pretrained(path, cache_dir=weights.root, trust_remote_code=True)
+        model = AutoModelForCausalLM.from_pretrained(
+            path,
+            torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
+            device_map="auto",
+            cache_dir=weights.root,
+            low_cpu_mem_usage=True
+        )
+        return model, tokenizer
+
+    model, tokenizer = weights.load(model_name, load)
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    print(f"Model is on device: {model.device}")
+    print("✓ Model loaded successfully.\n")
+    return model, tokenizer
+
+
+def generate_batch(model, tokenizer, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True,
+                   prefix="", prefix_cache=None, static_cache=False, **sampling):
+    """Decode a batch of prompts (greedy unless sampling says otherwise) and return the completions.
+
+    With structure_stop, each row stops once its program's main() is closed
+    (see stopping.py; prefix is C text the prompts already contain) and the
+    batch ends when every row has. stats, if given, accumulates the real and
+    padded prompt token counts and the new tokens the stopped rows did not
+    generate. With a PrefixCache (see prefix_cache.py), the prompts' shared
+    prefix is not encoded again. static_cache preallocates the KV cache for
+    the whole batch (CPU mode, see cpu_inference.py). sampling is passed on
+    to model.generate() (do_sample, temperature, num_return_sequences, ...).
+    """
+    inputs = None
+    reused = 0
+    # generate() does not expand a given cache for num_return_sequences
+    if prefix_cache is not None and sampling.get("num_return_sequences", 1) == 1:
+        reused = prefix_cache.reused_tokens
+        inputs = prefix_cache.inputs(prompts)
+        reused = prefix_cache.reused_tokens - reused
+    if inputs is None:
+        # Tokenize batch
+        inputs = tokenizer(prompts, padding=True, return_tensors="pt").to(model.device)
+    prompt_token_length = inputs["input_ids"].shape[1]
+    stopping = None
+    if structure_stop:
+        stopping = MainClosedCriteria(tokenizer, prompt_token_length, max_tokens, prefix)
+
+    # A prefix cache hands generate() its own (dynamic) cache
+    if static_cache and "past_key_values" not in inputs:
+        sampling["cache_implementation"] = "static"
+
+    with torch.no_grad():
+        outputs = model.generate(
+            **inputs,
+            **dict({"do_sample": False}, **sampling),
+            max_new_tokens=max_tokens,
+            pad_token_id=tokenizer.pad_token_id,
+            early_stopping=True,
+            stopping_criteria=[stopping] if stopping else None
+        )
+
+    # Counted only once generate() succeeded, so batches split after an OOM are not counted twice
+    if stats is not None:
+        stats["prompt_tokens"] = stats.get("prompt_tokens", 0) + int(inputs["attention_mask"].sum())
+        stats["padded_tokens"] = stats.get("padded_tokens", 0) + inputs["attention_mask"].numel()
+        stats["prefix_tokens"] = stats.get("prefix_tokens", 0) + reused
+        stats["rows"] = stats.get("rows", 0) + len(outputs)
+        if stopping is not None:
+            stats["rows_stopped"] = stats.get("rows_stopped", 0) + len(stopping.stopped_at)
+            stats["tokens_saved"] = stats.get("tokens_saved", 0) + stopping.tokens_saved()
+
+    codes = []
+    for output_ids in outputs:
+        if strip_prompt:
+            # Skip the prompt tokens, keep only the newly generated ones
+            output_ids = output_ids[prompt_token_length:]
+        codes.append(tokenizer.decode(output_ids, skip_special_tokens=True))
+    return codes
+
+
+def record_result(key, results, store, timings=None):
+    """Store one item's row, timings and findings."""
+    model_name, prompt_index = key
+    if results["timeout"]:
+        print(f"  ⏱️ Analysis timeout for prompt #{prompt_index}")
+    elif results.get("skipped", {}).get("codeql") == SYNTAX_CHECK_FAILED:
+        first = results["diagnostics"][0] if results.get("diagnostics") else ""
+        print(f"  ⚠️  Syntax check failed for prompt #{prompt_index}, CodeQL and KLEE skipped: {first}")
+    elif not results["compile_ok"]:
+        print(f"  ⚠️  Compilation failed for prompt #{prompt_index}")
+    if results["klee_errors"]:
+        print(f"    ✓ Found {len(results['klee_errors'])} KLEE error file(s) for prompt #{prompt_index}")
+    store.record(key, results, timings)
+
+
+def make_analyzer(args, cache=None, codeql_backend=None, klee_scheduler=None, pack=None, pch=None):
+    """Analysis backend for one model: a bounded Pipeline or the plain AnalysisPool."""
+    analyzer = ItemAnalyzer(args.workspace_root, args.keep_workspaces,
+                            timeout=args.analysis_timeout, cache=cache,
+                            skip_codeql=args.codeql_batch > 0, codeql_backend=codeql_backend,
+                            klee_scheduler=klee_scheduler, pack=pack, pch=pch)
+    if args.pipeline:
+        pool = Pipeline(args.workers, args.queue_size, analyzer)
+    else:
+        pool = AnalysisPool(args.workers, analyzer)
+    if args.codeql_batch > 0:
+        pool = CodeQLBatcher(pool, args.codeql_batch, os.path.join(args.workspace_root, "codeql_batches"),
+                             cache=cache, backend=codeql_backend, pack=pack)
+    return pool
+
+
+def generate_continuous(args, engine, todo, pool, generation_seconds, record, memo=None):
+    """Hand each completion of a ContinuousBatcher to the analysis pool as soon as it finishes.
+
+    With a MemoizedGenerate, stored completions go to the pool without
+    taking a slot and new ones are stored.
+    """
+    keys = {}
+
+    def unseen():
+        for key, prompt in todo:
+            if memo is not None:
+                keys[key] = memo.key(prompt, engine.max_new_tokens, engine.strip_prompt, engine.structure_stop)
+                code = memo.lookup(keys[key])
+                if code is not None:
+                    pool.submit(key, code)
+                    continue
+            yield key, prompt
+
+    completions = engine.run(unseen())
+    while True:
+        generation_start = time.perf_counter()
+        try:
+            with pool.generation.busy() if args.pipeline else nullcontext():
+                key, code = next(completions)
+        except StopIteration:
+            break
+        generation_seconds[key] = time.perf_counter() - generation_start
+        if memo is not None:
+            memo.store(keys.pop(key), code)
+        pool.submit(key, code)
+        for done_key, results in pool.completed():
+            record(done_key, results)
+
+
+def plan_batches(args, data, build_prompt, measure, model_name, store, start, end, batch_size, max_tokens):
+    """Batches of prompt indices for one model, plus the prompts built and the lengths measured for planning.
+
+    Without --bucket/--token-budget these are the dataset-order batches of
+    batch_size. Otherwise every unfinished prompt in range is tokenized once up front and
+    grouped by length (see batching.py); measure(prompts) returns their
+    tokenized lengths. The padding ratio of both plans is printed.
+    """
+    if not (args.bucket or args.token_budget):
+        return fixed_batches(range(start, end), batch_size), {}, {}
+
+    todo = [i for i in range(start, end) if not store.is_done(model_name, i)]
+    prompts = {i: build_prompt(data[i]) for i in todo}
+    lengths = dict(zip(todo, measure([prompts[i] for i in todo])))
+    batches = bucketed_batches(todo, lengths, None if args.token_budget else batch_size,
+                               args.token_budget, max_tokens)
+    print(f"🪣 Length buckets: {len(todo)} prompts in {len(batches)} batches, padding "
+          f"{padding_ratio(fixed_batches(todo, batch_size), lengths):.1%} in dataset order -> "
+          f"{padding_ratio(batches, lengths):.1%} bucketed")
+    return batches, prompts, lengths
+
+
+def run_batch(args, data, build_prompt, models, results_file, codeql_log_file,
+              max_prompts, max_tokens, batch_size, cache_dir,
+              start=0, strip_prompt=True, log_title="Aggregated CodeQL Error Log", prompt_prefix=None):
+    """Generate completions for data[start:max_prompts] with every model and analyze them.
+
+    --offset/--limit narrow that range and --shard picks one contiguous slice
+    of it; data only has to support len() and slicing (dataset.Dataset reads
+    just the records in range). build_prompt(item) turns a dataset record
+    into the model prompt. With strip_prompt the prompt tokens are removed
+    from each decoded completion. With --bucket, prompts are batched by
+    tokenized length instead of dataset order; with --continuous there are
+    no batches and slots are refilled as sequences finish. prompt_prefix is the text
+    every build_prompt() result starts with; --prefix-cache reuses its
+    key/values across batches. With --generation-server
+    the models stay loaded in the server and only prompts and completions
+    cross the socket; otherwise models load with the --backend generation
+    backend (generation_backends.py) through the shared ModelCache at
+    cache_dir (local snapshots first, LRU-capped at --model-cache-gb).
+    Greedy completions are stored by model revision, prompt and parameters
+    (generation_cache.py) and replayed on later runs instead of generated.
+    Each item's artifacts go to <results db>.run<id>.pack (artifact_pack.py).
+    Results go to a SQLite store next to results_file; the CSV and the
+    CodeQL log are exported from it at the end.
+    """
+    store = ResultsStore(args.results_db or os.path.splitext(results_file)[0] + ".db")
+    if store.count() == 0 and store.import_csv(results_file):
+        print(f"✓ Imported existing {results_file} into {store.path}")
+    if store.count():
+        print(f"✓ Resuming from {store.count()} completed prompts")
+    store.start_run(log_title, vars(args))
+    # Every item's completion, cleaned source, bitcode, SARIF and KLEE errors, one pack per run
+    pack = None
+    if not args.no_artifact_pack:
+        pack = ArtifactPack(f"{os.path.splitext(store.path)[0]}.run{store.run_id}.pack")
+
+    # Ensure directories exist
+    os.makedirs("feedback", exist_ok=True)
+    os.makedirs(args.workspace_root, exist_ok=True)
+
+    start_time = time.time()
+    if args.offset is not None:
+        start = args.offset
+    end = min(max_prompts, len(data))
+    if args.limit is not None:
+        end = min(end, start + args.limit)
+    start, end = shard_range(start, end, args.shard)
+    print(f"Prompts {start}..{end - 1}" + (f" (shard {args.shard[0]}/{args.shard[1]})" if args.shard else ""))
+    print(f"Analysis workers: {args.workers}")
+    cache = None if args.no_cache else AnalysisCache(args.cache_dir, args.cache_size_mb * 1024 * 1024)
+    generation_cache = None
+    if not args.no_generation_cache:
+        generation_cache = GenerationCache(args.generation_cache_dir, args.generation_cache_mb * 1024 * 1024)
+    # The server backend keeps its CodeQL processes warm across every model and prompt
+    codeql_backend = None
+    if args.codeql_backend == "server":
+        codeql_backend = make_backend("server", args.codeql_servers, args.analysis_timeout)
+    # One KLEE budget for every model, so --klee-budget bounds the whole run
+    klee_scheduler = None
+    if args.klee_adaptive or args.klee_portfolio:
+        klee_runs = args.workers * max(1, len(args.klee_portfolio or ()))
+        klee_scheduler = KleeScheduler(KleeBudget(args.klee_budget, args.klee_memory_mb, klee_runs),
+                                       plateau=args.klee_plateau, portfolio=args.klee_portfolio,
+                                       race=not args.klee_portfolio_deadline)
+    # Kept under the workspace root, so later runs and the other shards reuse them
+    pch = None
+    if args.pch:
+        pch = PrecompiledHeaders(os.path.join(args.workspace_root, "pch"), cflags=ANALYSIS_SETTINGS["ANALYSIS_CFLAGS"])
+    weights = None
+    client = None
+    if args.generation_server:
+        client = GenerationClient(args.generation_server)
+        if args.continuous:
+            print("⚠️  --continuous only runs with a local model; the server gets fixed batches")
+        print(f"🛰️  Generating through {client.url} (serving {client.info()['model'] or 'no model yet'})")
+    else:
+        weights = ModelCache(cache_dir, int(args.model_cache_gb * 1024 ** 3), args.offline)
+        settings = dict(backend_settings(), THREADS=args.threads, CPU_MODE=args.cpu_mode)
+        if args.threads:
+            torch.set_num_threads(args.threads)
+        if args.continuous and args.backend != HFBackend.name:
+            print(f"⚠️  --continuous needs the hf backend; {args.backend} gets fixed batches")
+
+    for model_name in models:
+        backend = None
+        if client is None:
+            backend = load_backend(args.backend, model_name, weights, settings,
+                                   prompt_prefix if args.prefix_cache else None)
+            generate, measure = backend.generate, backend.prompt_lengths
+        else:
+            generate = partial(client.generate, model_name,
+                               prompt_prefix=prompt_prefix if args.prefix_cache else None)
+            measure = partial(client.prompt_lengths, model=model_name)
+
+        # Greedy completions are replayed from the generation cache when nothing they depend on changed
+        memo = None
+        if generation_cache is not None:
+            if client is None:
+                revision, params = backend.revision, {"backend": backend.name, "variant": backend.variant}
+                why_not = "no local revision"
+            else:
+                revision, params = server_model_key(client, model_name)
+                why_not = params
+            if revision is None:
+                print(f"⚠️  Not reusing stored completions of {model_name} ({why_not}); generating all")
+            else:
+                memo = MemoizedGenerate(generate, generation_cache, model_name, revision, params)
+                generate = memo
+
+        completed = 0
+        model_start = time.time()
+
+        generation_seconds = {}
+
+        def record(key, results):
+            nonlocal completed
+            timings = {"generation": generation_seconds.pop(key)} if key in generation_seconds else None
+            record_result(key, results, store, timings)
+            completed += 1
+
+            # Progress tracking every 50 prompts
+            if completed % 50 == 0:
+                elapsed = time.time() - model_start
+                avg_time = elapsed / completed
+                remaining = max(0, end - start - completed) * avg_time
+                print(f"\n  📊 Progress: {completed}/{end - start}")
+                print(f"  ⏱️ Avg time per prompt: {avg_time:.1f}s")
+                print(f"  ⏱️ ETA: {remaining / 3600:.2f} hours\n")
+
+        continuous = args.continuous > 0 and isinstance(backend, HFBackend)
+        if continuous:
+            batches, prompts, lengths = [], {}, {}
+        else:
+            batches, prompts, lengths = plan_batches(args, data, build_prompt, measure, model_name, store,
+                                            start, end, batch_size, max_tokens)
+        generation = {}
+        # Remembers the largest batch that fits in memory for the rest of this model's run
+        batcher = AdaptiveBatcher(max((len(batch) for batch in batches), default=batch_size),
+                                  on_oom=torch.cuda.empty_cache if client is None else None, reserve=max_tokens)
+
+        with make_analyzer(args, cache, codeql_backend, klee_scheduler, pack, pch) as pool:
+            # ------------------- Continuous batching -------------------
+            if continuous:
+                engine = ContinuousBatcher(backend.model, backend.tokenizer, args.continuous, max_tokens,
+                                           strip_prompt, not args.no_structure_stop)
+                todo = (((model_name, i), build_prompt(data[i])) for i in range(start, end)
+                        if not store.is_done(model_name, i))
+                try:
+                    generate_continuous(args, engine, todo, pool, generation_seconds, record, memo)
+                except Exception as e:
+                    # Everything finished so far is recorded; a rerun resumes after it
+                    print(f"✗ Continuous generation stopped: {e}")
+                for name in ("rows", "rows_stopped", "tokens_saved"):
+                    generation[name] = engine.stats[name]
+                print(engine.report())
+
+            # ------------------- Batched generation -------------------
+            def generate_chunk(chunk):
+                with pool.generation.busy() if args.pipeline else nullcontext():
+                    return generate([prompt for _, prompt in chunk], max_tokens, strip_prompt, generation,
+                                    not args.no_structure_stop)
+
+            for batch_indices in batches:
+                # Skip batches whose prompts are all done already (before reading their records)
+                if all(store.is_done(model_name, i) for i in batch_indices):
+                    continue
+
+                batch_prompts = [prompts.pop(i) if i in prompts else build_prompt(data[i]) for i in batch_indices]
+
+                try:
+                    # plan_batches() measured every prompt for --bucket/--token-budget; measure the rest here
+                    unmeasured = [(i, prompt) for i, prompt in zip(batch_indices, batch_prompts) if i not in lengths]
+                    if unmeasured:
+                        lengths.update(zip([i for i, _ in unmeasured], measure([prompt for _, prompt in unmeasured])))
+                    # A batch that runs out of memory is split in halves instead of dropped; the
+                    # padded prompt tokens of what fit bound later batches too
+                    generation_start = time.perf_counter()
+                    for chunk, codes in batcher.run(zip(batch_indices, batch_prompts), generate_chunk,
+                                                    lambda item: lengths[item[0]]):
+                        per_item = (time.perf_counter() - generation_start) / max(1, len(codes))
+
+                        # Queue completions for analysis (blocks in --pipeline mode while the queue is full)
+                        for (prompt_index, _), code in zip(chunk, codes):
+                            if store.is_done(model_name, prompt_index):
+                                continue  # Already processed
+                            if code is None:
+                                # Not recorded, so a rerun (e.g. with a lower MAX_TOKENS) retries it
+                                print(f"💥 OOM on prompt #{prompt_index} on its own; the rest of the batch goes on")
+                                continue
+                            generation_seconds[(model_name, prompt_index)] = per_item
+                            pool.submit((model_name, prompt_index), code)
+                        generation_start = time.perf_counter()
+
+                except Exception as e:
+                    print(f"✗ Error in batch starting at {batch_indices[0]}: {e}")
+                    continue
+
+                # Record whatever analysis finished while this batch was generating
+                for key, results in pool.completed():
+                    record(key, results)
+
+            for key, results in pool.drain():
+                record(key, results)
+
+        if args.pipeline:
+            print(pool.report())
+        if batcher.splits:
+            print(batcher.report())
+        if batcher.failed:
+            print(f"💥 {len(batcher.failed)} prompts ran out of memory on their own and were not recorded; "
+                  f"rerun with a lower MAX_TOKENS to retry them")
+        if generation.get("padded_tokens"):
+            pad_share = 1 - generation["prompt_tokens"] / generation["padded_tokens"]
+            print(f"🧱 Padding: {pad_share:.1%} of {generation['padded_tokens']} padded prompt tokens")
+        if generation.get("prefix_tokens"):
+            print(f"♻️  Prefix cache: {generation['prefix_tokens']} of {generation['prompt_tokens']} prompt tokens "
+                  f"reused instead of encoded again")
+        if not args.no_structure_stop and generation.get("rows"):
+            saved_share = generation["tokens_saved"] / (generation["rows"] * max_tokens)
+            print(f"✂️  Structure stop: {generation['rows_stopped']}/{generation['rows']} completions stopped "
+                  f"after main, {generation['tokens_saved']} new tokens saved ({saved_share:.1%} of the budget)")
+
+        model_elapsed = time.time() - model_start
+        print(f"\n{'='*60}")
+        print(f"✓ {model_name} complete! Completed: {completed}/{end - start}")
+        print(f"  Time: {model_elapsed/3600:.2f} hours")
+        if completed > 0:
+            print(f"  Avg per prompt: {model_elapsed/completed:.1f}s")
+        else:
+            print("  Avg per prompt: N/A (no completed prompts)")
+        print(f"{'='*60}\n")
+
+        del generate, measure, memo
+        if client is None:
+            backend.close()
+            del backend
+            time.sleep(3)
+
+    if codeql_backend is not None:
+        codeql_backend.close()
+
+    store.finish_run()
+    if pack is not None:
+        pack.close()
+    # Keep the old files for existing notebooks
+    store.export_csv(results_file)
+    store.export_codeql_log(codeql_log_file, log_title)
+    skips = store.skip_summary()
+    store.close()
+
+    total_time = time.time() - start_time
+    print(f"\n🎉 All models processed successfully!")
+    print(f"Total time: {total_time/3600:.2f} hours")
+    if weights is not None:
+        print(weights.stats())
+    if pack is not None:
+        print(pack.stats())
+    if generation_cache is not None:
+        print(generation_cache.stats())
+    if cache is not None:
+        print(cache.stats())
+    if pch is not None:
+        print(pch.stats())
+    if klee_scheduler is not None:
+        print(klee_scheduler.stats())
+    for (stage, reason), count in sorted(skips.items()):
+        print(f"⏭️  {stage} skipped for {count} items ({reason})")
+    print(f"Results saved to: {store.path} (exported to {results_file})")
+    print(f"Aggregated CodeQL errors saved to: {codeql_log_file}")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Length-bucketed generation batches.
+
+Prompts are batched with padding=True, so every row of a batch is padded to
+its longest prompt. xlcost prompts embed up to 300 characters of reference
+code and vary a lot in length; grouping prompts of similar tokenized length
+wastes far fewer pad tokens. Batches are lists of prompt indices, so results
+still map back to the original prompt_index.
+"""
+
+
+def prompt_lengths(tokenizer, prompts):
+    """Tokenized length of every prompt (no padding)."""
+    return [len(ids) for ids in tokenizer(prompts)["input_ids"]]
+
+
+def fixed_batches(indices, batch_size):
+    """Dataset-order batches of batch_size prompts."""
+    indices = list(indices)
+    return [indices[i:i + batch_size] for i in range(0, len(indices), batch_size)]
+
+
+def bucketed_batches(indices, lengths, batch_size=None, token_budget=None, reserve=0):
+    """Batches of prompts with similar lengths.
+
+    Prompts are sorted by tokenized length (ties keep dataset order) and cut
+    into batches of at most batch_size rows. With token_budget, a batch also
+    stops growing once rows * (longest prompt + reserve) would exceed it;
+    reserve is typically max_new_tokens, so the budget bounds the padded
+    sequence length the batch can reach. A single prompt over the budget
+    still gets a batch of its own.
+    """
+    batches = []
+    current = []
+    longest = 0
+    for index in sorted(indices, key=lambda i: (lengths[i], i)):
+        grown = max(longest, lengths[index])
+        full = batch_size is not None and len(current) >= batch_size
+        over = token_budget is not None and (len(current) + 1) * (grown + reserve) > token_budget
+        if current and (full or over):
+            batches.append(current)
+            current = []
+            grown = lengths[index]
+        current.append(index)
+        longest = grown
+    if current:
+        batches.append(current)
+    return batches
+
+
+def padding_ratio(batches, lengths):
+    """Fraction of the padded prompt tokens that are padding."""
+    padded = sum(len(batch) * max(lengths[i] for i in batch) for batch in batches if batch)
+    real = sum(lengths[i] for batch in batches for i in batch)
+    return (padded - real) / padded if padded else 0.0
+
+
+# CUDA (torch.OutOfMemoryError), PyTorch's CPU allocator, and a MemoryError relayed by the generation server
+OUT_OF_MEMORY_MESSAGES = ("out of memory", "can't allocate memory", "memoryerror:")
+
+
+def is_out_of_memory(error):
+    """True for CUDA/CPU allocation failures (also when relayed as text by the generation server)."""
+    message = str(error).lower()
+    return isinstance(error, MemoryError) or any(text in message for text in OUT_OF_MEMORY_MESSAGES)
+
+
+class AdaptiveBatcher:
+    """Runs batches through generate(), splitting any batch that runs out of memory.
+
+    A batch that raises an out-of-memory error is halved recursively, down to
+    single prompts, so none of its prompts are dropped. The largest batch
+    that still fits is remembered as safe_rows and later batches are cut to
+    it; after probe_every successful batches at that size the limit grows by
+    one row again, up to max_rows (memory use varies with prompt length, so
+    a limit learned on long prompts would otherwise hold for short ones too).
+    A failed probe doubles the wait before the next one.
+
+    Memory grows with the padded batch, not just its rows, so when run() is
+    given each item's length the same is done for padded tokens, rows x
+    (longest prompt + reserve): safe_tokens is the largest padded batch that
+    fit, and a chunk also stops growing before it would exceed that.
+
+    A single prompt that still runs out of memory is yielded with None as
+    its output and kept in failed, and the remaining prompts go on. Errors
+    other than out-of-memory are raised.
+    """
+
+    def __init__(self, max_rows, probe_every=8, on_oom=None, reserve=0):
+        self.max_rows = max_rows
+        self.safe_rows = max_rows
+        self.safe_tokens = None  # no padded-token limit until a batch runs out of memory
+        self.probe_every = probe_every
+        self.on_oom = on_oom  # e.g. torch.cuda.empty_cache
+        self.reserve = reserve  # e.g. max_new_tokens
+        self.splits = 0
+        self.probes = 0
+        self.failed = []
+        self._proven = 0  # largest batch that fit since memory last got tighter
+        self._proven_tokens = 0
+        self._streak = 0
+
+    def padded_tokens(self, chunk, length):
+        if length is None:
+            return None
+        return len(chunk) * (max(length(item) for item in chunk) + self.reserve)
+
+    def run(self, items, generate, length=None):
+        """Yield (chunk, outputs) for consecutive chunks of items, in order; generate(chunk) -> outputs.
+
+        length(item) is the item's tokenized prompt length, for the padded-token limit.
+        """
+        items = list(items)
+        while items:
+            rows = min(self.safe_rows, len(items))
+            if length is not None and self.safe_tokens is not None:
+                while rows > 1 and self.padded_tokens(items[:rows], length) > self.safe_tokens:
+                    rows -= 1
+            chunk, items = items[:rows], items[rows:]
+            # Cut short by the token limit: counts as a full batch for probing
+            at_limit = bool(items) and rows < self.safe_rows
+            yield from self._run(chunk, generate, length, at_limit)
+
+    def _run(self, chunk, generate, length, at_limit=False):
+        try:
+            outputs = generate(chunk)
+        except Exception as e:
+            if not is_out_of_memory(e):
+                raise
+            self._failed(len(chunk), self.padded_tokens(chunk, length))
+            if len(chunk) == 1:
+                self.failed += chunk
+                yield chunk, [None]
+                return
+            half = len(chunk) // 2
+            yield from self._run(chunk[:half], generate, length)
+            yield from self._run(chunk[half:], generate, length)
+            return
+        self._succeeded(len(chunk), self.padded_tokens(chunk, length), at_limit)
+        yield chunk, outputs
+
+    def _failed(self, rows, tokens):
+        self.splits += 1
+        self._streak = 0
+        if self.on_oom is not None:
+            self.on_oom()
+        if rows > self._proven:
+            # Larger than anything that fit: fall back to what did
+            if self._proven:
+                self.probe_every *= 2
+            self.safe_rows = max(self._proven, rows // 2, 1)
+        else:
+            # A size that used to fit no longer does (longer prompts)
+            self.safe_rows = max(rows // 2, 1)
+            self._proven = 0
+        if tokens is not None:
+            if tokens > self._proven_tokens:
+                self.safe_tokens = max(self._proven_tokens, tokens // 2)
+            else:
+                self.safe_tokens = tokens // 2
+                self._proven_tokens = 0
+
+    def _succeeded(self, rows, tokens, at_limit=False):
+        self._proven = max(self._proven, rows)
+        if tokens is not None:
+            self._proven_tokens = max(self._proven_tokens, tokens)
+        if (rows < self.safe_rows and not at_limit) or (self.safe_rows >= self.max_rows and self.safe_tokens is None):
+            return
+        self._streak += 1
+        if self._streak >= self.probe_every:
+            self.safe_rows = min(self.safe_rows + 1, self.max_rows)
+            if self.safe_tokens is not None:
+                # About one more row's worth
+                self.safe_tokens += max(1, self.safe_tokens // self.safe_rows)
+            self.probes += 1
+            self._streak = 0
+
+    def report(self):
+        tokens = f", safe padded tokens {self.safe_tokens}" if self.safe_tokens is not None else ""
+        failed = f", {len(self.failed)} prompts out of memory on their own" if self.failed else ""
+        return (f"🪓 OOM splitting: {self.splits} batches split, safe batch size {self.safe_rows}/{self.max_rows}"
+                f"{tokens} ({self.probes} probes upward){failed}")
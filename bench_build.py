@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Build time of the per-item compile with and without precompiled headers.
+
+Cleans the programs (clean_code.clean_source, as the analysis does) and
+builds each one in its own directory with `make` and the item Makefile
+(run_codeql.ITEM_MAKEFILE), once plainly and once with the
+build_stage.PrecompiledHeaders header for its leading includes. With
+--batch N it also compiles N programs per compiler invocation
+(build_stage.compile_units), with and without the PCH. Reports seconds and
+milliseconds per program for each mode, and checks that every mode built
+the same programs.
+
+    python bench_build.py                                # xlcost reference programs
+    python bench_build.py --source results.run3.pack --batch 32
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from analysis_pool import ANALYSIS_SETTINGS
+from build_stage import PrecompiledHeaders, compile_units, default_compiler, leading_includes
+from clean_code import clean_source
+from dataset import Dataset, decode_xlcost
+from reanalyze import stored_completions
+from run_codeql import item_makefile
+
+
+def load_programs(args):
+    """{name: cleaned source} from --source, else the reference solutions of the xlcost dataset."""
+    if args.source:
+        codes = [code for _, code, _ in stored_completions(args.source)]
+    else:
+        codes = [item.get("code") or "" for item in Dataset(args.data, decode_xlcost)[:]]
+    codes = codes[:args.limit] if args.limit else codes
+    return {f"p{i:04d}": clean_source(code) for i, code in enumerate(codes)}
+
+
+def build_items(programs, root, cc, headers, jobs):
+    """Per-item builds, as the analysis runs them; returns the names that built."""
+    def build(name):
+        directory = os.path.join(root, name)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "clean_code.c"), "w") as f:
+            f.write(programs[name])
+        with open(os.path.join(directory, "Makefile"), "w") as f:
+            f.write(item_makefile(cc, headers.get(name)))
+        subprocess.run(["make", "-s", "-C", directory], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return name if os.path.exists(os.path.join(directory, "clean_code.o")) else None
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return {name for name in executor.map(build, sorted(programs)) if name}
+
+
+def build_batches(programs, root, cc, cflags, pch, size, jobs):
+    """size programs per compiler invocation, grouped by PCH header; returns the names that built."""
+    groups = {}
+    for name in sorted(programs):
+        header = pch.for_source(programs[name]) if pch is not None else None
+        groups.setdefault(header, []).append(name)
+    batches = [(header, names[i:i + size]) for header, names in groups.items() for i in range(0, len(names), size)]
+
+    def build(numbered):
+        number, (header, names) = numbered
+        return compile_units(cc, cflags, {name: programs[name] for name in names},
+                             os.path.join(root, f"batch_{number}"), header)
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return set().union(*executor.map(build, enumerate(batches)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-item build time with and without precompiled headers")
+    parser.add_argument("--data", default="xlcost_cpp_train.json", help="xlcost dataset whose reference code is built")
+    parser.add_argument("--source", default=None,
+                        help="build stored completions instead (artifact pack, JSONL or results directory)")
+    parser.add_argument("--limit", type=int, default=None, help="build at most this many programs")
+    parser.add_argument("--cc", default=None, help="compiler (default: clang from the LLVM install, else cc)")
+    parser.add_argument("--batch", type=int, default=0, metavar="N",
+                        help="also compile N programs per compiler invocation")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="builds running at once")
+    args = parser.parse_args()
+
+    cc = args.cc or default_compiler()
+    cflags = ANALYSIS_SETTINGS["ANALYSIS_CFLAGS"]
+    programs = load_programs(args)
+    root = tempfile.mkdtemp(prefix="bench_build_")
+    try:
+        start = time.perf_counter()
+        pch = PrecompiledHeaders(os.path.join(root, "pch"), cc, cflags)
+        headers = {name: pch.for_source(source) for name, source in programs.items()}
+        pch_seconds = time.perf_counter() - start
+        headers = {name: header for name, header in headers.items() if header is not None}
+
+        modes = [("per item", lambda r: build_items(programs, r, cc, {}, args.jobs)),
+                 ("per item + PCH", lambda r: build_items(programs, r, cc, headers, args.jobs))]
+        if args.batch:
+            modes += [(f"{args.batch} per call", lambda r: build_batches(programs, r, cc, cflags.split(), None,
+                                                                          args.batch, args.jobs)),
+                      (f"{args.batch} per call + PCH", lambda r: build_batches(programs, r, cc, cflags.split(), pch,
+                                                                                args.batch, args.jobs))]
+        print(f"\n{len(programs)} programs, {cc} {cflags}, {args.jobs} jobs")
+        print(f"{pch.stats()}, built in {pch_seconds:.2f}s")
+        built_sets = []
+        for number, (mode, build) in enumerate(modes):
+            start = time.perf_counter()
+            built = build(os.path.join(root, f"mode_{number}"))
+            seconds = time.perf_counter() - start
+            built_sets.append(built)
+            print(f"  {mode:<22} {seconds:7.2f}s  {1000 * seconds / len(programs):6.1f} ms/program  "
+                  f"{len(built)} built")
+        if any(built != built_sets[0] for built in built_sets):
+            print("⚠️  The modes built different programs")
+        else:
+            print("✓ Every mode built the same programs")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
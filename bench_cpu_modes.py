@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+CPU generation benchmark: float32 vs the int8 and bf16 CPU modes.
+
+Each mode runs in a fresh process, so thread pinning and peak memory are
+measured in isolation. Every run generates the same prompts greedily in
+fixed batches with the structure stop (as the batch drivers do), and the
+report shows generated tokens/s, resident memory after loading, peak
+resident memory, and how many completions exactly match float32's.
+
+    python bench_cpu_modes.py --model deepseek-ai/deepseek-coder-1.3b-instruct --prompts 8
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import model_cache
+
+PROMPT_PREFIX = "Write C code (only code, no explanations or comments) to: "
+
+
+def resident_mb():
+    """Current resident set size of this process."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_mode(args):
+    """Generate with one CPU mode and print the measurements as JSON."""
+    model_cache.configure_environment()
+
+    import torch
+
+    from batch_driver import generate_batch, load_model
+    from batching import fixed_batches
+    from cpu_inference import cpu_mode_active, pin_threads, prepare_model
+    from dataset import Dataset, prompt_text
+
+    optimize = cpu_mode_active(args.mode)
+    if optimize:
+        pin_threads(args.threads)
+    elif args.threads:
+        torch.set_num_threads(args.threads)
+    data = Dataset(args.data, records_key="questions")
+    prompts = [PROMPT_PREFIX + prompt_text(item) for item in data[:args.prompts]]
+    model, tokenizer = load_model(args.model, model_cache.ModelCache())
+    if optimize:
+        model = prepare_model(model, args.mode)
+    loaded_mb = resident_mb()
+
+    completions = []
+    start = time.perf_counter()
+    for batch in fixed_batches(range(len(prompts)), args.batch_size):
+        completions += generate_batch(model, tokenizer, [prompts[i] for i in batch], args.max_tokens,
+                                      static_cache=optimize)
+    seconds = time.perf_counter() - start
+    tokens = sum(len(tokenizer(code, add_special_tokens=False)["input_ids"]) for code in completions)
+    print(json.dumps({"mode": args.mode, "threads": torch.get_num_threads(), "seconds": seconds, "tokens": tokens,
+                      "loaded_mb": loaded_mb, "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                      "completions": completions}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare float32, int8 and bf16 CPU generation")
+    parser.add_argument("--model", default="deepseek-ai/deepseek-coder-1.3b-instruct")
+    parser.add_argument("--data", default="QuestionPromptForLLMs.json")
+    parser.add_argument("--prompts", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads (default: physical cores)")
+    parser.add_argument("--modes", default="fp32,int8,bf16", help="comma-separated CPU modes, fp32 first")
+    parser.add_argument("--mode", default=None, help=argparse.SUPPRESS)  # one measurement, in a child process
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    results = []
+    for mode in args.modes.split(","):
+        print(f"⏳ {mode} ...")
+        child = subprocess.run([sys.executable, __file__, *sys.argv[1:], "--mode", mode],
+                               capture_output=True, text=True)
+        if child.returncode != 0:
+            print(f"✗ {mode} failed:\n{child.stderr[-2000:]}")
+            continue
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    if not results:
+        return
+    baseline = results[0]
+    print(f"\n{args.prompts} prompts, max {args.max_tokens} new tokens, batches of {args.batch_size}")
+    print(f"  {'mode':6s} {'threads':>7s} {'tokens/s':>9s} {'speedup':>8s} {'loaded MB':>10s} {'peak MB':>8s} "
+          f"{'exact match':>12s}")
+    for result in results:
+        rate = result["tokens"] / result["seconds"]
+        same = sum(a == b for a, b in zip(result["completions"], baseline["completions"]))
+        print(f"  {result['mode']:6s} {result['threads']:7d} {rate:9.1f} "
+              f"{baseline['seconds'] / result['seconds']:7.2f}x {result['loaded_mb']:10.0f} {result['peak_mb']:8.0f} "
+              f"{same:>5d}/{len(baseline['completions'])} vs {baseline['mode']}")
+
+
+if __name__ == "__main__":
+    main()
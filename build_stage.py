@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Precompiled headers for the per-item build.
+
+The generated programs are tiny and nearly all of them start with the same
+few standard includes (clean_code.py prepends stdio/stdlib/string when a
+completion has none), so parsing those headers and starting the compiler
+is most of each compile. PrecompiledHeaders keeps one PCH per distinct
+leading include block, built next to a header holding exactly that block;
+the item's build (run_codeql.ITEM_MAKEFILE) and the syntax check then pass
+`-include <header>`. clang and gcc both pick up a .pch/.gch next to an
+-include'd header on their own, and the program's own #includes of the
+same headers are no-ops behind their include guards, so every program
+compiles exactly as it did without the PCH.
+
+A PCH is only handed out after a probe that uses its headers builds
+through the real build command (-save-temps included); otherwise, or
+without a compiler, items build without one. PCHs live in one directory
+per (compiler, flags, include block) and are reused by later runs.
+
+compile_units() compiles several translation units in one compiler
+invocation; bench_build.py measures both against the plain per-item build.
+"""
+
+import fcntl
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+
+from clean_code import DEFAULT_INCLUDES
+
+STANDARD_INCLUDES = tuple(line for line in DEFAULT_INCLUDES if line)
+INCLUDE_LINE = re.compile(r"#\s*include\s*<[^>]+>")
+BUILD_TIMEOUT = 60
+# Statements the probe runs for the headers it knows, so a PCH that loses declarations fails it
+PROBE_USES = {
+    "stdio.h": 'FILE *out = stdout; fprintf(out, "%d\\n", 1);',
+    "stdlib.h": "void *p = malloc(1); free(p);",
+    "string.h": 'size_t n = strlen("x"); (void)n;',
+}
+
+
+def default_compiler():
+    """The compiler ITEM_MAKEFILE uses: clang from the LLVM install, else cc."""
+    from analysis_pool import find_clang
+    return find_clang() or shutil.which("cc")
+
+
+def leading_includes(source):
+    """The #include <...> lines the program starts with (blank lines allowed between), as a tuple."""
+    includes = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        if not INCLUDE_LINE.fullmatch(stripped):
+            break
+        includes.append(stripped)
+    return tuple(includes)
+
+
+def pch_suffix(cc):
+    return ".pch" if "clang" in os.path.basename(cc) else ".gch"
+
+
+def build_command(cc, cflags, header=None):
+    """Arguments of the build rule in run_codeql.ITEM_MAKEFILE, without the source files."""
+    include = ["-include", header] if header else []
+    return [cc] + list(cflags) + include + ["-c", "-save-temps=obj"]
+
+
+def compile_units(cc, cflags, sources, directory, header=None, timeout=BUILD_TIMEOUT):
+    """Compile {name: C source} with one compiler invocation in directory; returns the names that built.
+
+    Each unit is written to <name>.c and, as in the per-item build, gives
+    <name>.o plus <name>.bc under clang. A unit that fails does not stop
+    the others.
+    """
+    os.makedirs(directory, exist_ok=True)
+    files = []
+    for name, source in sorted(sources.items()):
+        with open(os.path.join(directory, name + ".c"), "w") as f:
+            f.write(source)
+        files.append(name + ".c")
+    command = build_command(cc, cflags, header) + files
+    try:
+        subprocess.run(command, cwd=directory, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        pass
+    return {name for name in sources if os.path.exists(os.path.join(directory, name + ".o"))}
+
+
+class PrecompiledHeaders:
+    """One validated PCH per leading include block, shared by every item (thread-safe)."""
+
+    def __init__(self, root, cc=None, cflags="-g"):
+        self.root = root
+        self.cc = cc or default_compiler()
+        self.cflags = cflags.split()
+        self.used = 0
+        self._lock = threading.Lock()
+        self._headers = {}  # include block -> header with a working PCH, or None
+
+    def for_source(self, source):
+        """Header to -include for source, or None to build it without a PCH."""
+        header = self.header(leading_includes(source))
+        if header is not None:
+            with self._lock:
+                self.used += 1
+        return header
+
+    def header(self, includes):
+        if not includes or self.cc is None:
+            return None
+        with self._lock:
+            if includes not in self._headers:
+                self._headers[includes] = self._prepare(includes)
+            return self._headers[includes]
+
+    def _directory(self, includes):
+        try:
+            version = subprocess.run([self.cc, "--version"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                     universal_newlines=True, timeout=BUILD_TIMEOUT).stdout
+        except (OSError, subprocess.TimeoutExpired):
+            version = ""
+        h = hashlib.sha256("\0".join([self.cc, version, " ".join(self.cflags)] + list(includes)).encode())
+        return os.path.join(self.root, h.hexdigest()[:16])
+
+    def _prepare(self, includes):
+        """Build (or reuse from an earlier run) and validate the PCH for includes."""
+        directory = self._directory(includes)
+        os.makedirs(directory, exist_ok=True)
+        header = os.path.join(directory, "prelude.h")
+        status_path = os.path.join(directory, "status")
+        # Other processes (shards) may be building the same PCH
+        with open(os.path.join(directory, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not os.path.exists(status_path):
+                status = "ok" if self._build(includes, header) else "failed"
+                with open(status_path, "w") as f:
+                    f.write(status)
+            with open(status_path) as f:
+                return header if f.read() == "ok" else None
+
+    def _build(self, includes, header):
+        with open(header, "w") as f:
+            f.write("\n".join(includes) + "\n")
+        try:
+            proc = subprocess.run([self.cc] + self.cflags + ["-x", "c-header", header, "-o", header + pch_suffix(self.cc)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=BUILD_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            return False
+        return proc.returncode == 0 and self._probe(includes, header)
+
+    def _probe(self, includes, header):
+        """Does a program using these headers still build through the real build command with the PCH?"""
+        uses = [PROBE_USES[name] for name in sorted(PROBE_USES) if f"#include <{name}>" in includes]
+        probe = "\n".join(includes) + "\nint main(void) {\n    " + "\n    ".join(uses) + "\n    return 0;\n}\n"
+        directory = tempfile.mkdtemp(dir=os.path.dirname(header))
+        try:
+            built = compile_units(self.cc, self.cflags, {"probe": probe}, directory, header)
+            bitcode = "clang" not in os.path.basename(self.cc) or os.path.exists(os.path.join(directory, "probe.bc"))
+            return "probe" in built and bitcode
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def stats(self):
+        usable = sum(header is not None for header in self._headers.values())
+        return (f"🧩 Precompiled headers: {usable}/{len(self._headers)} include sets usable, "
+                f"used for {self.used} items ({self.cc})")
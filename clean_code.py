@@ -1,106 +1,232 @@
 #!/usr/bin/env python3
 """
-Code cleaning script to extract valid C code from LLM-generated content.
-Removes explanatory text, comments, and duplicate code blocks.
+Code cleaning library to extract valid C code from LLM-generated content.
+
+clean_source() does in one pass over the lines, in-process, what
+analyze_only.sh used to do with a Python heredoc, five `sed -i` passes, an
+`awk` pass and a grep/cat main wrapper (each spawning a process and
+rewriting clean_code.c), and produces the same output:
+
+1. markdown: keep the lines of ```c fenced blocks
+2. prose: drop the prompt echo and the text before the first code-like
+   line and after the last statement/brace, over-long prose lines and
+   trailing // comments; prepend the standard includes if there are none
+3. line filters: sentences, "Here/This/The ...:" lines and /* ... */
+   blocks opened on a line of their own
+4. collapse runs of consecutive `return 0;` lines
+5. append an empty main() when the program has none
+
+The stages are chained generators, so every line flows through all of them
+once; a stage only holds back lines while it cannot yet tell whether they
+are kept (e.g. lines after the last statement seen so far).
 """
 
+import itertools
 import re
 import sys
 
-def clean_c_code(input_file, output_file):
-    """Clean LLM-generated C code by removing explanatory text and duplicates."""
-    
-    with open(input_file, 'r') as f:
-        content = f.read()
-    
-    # Remove any code block markers (```c, ```, etc.)
-    content = re.sub(r'```[a-zA-Z0-9]*\n?', '', content)
-    
-    lines = content.split('\n')
-    code_lines = []
-    in_code = False
-    brace_count = 0
-    main_ended = False
-    
-    for i, line in enumerate(lines):
+# Lines of a prompt echo that come before the code
+PROMPT_PREFIXES = ("Write ", "Implement ", "Use ", "Create ", "Define ", "Building ")
+CODE_START = re.compile(r"^(int|void|char|float|double|struct|typedef|unsigned|signed|static|extern)")
+DEFAULT_INCLUDES = ["#include <stdio.h>", "#include <stdlib.h>", "#include <string.h>", ""]
+# Sentences and "Here is the code:"-style lead-ins left between code lines
+PROSE_LINE = re.compile(r"[A-Z][a-z].*[^;{}]$|Here.*:|This.*:|The.*:")
+MAIN_WRAPPER = "\nint main() {\n    return 0;\n}\n"
+
+
+def _markdown_blocks(text):
+    """Lines of every ```c ... ``` range, without the first and last line overall.
+
+    Ranges run from a line containing ```c to the next line containing ```
+    (or the end), like `sed -n '/```c/,/```/p' | sed '1d;$d'`. The result was
+    written with a newline after every line, so reading it back ends with an
+    empty line.
+    """
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    first = True
+    held = None
+    in_block = False
+    for line in lines:
+        if in_block:
+            in_block = "```" not in line
+        elif "```c" in line:
+            in_block = True
+        else:
+            continue
+        if first:
+            first = False
+            continue
+        if held is not None:
+            yield held
+        held = line
+    yield ""
+
+
+def _split_cr(line, terminated=True):
+    """Split on \\r and \\r\\n too, as reading the file in text mode did."""
+    if terminated and line.endswith("\r"):
+        line = line[:-1]
+    return line.split("\r")
+
+
+def _source_lines(text):
+    if "```c" in text:
+        for line in _markdown_blocks(text):
+            yield from _split_cr(line)
+        return
+    *lines, last = text.split("\n")
+    for line in lines:
+        yield from _split_cr(line)
+    # The end of the text has no newline after it
+    yield from _split_cr(last, terminated=False)
+
+
+def _skip_prompt_echo(lines):
+    """Drop leading blank lines and prompt-echo lines ("Write ...", "Implement ...")."""
+    lines = iter(lines)
+    for line in lines:
+        stripped = line.strip()
+        if stripped and not stripped.startswith(PROMPT_PREFIXES):
+            yield line
+            break
+    yield from lines
+
+
+def _code_start(line):
+    """"include" or "code" if the line can start the program, else None."""
+    stripped = line.strip()
+    if stripped.startswith("#include"):
+        return "include"
+    if stripped.startswith(("#define", "//", "/*")) or CODE_START.match(line):
+        return "code"
+    return None
+
+
+def _is_statement_end(line):
+    stripped = line.strip()
+    return bool(stripped) and (stripped[0] in "}#" or "return" in stripped or ";" in stripped)
+
+
+def _until_last_statement(lines, seen_statement=False):
+    """Lines up to the last one ending a statement or block; all of them if the text has none."""
+    held = []
+    for line in lines:
+        held.append(line)
+        if _is_statement_end(line):
+            yield from held
+            held = []
+            seen_statement = True
+    if not seen_statement:
+        yield from held
+
+
+def _drop_prose(lines):
+    """Drop very long lines without any code characters (explanations)."""
+    for line in lines:
         stripped = line.strip()
-        
-        # Skip empty lines before code starts
-        if not in_code and not stripped:
+        if len(stripped) > 150 and not any(c in stripped for c in "(){};,=[]<>"):
             continue
-        
-        # Skip non-code lines before we detect C code
-        # C code starts with #include, struct/typedef declarations, or function definitions
-        if not in_code:
-            # Check if this line looks like C code
-            if (stripped.startswith('#include') or 
-                stripped.startswith('#define') or
-                stripped.startswith('typedef ') or
-                stripped.startswith('struct ') or
-                stripped.startswith('int ') or
-                stripped.startswith('void ') or
-                stripped.startswith('char ') or
-                stripped.startswith('float ') or
-                stripped.startswith('double ') or
-                stripped.startswith('long ') or
-                stripped.startswith('unsigned ') or
-                stripped.startswith('static ') or
-                ('{' in line and not any(c.isalpha() for c in line[:line.index('{')]))):
-                in_code = True
-                # Don't add this line if it's just a stray character like '.' or ';'
-                if len(stripped) <= 2:
-                    continue
-            else:
-                # This is explanatory text, skip it
-                continue
-        
-        # Once we're in code
-        if in_code:
-            # Skip lines that are clearly explanatory text (not C code)
-            # Common patterns: ends with colon, contains "A:", "Q:", etc., or is pure prose
-            if (stripped and not any(c in stripped for c in '{}();,=<>/*#') and
-                len(stripped) > 20 and not stripped.startswith('//')):
-                # This looks like explanatory text, skip it
+        yield line
+
+
+def _drop_trailing_comments(lines):
+    held = []
+    for line in lines:
+        if line.strip().startswith("//"):
+            held.append(line)
+            continue
+        yield from held
+        held = []
+        yield line
+
+
+def _extract_code(lines):
+    """From the first code-like line to the last statement, with includes ensured."""
+    lines = _skip_prompt_echo(lines)
+    before = []
+    start = None
+    for line in lines:
+        start = _code_start(line)
+        if start:
+            lines = itertools.chain([line], lines)
+            break
+        before.append(line)
+    else:
+        # No code-like line: keep everything
+        lines = before
+    if start != "include":
+        yield from DEFAULT_INCLUDES
+    # A statement before the code-like line still counts as the last one if none follows
+    seen_statement = start is not None and any(_is_statement_end(line) for line in before)
+    yield from _drop_trailing_comments(_drop_prose(_until_last_statement(lines, seen_statement)))
+
+
+def _as_written(lines):
+    """The lines joined with newlines and read back line by line (a final empty line vanishes)."""
+    held = None
+    for line in lines:
+        if held is not None:
+            yield held
+        held = line
+    if held:
+        yield held
+
+
+def _filter_lines(lines):
+    """Line filters and duplicate-return removal on the text the prose stage wrote."""
+    in_comment = False
+    previous_return = False
+    for line in _as_written(lines):
+        if in_comment:
+            in_comment = not line.startswith("*/")
+            continue
+        if line == "/*":
+            in_comment = True
+            continue
+        if PROSE_LINE.match(line):
+            continue
+        if "return 0;" in line:
+            if previous_return:
                 continue
-            
-            code_lines.append(line)
-            
-            # Track braces to know when functions end
-            brace_count += line.count('{') - line.count('}')
-            
-            # Mark when we've closed all braces (end of last function)
-            if in_code and brace_count == 0 and ('{' in ''.join(code_lines)):
-                main_ended = True
-            
-            # Stop after we've closed all braces and found a closing brace
-            if main_ended and brace_count == 0 and '}' in stripped:
-                break
-    
-    # Join the cleaned lines
-    cleaned_content = '\n'.join(code_lines).strip()
-    
-    # Final cleanup: remove any trailing explanatory text after the last }
-    # Find the last closing brace
-    last_brace = cleaned_content.rfind('}')
-    if last_brace != -1:
-        cleaned_content = cleaned_content[:last_brace + 1]
-    
-    # Write cleaned content
-    with open(output_file, 'w') as f:
-        f.write(cleaned_content)
-    
-    print(f"✓ Code cleaned: {input_file} -> {output_file}")
+            previous_return = True
+        else:
+            previous_return = False
+        yield line
+
+
+def clean_source(text):
+    """Clean one LLM completion into a compilable-looking C translation unit."""
+    out = []
+    has_main = False
+    for line in _filter_lines(_extract_code(_source_lines(text))):
+        has_main = has_main or "int main" in line
+        out.append(line + "\n")
+    if not has_main:
+        out.append(MAIN_WRAPPER)
+    return "".join(out)
+
+
+def clean_c_code(input_file, output_file):
+    """Clean LLM-generated C code from input_file into output_file."""
+    with open(input_file, newline="") as f:
+        content = f.read()
+    with open(output_file, "w") as f:
+        f.write(clean_source(content))
+
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
         print("Usage: python3 clean_code.py <input_file> <output_file>")
         sys.exit(1)
-    
+
     input_file = sys.argv[1]
     output_file = sys.argv[2]
-    
+
     try:
         clean_c_code(input_file, output_file)
     except Exception as e:
         print(f"Error cleaning code: {e}")
         sys.exit(1)
+    print(f"✓ Code cleaned: {input_file} -> {output_file}")
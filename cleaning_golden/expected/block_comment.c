@@ -0,0 +1,5 @@
+#include <stdio.h>
+
+int main() {
+    return 0;
+}
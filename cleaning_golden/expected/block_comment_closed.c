@@ -0,0 +1,4 @@
+#include <stdio.h>
+int main() {
+    return x;
+}
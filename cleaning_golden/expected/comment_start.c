@@ -0,0 +1,7 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+// helper
+static int h(void) { return 2; }
+int main() { return h(); }
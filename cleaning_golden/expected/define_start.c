@@ -0,0 +1,7 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#define N 10
+int arr[N];
+int main() { arr[N] = 1; return 0; }
@@ -0,0 +1,10 @@
+#include <stdio.h>
+int main() {
+    printf("x");
+    return 0;
+}
+int g() {
+    return 0;
+
+    return 0;
+}
@@ -0,0 +1,7 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+interface notes
+typedef struct { int a; } S;
+int main() { S s; s.a = 1; return s.a; }
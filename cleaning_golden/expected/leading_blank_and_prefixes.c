@@ -0,0 +1,2 @@
+#include <string.h>
+int main() { char d[4]; strcpy(d, "abc"); return 0; }
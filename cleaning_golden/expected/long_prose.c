@@ -0,0 +1,5 @@
+#include <stdio.h>
+int main() {
+    return 0;
+}
+int helper(void) { return 1; }
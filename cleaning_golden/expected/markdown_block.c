@@ -0,0 +1,14 @@
+#include <stdio.h>
+#include <string.h>
+
+void copy_name(char *dst) {
+    char buf[64];
+    fgets(buf, sizeof buf, stdin);
+    strcpy(dst, buf);
+}
+
+int main() {
+    char name[16];
+    copy_name(name);
+    return 0;
+}
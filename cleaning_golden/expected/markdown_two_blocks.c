@@ -0,0 +1,8 @@
+#include <stdio.h>
+int add(int a, int b) { return a + b; }
+```
+```c
+int main() {
+    printf("%d\n", add(1, 2));
+    return 0;
+}
@@ -0,0 +1,5 @@
+#include <stdlib.h>
+int main() {
+    int *p = malloc(4);
+    p[4] = 1;
+    return 0;
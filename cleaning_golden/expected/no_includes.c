@@ -0,0 +1,11 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+int square(int x) {
+    return x * x;
+}
+
+int main() {
+    return square(3);
+}
@@ -0,0 +1,8 @@
+#include <stdio.h>
+void greet(const char *name) {
+    printf("Hello %s\n", name);
+}
+
+int main() {
+    return 0;
+}
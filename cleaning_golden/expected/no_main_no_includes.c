@@ -0,0 +1,11 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+void f(int *p) {
+    *p = 0;
+}
+
+int main() {
+    return 0;
+}
@@ -0,0 +1,9 @@
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+I'm sorry, but I cannot help with that request because it is unclear what you want me to do
+
+int main() {
+    return 0;
+}
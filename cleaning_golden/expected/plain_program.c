@@ -0,0 +1,6 @@
+#include <stdio.h>
+
+int main() {
+    printf("hi\n");
+    return 0;
+}
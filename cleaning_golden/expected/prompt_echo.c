@@ -0,0 +1,8 @@
+#include <stdio.h>
+int main() {
+    double a, b;
+    char op;
+    scanf("%lf %c %lf", &a, &op, &b);
+    if (op == '/') printf("%f\n", a / b);
+    return 0;
+}
@@ -0,0 +1,2 @@
+#include <stdio.h>
+int main() { if (1) return 0; return 0;
@@ -0,0 +1,3 @@
+#include <stdio.h>
+// Ünïcödé comment
+int main() { printf("héllo\n"); return 0; }
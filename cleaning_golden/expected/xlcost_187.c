@@ -0,0 +1,7 @@
+#include <stdio.h>
+#include <stdlib.h>
+struct node { int key ; struct node * left ; struct node * right ; int height ; int count ; } ; int max ( int a , int b ) ; int height ( struct node * N ) { if ( N == NULL ) return 0;
+
+int main() {
+    return 0;
+}
@@ -0,0 +1,9 @@
+#include <stdio.h>
+/*
+ * Program description
+ */
+int main() {
+/*
+this comment is never closed
+    return 0;
+}
\ No newline at end of file
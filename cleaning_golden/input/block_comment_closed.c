@@ -0,0 +1,7 @@
+#include <stdio.h>
+/*
+Header comment
+*/ int x;
+int main() {
+    return x;
+}
\ No newline at end of file
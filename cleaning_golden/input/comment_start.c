@@ -0,0 +1,4 @@
+Intro
+// helper
+static int h(void) { return 2; }
+int main() { return h(); }
\ No newline at end of file
@@ -0,0 +1,4 @@
+Some intro text
+#define N 10
+int arr[N];
+int main() { arr[N] = 1; return 0; }
\ No newline at end of file
@@ -0,0 +1,12 @@
+#include <stdio.h>
+int main() {
+    printf("x");
+    return 0;
+    return 0;
+    return 0;
+}
+int g() {
+    return 0;
+
+    return 0;
+}
\ No newline at end of file
@@ -0,0 +1,4 @@
+Explanation first
+    int x = 0;
+    return x;
+int main() { return 0; }
\ No newline at end of file
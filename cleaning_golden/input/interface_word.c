@@ -0,0 +1,3 @@
+interface notes
+typedef struct { int a; } S;
+int main() { S s; s.a = 1; return s.a; }
\ No newline at end of file
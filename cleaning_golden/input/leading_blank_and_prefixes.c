@@ -0,0 +1,7 @@
+
+
+Write a program that copies strings.
+Implement it using strcpy.
+Use the standard library.
+#include <string.h>
+int main() { char d[4]; strcpy(d, "abc"); return 0; }
@@ -0,0 +1,6 @@
+#include <stdio.h>
+int main() {
+    return 0;
+}
+This explanation goes on and on about how the program works and why it was written this way without using any code characters at all so it is very long indeed okay
+int helper(void) { return 1; }
\ No newline at end of file
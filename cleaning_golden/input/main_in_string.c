@@ -0,0 +1,2 @@
+#include <stdio.h>
+void f() { puts("int main"); }
\ No newline at end of file
@@ -0,0 +1,4 @@
+```cpp
+#include <iostream>
+int main() { std::cout << 1; return 0; }
+```
\ No newline at end of file
@@ -0,0 +1 @@
+text ```c code``` more
\ No newline at end of file
@@ -0,0 +1,11 @@
+```c
+#include <stdio.h>
+int add(int a, int b) { return a + b; }
+```
+And the main function:
+```c
+int main() {
+    printf("%d\n", add(1, 2));
+    return 0;
+}
+```
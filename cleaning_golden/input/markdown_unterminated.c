@@ -0,0 +1,7 @@
+Sure! ```c
+#include <stdlib.h>
+int main() {
+    int *p = malloc(4);
+    p[4] = 1;
+    return 0;
+}
\ No newline at end of file
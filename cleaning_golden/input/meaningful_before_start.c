@@ -0,0 +1,3 @@
+x = 1;
+y = 2
+int z
\ No newline at end of file
@@ -0,0 +1,7 @@
+int square(int x) {
+    return x * x;
+}
+
+int main() {
+    return square(3);
+}
\ No newline at end of file
@@ -0,0 +1,4 @@
+#include <stdio.h>
+void greet(const char *name) {
+    printf("Hello %s\n", name);
+}
\ No newline at end of file
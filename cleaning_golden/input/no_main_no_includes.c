@@ -0,0 +1,3 @@
+void f(int *p) {
+    *p = 0;
+}
\ No newline at end of file
@@ -0,0 +1 @@
+I'm sorry, but I cannot help with that request because it is unclear what you want me to do
\ No newline at end of file
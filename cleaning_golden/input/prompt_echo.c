@@ -0,0 +1,9 @@
+Write C code (only code, no explanations or comments) to: Write a C program to implement a calculator application
+#include <stdio.h>
+int main() {
+    double a, b;
+    char op;
+    scanf("%lf %c %lf", &a, &op, &b);
+    if (op == '/') printf("%f\n", a / b);
+    return 0;
+}
\ No newline at end of file
@@ -0,0 +1,13 @@
+#include <stdio.h>
+The following function computes the sum
+int sum(int *a, int n) {
+    int s = 0;
+    for (int i = 0; i < n; i++) s += a[i];
+    return s;
+}
+Here is the main function:
+This is important:
+The end:
+Note that this works;
+int main() { int a[3] = {1,2,3}; return sum(a, 3); }
+Explanation of the code above
\ No newline at end of file
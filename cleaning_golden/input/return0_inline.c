@@ -0,0 +1,3 @@
+#include <stdio.h>
+int main() { if (1) return 0; return 0;
+    return 0; }
\ No newline at end of file
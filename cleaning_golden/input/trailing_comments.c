@@ -0,0 +1,6 @@
+#include <stdio.h>
+int main() {
+    return 0;
+}
+// end of program
+// compile with gcc;
\ No newline at end of file
@@ -0,0 +1,4 @@
+#include <stdio.h>
+// Ünïcödé comment
+int main() { printf("héllo\n"); return 0; }
+Thé ending
\ No newline at end of file
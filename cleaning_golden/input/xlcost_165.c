@@ -0,0 +1,7 @@
+Here is the C code:
+
+```c
+void printNthFromLast ( struct Node * head , int n ) { static int i = 0 ; if ( head == NULL ) return ; printNthFromLast ( head -> next , n ) ; if ( ++ i == n ) printf ( " % d " , head -> data ) ; }
+```
+
+This code Program for n 'th node from the end of a Linked List |
\ No newline at end of file
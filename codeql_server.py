@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Long-lived CodeQL process shared by every prompt of a run.
+
+`codeql execute cli-server` keeps one JVM running and accepts ordinary CLI
+commands over stdin: each command is a JSON array of arguments terminated by
+a NUL byte, and the server answers with the command's stdout, again
+terminated by NUL. Keeping that process alive means JVM startup, pack
+resolution and compiled queries are paid once per run instead of once per
+program. Any executable speaking the same protocol (e.g. a test stand-in)
+can be used in its place.
+"""
+
+import json
+import os
+import queue
+import subprocess
+import threading
+
+
+class CodeQLServerError(RuntimeError):
+    pass
+
+
+class CodeQLServer:
+    """One cli-server process; commands are serialized with a lock."""
+
+    def __init__(self, command, timeout=None):
+        self.command = list(command)
+        self.timeout = timeout
+        self.starts = 0
+        self.commands = 0
+        self._proc = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._proc = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                      stderr=subprocess.DEVNULL, start_new_session=True)
+        self.starts += 1
+
+    def _read_reply(self):
+        chunks = []
+        while True:
+            chunk = self._proc.stdout.read1(65536)
+            if not chunk:
+                raise CodeQLServerError("CodeQL server exited")
+            chunks.append(chunk)
+            if chunk.endswith(b"\0"):
+                return b"".join(chunks)[:-1].decode("utf-8", errors="replace")
+
+    def run(self, args):
+        """Run one CodeQL CLI command (without the leading `codeql`) and return its stdout."""
+        with self._lock:
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            self.commands += 1
+            request = json.dumps(list(args)).encode() + b"\0"
+            reply = {}
+
+            def exchange():
+                try:
+                    self._proc.stdin.write(request)
+                    self._proc.stdin.flush()
+                    reply["output"] = self._read_reply()
+                except (OSError, CodeQLServerError) as e:
+                    reply["error"] = e
+
+            worker = threading.Thread(target=exchange, daemon=True)
+            worker.start()
+            worker.join(self.timeout)
+            if worker.is_alive() or "error" in reply:
+                # A stuck or dead server is restarted on the next command
+                self._kill()
+                raise CodeQLServerError(f"CodeQL server command failed: {args[:2]} "
+                                        f"({reply.get('error', 'timeout')})")
+            return reply["output"]
+
+    def _kill(self):
+        if self._proc is not None:
+            try:
+                os.killpg(self._proc.pid, 9)
+            except ProcessLookupError:
+                pass
+            self._proc.wait()
+            self._proc = None
+
+    def close(self):
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                # Closing stdin asks the server to shut down
+                try:
+                    self._proc.stdin.close()
+                    self._proc.wait(timeout=30)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._kill()
+
+
+class ServerBackend:
+    """CodeQL backend backed by a small pool of cli-server processes.
+
+    Each analysis worker borrows a server for one command, so up to `servers`
+    commands run at once while the JVMs stay warm.
+    """
+
+    def __init__(self, codeql_bin, servers=1, timeout=None, command=None):
+        command = command or [codeql_bin, "execute", "cli-server"]
+        self.servers = [CodeQLServer(command, timeout) for _ in range(servers)]
+        self._idle = queue.Queue()
+        for server in self.servers:
+            self._idle.put(server)
+
+    def run(self, args, quiet=False):
+        """Returns None as the exit status: callers judge success by the artifacts written."""
+        server = self._idle.get()
+        try:
+            server.run(args)
+        except CodeQLServerError as e:
+            print(f"✗ {e}")
+        finally:
+            self._idle.put(server)
+        return None
+
+    def close(self):
+        for server in self.servers:
+            server.close()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Continuous batching for greedy generation.
+
+With static batches, a batch holds its rows until the longest sequence is
+done: a program that closes main() after 80 tokens keeps its slot (padding)
+while its neighbour runs to 512. ContinuousBatcher keeps `slots` sequences
+decoding together and refills a slot with the next pending prompt as soon
+as its sequence hits EOS, the structure stop (stopping.py) or
+max_new_tokens.
+
+Each new prompt is prefilled on its own and its key/values are merged into
+the running batch cache. Rows are left-padded to the cache length with
+masked positions, and position ids come from each row's count of real
+tokens, so a row decodes exactly as it would in a left-padded static batch.
+Leading columns that are padding in every row are trimmed as rows leave.
+The cache is handled as per-layer [batch, heads, length, head_dim] tensors,
+the layout of llama-style decoder-only models such as deepseek-coder.
+"""
+
+import time
+
+try:
+    import torch
+    from transformers import DynamicCache
+except ImportError:
+    torch = None
+    DynamicCache = None
+
+from stopping import TokenStreamTracker
+
+
+def cache_tensors(past):
+    """[(keys, values)] per layer of a transformers cache object or legacy tuple."""
+    if hasattr(past, "layers"):
+        return [(layer.keys, layer.values) for layer in past.layers]
+    if hasattr(past, "key_cache"):
+        return list(zip(past.key_cache, past.value_cache))
+    return [tuple(layer) for layer in past]
+
+
+def make_cache(layers):
+    cache = DynamicCache()
+    for index, (keys, values) in enumerate(layers):
+        cache.update(keys, values, index)
+    return cache
+
+
+def left_pad(tensor, amount, dim):
+    """Prepend amount zero entries along dim."""
+    if amount <= 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = amount
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+
+class Sequence:
+    """One prompt occupying a slot."""
+
+    def __init__(self, key, prompt_ids, tracker):
+        self.key = key
+        self.prompt_ids = prompt_ids
+        self.generated = []
+        self.tracker = tracker
+        self.stop = None
+
+
+class ContinuousBatcher:
+    """Greedy generation with a fixed number of slots, refilled as sequences finish."""
+
+    def __init__(self, model, tokenizer, slots=4, max_new_tokens=512, strip_prompt=True, structure_stop=True,
+                 prefix=""):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.slots = slots
+        self.max_new_tokens = max_new_tokens
+        self.strip_prompt = strip_prompt
+        self.structure_stop = structure_stop
+        self.prefix = prefix
+        self.eos_id = tokenizer.eos_token_id
+        self.stats = {"rows": 0, "rows_stopped": 0, "tokens_saved": 0, "generated_tokens": 0,
+                      "steps": 0, "seconds": 0.0}
+        self._rows = []      # Sequence per batch row
+        self._layers = None  # [(keys, values)] of the batch
+        self._mask = None    # [rows, length] attention mask of the cache
+
+    def _prefill(self, prompt_ids):
+        start = time.perf_counter()
+        ids = torch.tensor([prompt_ids], device=self.model.device)
+        with torch.no_grad():
+            out = self.model(input_ids=ids, past_key_values=DynamicCache(), use_cache=True)
+        self.stats["seconds"] += time.perf_counter() - start
+        return cache_tensors(out.past_key_values), int(out.logits[0, -1].argmax())
+
+    def _admit(self, key, prompt, row=None):
+        """Prefill prompt and place it in row (replacing a finished sequence) or a new row."""
+        prompt_ids = self.tokenizer(prompt)["input_ids"]
+        layers, first = self._prefill(prompt_ids)
+        tracker = TokenStreamTracker(self.tokenizer, self.prefix) if self.structure_stop else None
+        sequence = Sequence(key, prompt_ids, tracker)
+        mask = torch.ones(1, len(prompt_ids), dtype=torch.long, device=self.model.device)
+        if self._layers is None:
+            self._layers, self._mask, self._rows = layers, mask, [sequence]
+        else:
+            # Left-pad whichever side is shorter so both have the same cache length
+            length, batch_length = mask.shape[1], self._mask.shape[1]
+            pad, batch_pad = batch_length - length, length - batch_length
+            layers = [(left_pad(k, pad, 2), left_pad(v, pad, 2)) for k, v in layers]
+            mask = left_pad(mask, pad, 1)
+            self._layers = [(left_pad(k, batch_pad, 2), left_pad(v, batch_pad, 2)) for k, v in self._layers]
+            self._mask = left_pad(self._mask, batch_pad, 1)
+            if row is None:
+                self._layers = [(torch.cat([bk, k]), torch.cat([bv, v]))
+                                for (bk, bv), (k, v) in zip(self._layers, layers)]
+                self._mask = torch.cat([self._mask, mask])
+                self._rows.append(sequence)
+            else:
+                for (bk, bv), (k, v) in zip(self._layers, layers):
+                    bk[row] = k[0]
+                    bv[row] = v[0]
+                self._mask[row] = mask[0]
+                self._rows[row] = sequence
+        self._append(sequence, first)
+
+    def _append(self, sequence, token):
+        """Record a generated token and decide whether the sequence is finished."""
+        sequence.generated.append(token)
+        if token == self.eos_id:
+            sequence.stop = "eos"
+        elif sequence.tracker is not None and sequence.tracker.update(sequence.generated):
+            sequence.stop = "structure"
+        elif len(sequence.generated) >= self.max_new_tokens:
+            sequence.stop = "length"
+
+    def _finish(self, sequence):
+        ids = sequence.generated if self.strip_prompt else sequence.prompt_ids + sequence.generated
+        self.stats["rows"] += 1
+        self.stats["generated_tokens"] += len(sequence.generated)
+        if sequence.stop == "structure":
+            self.stats["rows_stopped"] += 1
+            self.stats["tokens_saved"] += self.max_new_tokens - len(sequence.generated)
+        return sequence.key, self.tokenizer.decode(ids, skip_special_tokens=True)
+
+    def _drop(self, rows):
+        keep = [i for i in range(len(self._rows)) if i not in rows]
+        if not keep:
+            self._layers = self._mask = None
+            self._rows = []
+            return
+        index = torch.tensor(keep, device=self._mask.device)
+        self._layers = [(k.index_select(0, index), v.index_select(0, index)) for k, v in self._layers]
+        self._mask = self._mask.index_select(0, index)
+        self._rows = [self._rows[i] for i in keep]
+
+    def _trim(self):
+        """Drop leading cache columns that are padding in every row."""
+        used = self._mask.bool().any(dim=0).nonzero()
+        start = int(used[0]) if len(used) else 0
+        if start:
+            self._layers = [(k[:, :, start:], v[:, :, start:]) for k, v in self._layers]
+            self._mask = self._mask[:, start:]
+
+    def _step(self):
+        """Decode one token for every active row."""
+        start = time.perf_counter()
+        tokens = torch.tensor([[row.generated[-1]] for row in self._rows], device=self._mask.device)
+        # The new token's position is the number of real tokens before it
+        positions = self._mask.sum(dim=1, keepdim=True)
+        mask = torch.cat([self._mask, self._mask.new_ones(len(self._rows), 1)], dim=1)
+        with torch.no_grad():
+            out = self.model(input_ids=tokens, attention_mask=mask, position_ids=positions,
+                             past_key_values=make_cache(self._layers), use_cache=True)
+        self._layers, self._mask = cache_tensors(out.past_key_values), mask
+        for row, token in zip(self._rows, out.logits[:, -1].argmax(dim=-1).tolist()):
+            self._append(row, token)
+        self.stats["steps"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+
+    def run(self, prompts):
+        """Yield (key, completion) for every (key, prompt) in prompts, in order of completion."""
+        pending = iter(prompts)
+        for key, prompt in pending:
+            self._admit(key, prompt)
+            if len(self._rows) >= self.slots:
+                break
+        while self._rows:
+            finished = [i for i, row in enumerate(self._rows) if row.stop]
+            if finished:
+                empty = []
+                for i in finished:
+                    yield self._finish(self._rows[i])
+                    # Refill the slot straight away
+                    refill = next(pending, None)
+                    if refill is None:
+                        empty.append(i)
+                    else:
+                        self._admit(*refill, row=i)
+                if empty:
+                    self._drop(empty)
+                if self._rows:
+                    self._trim()
+            # A refilled row may already be done after its first token
+            if self._rows and not any(row.stop for row in self._rows):
+                self._step()
+
+    def report(self):
+        stats = self.stats
+        rate = stats["generated_tokens"] / stats["seconds"] if stats["seconds"] else 0.0
+        return (f"🔄 Continuous batching ({self.slots} slots): {stats['rows']} sequences, "
+                f"{stats['generated_tokens']} tokens in {stats['seconds']:.1f}s ({rate:.1f} tokens/s), "
+                f"{stats['steps']} decode steps")
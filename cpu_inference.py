@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+CPU inference mode for the transformers (hf) backend.
+
+Without a GPU the model used to run in float32 with torch's default thread
+settings. CPU_MODE (config.json, or --cpu-mode) trades a little accuracy
+for speed:
+
+- "int8": dynamic int8 quantization of every nn.Linear (weights stored in
+  int8, activations quantized on the fly); roughly a quarter of the weight
+  memory and faster matmuls
+- "bf16": bfloat16 weights, only on CPUs with native bf16 (avx512_bf16 /
+  amx_bf16); elsewhere it stays float32
+- "fp32": the previous float32 path, unchanged
+
+Both optimized modes also size torch's intra-op pool to one thread per
+physical core, pinned to those cores (hyperthreads share an FPU and only
+add contention), and decode with a static KV cache that is allocated once
+per batch instead of grown token by token. bench_cpu_modes.py measures
+all three.
+"""
+
+import os
+import warnings
+
+import torch
+
+CPU_MODES = ("fp32", "int8", "bf16")
+
+
+def physical_cpus():
+    """One logical CPU per physical core (its first hyperthread), among those this process may use."""
+    if hasattr(os, "sched_getaffinity"):
+        allowed = sorted(os.sched_getaffinity(0))
+    else:
+        allowed = list(range(os.cpu_count() or 1))
+    cpus, cores = [], set()
+    for cpu in allowed:
+        try:
+            with open(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list") as f:
+                core = f.read().strip()
+        except OSError:
+            core = str(cpu)
+        if core not in cores:
+            cores.add(core)
+            cpus.append(cpu)
+    return cpus
+
+
+def pin_threads(threads=None):
+    """Run torch's intra-op threads on physical cores only; returns the thread count.
+
+    Affinity is per thread on Linux: the calling thread is pinned just long
+    enough for torch to start its OpenMP pool (the threads inherit the
+    mask), then gets its old mask back, so analysis subprocesses started
+    later can still use every CPU. Call it before the first torch
+    computation (model loading included), while there is no pool yet.
+    """
+    cpus = physical_cpus()
+    threads = threads or len(cpus)
+    torch.set_num_threads(threads)
+    if threads > len(cpus) or not hasattr(os, "sched_setaffinity"):
+        return threads
+    original = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, cpus[:threads])
+    try:
+        # Large enough to run as a parallel region, which starts the pool
+        torch.ones(1 << 22).add_(1)
+    finally:
+        os.sched_setaffinity(0, original)
+    return threads
+
+
+def bf16_supported():
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def prepare_model(model, mode):
+    """model converted for CPU_MODE mode (see the module docstring)."""
+    if mode == "int8":
+        with warnings.catch_warnings():
+            # torch.ao eager quantization warns about its migration to torchao
+            warnings.simplefilter("ignore")
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if mode == "bf16":
+        if not bf16_supported():
+            print("⚠️  This CPU has no native bfloat16; CPU mode bf16 stays in float32")
+            return model
+        return model.to(torch.bfloat16)
+    return model
+
+
+def model_variant(model):
+    """What a (prepared) model computes in, e.g. "torch.float32+int8"; keys its stored completions."""
+    quantized = any(isinstance(module, torch.ao.nn.quantized.dynamic.Linear) for module in model.modules())
+    return str(model.dtype) + ("+int8" if quantized else "")
+
+
+def cpu_mode_active(mode):
+    """Whether CPU_MODE mode changes anything here (an optimized mode and no GPU)."""
+    if mode not in CPU_MODES:
+        raise ValueError(f"unknown CPU mode {mode!r} (choose from {', '.join(CPU_MODES)})")
+    return mode != "fp32" and not torch.cuda.is_available()
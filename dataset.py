@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Lazily loaded, shardable prompt datasets.
+
+The first time a dataset file is opened it is converted into a side file of
+one normalized JSON record per line, plus an index of record offsets. Later
+opens memory-map both, so startup cost does not depend on the dataset size
+and record i is read directly without touching records 0..i-1. A transform
+(e.g. decode_xlcost) is applied once while the side file is built, not on
+every run. Side files are rebuilt when the source file changes.
+
+Supported sources: JSONL (one object per line, like xlcost_cpp_train.json)
+and JSON holding a list, or a dict whose records_key holds the list (like
+QuestionPromptForLLMs.json's "questions").
+"""
+
+import array
+import fcntl
+import json
+import mmap
+import os
+
+# Bump when the side-file layout changes
+SIDE_FILE_VERSION = 1
+
+# Field holding the natural-language task, in the order the drivers looked for it
+PROMPT_FIELDS = ("text", "task", "prompt", "question", "instruction")
+
+
+def prompt_text(item):
+    """Task description of a dataset record (xlcost "text", question-file "task", ...)."""
+    for field in PROMPT_FIELDS:
+        if item.get(field):
+            return item[field]
+    return ""
+
+
+def decode_xlcost(item):
+    """xlcost encodes newlines as NEW_LINE and "\\n" inside strings as STRNEWLINE."""
+    code = item.get("code")
+    if code:
+        item = dict(item, code=code.replace(" NEW_LINE ", "\n").replace(" STRNEWLINE ", "\\n"))
+    return item
+
+
+def parse_shard(text):
+    """'i/N' -> (i, N) with 0 <= i < N."""
+    index, count = (int(part) for part in text.split("/"))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"bad shard {text!r}: expected i/N with 0 <= i < N")
+    return index, count
+
+
+def shard_range(start, end, shard=None):
+    """Contiguous part of [start, end) that belongs to shard (i, N); the whole range without a shard."""
+    if shard is None:
+        return start, end
+    index, count = shard
+    size = end - start
+    return start + size * index // count, start + size * (index + 1) // count
+
+
+def iter_source(path, records_key=None):
+    """Yield the records of a JSONL or JSON dataset file in order."""
+    with open(path) as f:
+        head = f.read(1)
+        while head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[" or (head == "{" and records_key is not None):
+            data = json.load(f)
+            if isinstance(data, dict):
+                data = data.get(records_key, [])
+            yield from data
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Dataset:
+    """Random-access, memory-mapped view of a dataset file.
+
+    Supports len(), dataset[i], dataset[a:b] (a list) and iter_range();
+    only the records asked for are decoded.
+    """
+
+    def __init__(self, path, transform=None, records_key=None, side_dir=None):
+        self.path = path
+        self.transform = transform
+        self.records_key = records_key
+        name = os.path.basename(path) + (f".{transform.__name__}" if transform else "")
+        side_dir = side_dir or os.path.dirname(os.path.abspath(path))
+        self.records_path = os.path.join(side_dir, f".{name}.records")
+        self.index_path = self.records_path + ".idx"
+        if not self._fresh():
+            # Shards started together would all build it: one does, the others wait and reuse it
+            with open(self.records_path + ".lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if not self._fresh():
+                    self._build()
+        self._open()
+
+    def _stamp(self):
+        st = os.stat(self.path)
+        return [SIDE_FILE_VERSION, st.st_size, st.st_mtime_ns]
+
+    def _fresh(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                header = array.array("Q")
+                header.frombytes(f.read(3 * header.itemsize))
+            return header.tolist() == self._stamp() and os.path.exists(self.records_path)
+        except (OSError, ValueError):
+            return False
+
+    def _build(self):
+        """Convert the source into the records side file and its offset index (one pass)."""
+        offsets = array.array("Q", self._stamp())
+        position = 0
+        tmp_records, tmp_index = self.records_path + ".tmp", self.index_path + ".tmp"
+        with open(tmp_records, "wb") as out:
+            for item in iter_source(self.path, self.records_key):
+                if self.transform is not None:
+                    item = self.transform(item)
+                line = json.dumps(item, ensure_ascii=False).encode() + b"\n"
+                offsets.append(position)
+                out.write(line)
+                position += len(line)
+        offsets.append(position)
+        with open(tmp_index, "wb") as out:
+            offsets.tofile(out)
+        # Records first, so a valid index always points at a complete records file
+        os.replace(tmp_records, self.records_path)
+        os.replace(tmp_index, self.index_path)
+
+    def _open(self):
+        with open(self.index_path, "rb") as f:
+            self._offsets = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast("Q")[3:]
+        with open(self.records_path, "rb") as f:
+            # mmap cannot map an empty file
+            self._records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return json.loads(self._records[self._offsets[i]:self._offsets[i + 1]])
+
+    def iter_range(self, start=0, end=None):
+        """Yield (index, record) for start <= index < end."""
+        end = len(self) if end is None else min(end, len(self))
+        for i in range(start, end):
+            yield i, self[i]
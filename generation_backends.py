@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Pluggable generation backends.
+
+run_batch() and run_llm.py only need two things from a loaded model:
+generate(prompts, ...) -> completions and prompt_lengths(prompts). A
+backend provides both:
+
+- "hf": transformers AutoModelForCausalLM through batch_driver.generate_batch
+  (GPU, or CPU in float32 or the int8/bf16 CPU_MODE of cpu_inference.py)
+- "llama.cpp": quantized GGUF models through llama-cpp-python, for the
+  GPU-less analysis nodes. Each of `parallel` Llama instances decodes one
+  prompt at a time with threads // parallel threads; the GGUF file is
+  memory-mapped, so the instances share its weights and only add a KV
+  cache each. llama.cpp reuses the key/values of the prompt prefix an
+  instance saw last, so --prefix-cache is implicit there.
+
+The backend is picked in config.json ("BACKEND": "hf" or "llama.cpp") or
+with --backend; "GGUF_MODELS" maps each model name to its GGUF file, either
+a local path or "repo_id:filename" fetched into the shared model cache:
+
+    "BACKEND": "llama.cpp",
+    "THREADS": 16,
+    "GGUF_MODELS": {"deepseek-ai/deepseek-coder-1.3b-instruct":
+                    "TheBloke/deepseek-coder-1.3b-instruct-GGUF:deepseek-coder-1.3b-instruct.Q4_K_M.gguf"},
+    "LLAMA_CPP": {"parallel": 4, "n_ctx": 2048}
+"""
+
+import json
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from llama_cpp import Llama
+except ImportError:
+    Llama = None
+
+from generation_cache import file_fingerprint, model_revision
+from stopping import CStructureTracker
+
+CONFIG_FILE = "config.json"
+DEFAULT_BACKEND = "hf"
+LLAMA_CPP_DEFAULTS = {"parallel": 1, "n_ctx": 2048, "n_batch": 512}
+
+
+class BackendError(RuntimeError):
+    pass
+
+
+def backend_settings(path=CONFIG_FILE):
+    """The backend keys of config.json (BACKEND, THREADS, CPU_MODE, GGUF_MODELS, LLAMA_CPP); {} without one."""
+    try:
+        with open(path) as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {key: config[key] for key in ("BACKEND", "THREADS", "CPU_MODE", "GGUF_MODELS", "LLAMA_CPP")
+            if key in config}
+
+
+def default_threads():
+    return os.cpu_count() or 1
+
+
+class GenerationBackend:
+    """A loaded model as run_batch() uses it."""
+
+    name = None
+    revision = None  # hub commit or file fingerprint of the weights (generation_cache.py)
+    variant = None   # what else changes outputs: dtype, CPU mode, quantization
+
+    def generate(self, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True, prefix="",
+                 **sampling):
+        """Completions for prompts; same arguments and stats keys as batch_driver.generate_batch."""
+        raise NotImplementedError
+
+    def prompt_lengths(self, prompts):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class HFBackend(GenerationBackend):
+    """transformers model and tokenizer, optionally with a shared-prefix KV cache.
+
+    Without a GPU, CPU_MODE int8/bf16 quantizes or casts the model, pins
+    its threads and uses a static KV cache (cpu_inference.py).
+    """
+
+    name = "hf"
+
+    def __init__(self, model, tokenizer, prefix_cache=None, static_cache=False):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix_cache = prefix_cache
+        self.static_cache = static_cache
+
+    @classmethod
+    def load(cls, model_name, weights, settings, prompt_prefix=None):
+        from batch_driver import load_model
+        from cpu_inference import cpu_mode_active, model_variant, pin_threads, prepare_model
+        from prefix_cache import PrefixCache
+
+        cpu_mode = settings.get("CPU_MODE", "fp32")
+        optimize = cpu_mode_active(cpu_mode)
+        if optimize:
+            # Before loading: the pinned OpenMP pool starts with the first computation
+            threads = pin_threads(settings.get("THREADS"))
+        model, tokenizer = load_model(model_name, weights)
+        if optimize:
+            model = prepare_model(model, cpu_mode)
+            print(f"🧮 CPU mode {cpu_mode}: {threads} threads on physical cores, static KV cache")
+        prefix_cache = PrefixCache(model, tokenizer, prompt_prefix) if prompt_prefix else None
+        backend = cls(model, tokenizer, prefix_cache, static_cache=optimize)
+        backend.revision = model_revision(weights, model_name)
+        # From the prepared model: bf16 stays float32 on a CPU without native bfloat16
+        backend.variant = model_variant(model)
+        return backend
+
+    def generate(self, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True, prefix="",
+                 **sampling):
+        from batch_driver import generate_batch
+
+        return generate_batch(self.model, self.tokenizer, prompts, max_tokens, strip_prompt, stats,
+                              structure_stop, prefix, self.prefix_cache, self.static_cache, **sampling)
+
+    def prompt_lengths(self, prompts):
+        from batching import prompt_lengths
+
+        return prompt_lengths(self.tokenizer, prompts)
+
+    def close(self):
+        import torch
+
+        self.model = self.tokenizer = self.prefix_cache = None
+        torch.cuda.empty_cache()
+
+
+def gguf_file(model_name, settings, weights):
+    """Local path of model_name's GGUF file (see GGUF_MODELS), downloaded into the model cache if needed."""
+    spec = settings.get("GGUF_MODELS", {}).get(model_name, model_name)
+    if os.path.exists(spec):
+        return spec
+    repo_id, _, filename = spec.partition(":")
+    if not filename.endswith(".gguf"):
+        raise BackendError(f"no GGUF file for {model_name}: add it to GGUF_MODELS in {CONFIG_FILE} "
+                           f"as a path or \"repo_id:file.gguf\"")
+    from huggingface_hub import hf_hub_download
+
+    path = hf_hub_download(repo_id, filename, cache_dir=weights.root, local_files_only=weights.offline)
+    weights.touch(repo_id)
+    weights.evict(keep={repo_id})
+    return path
+
+
+class LlamaCppBackend(GenerationBackend):
+    """GGUF model served by llama.cpp instances that decode prompts in parallel."""
+
+    name = "llama.cpp"
+
+    def __init__(self, llms):
+        self.llms = llms
+        self._free = queue.Queue()
+        for llm in llms:
+            self._free.put(llm)
+        self._pool = ThreadPoolExecutor(len(llms))
+
+    @classmethod
+    def load(cls, model_name, weights, settings, prompt_prefix=None):
+        if Llama is None:
+            raise BackendError("the llama.cpp backend needs llama-cpp-python (pip install llama-cpp-python)")
+        options = dict(LLAMA_CPP_DEFAULTS, **settings.get("LLAMA_CPP", {}))
+        parallel = max(1, options.pop("parallel"))
+        threads = settings.get("THREADS") or default_threads()
+        path = gguf_file(model_name, settings, weights)
+        print(f"\n=== Loading {os.path.basename(path)} with llama.cpp: {parallel} x {max(1, threads // parallel)} "
+              f"threads ===")
+        llms = [Llama(model_path=path, n_threads=max(1, threads // parallel), verbose=False, **options)
+                for _ in range(parallel)]
+        backend = cls(llms)
+        backend.revision = file_fingerprint([path])
+        backend.variant = os.path.basename(path)
+        return backend
+
+    def _complete(self, prompt, max_tokens, structure_stop, prefix, sampling):
+        """(text, generated tokens, stopped) for one prompt on a free instance."""
+        llm = self._free.get()
+        try:
+            tracker = None
+            if structure_stop:
+                tracker = CStructureTracker()
+                tracker.feed(prefix)
+            text, tokens = "", 0
+            # One streamed chunk per generated token; closing the stream ends generation
+            for chunk in llm(prompt, max_tokens=max_tokens, stream=True, **sampling):
+                piece = chunk["choices"][0]["text"]
+                text += piece
+                tokens += 1
+                if tracker is not None and tracker.feed(piece):
+                    return text, tokens, True
+            return text, tokens, False
+        finally:
+            self._free.put(llm)
+
+    def generate(self, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True, prefix="",
+                 **sampling):
+        sequences = sampling.pop("num_return_sequences", 1)
+        if sampling.pop("do_sample", False):
+            options = {name: sampling[name] for name in ("temperature", "top_k", "top_p") if name in sampling}
+        else:
+            options = {"temperature": 0.0}  # greedy
+        rows = [prompt for prompt in prompts for _ in range(sequences)]
+        results = list(self._pool.map(lambda prompt: self._complete(prompt, max_tokens, structure_stop,
+                                                                      prefix, options), rows))
+        if stats is not None:
+            lengths = sum(self.prompt_lengths(rows))
+            # No padding: every row is decoded on its own
+            stats["prompt_tokens"] = stats.get("prompt_tokens", 0) + lengths
+            stats["padded_tokens"] = stats.get("padded_tokens", 0) + lengths
+            stats["rows"] = stats.get("rows", 0) + len(rows)
+            if structure_stop:
+                stopped = [tokens for _, tokens, done in results if done]
+                stats["rows_stopped"] = stats.get("rows_stopped", 0) + len(stopped)
+                stats["tokens_saved"] = stats.get("tokens_saved", 0) + sum(max_tokens - t for t in stopped)
+        return [text if strip_prompt else prompt + text for prompt, (text, _, _) in zip(rows, results)]
+
+    def prompt_lengths(self, prompts):
+        return [len(self.llms[0].tokenize(prompt.encode("utf-8"))) for prompt in prompts]
+
+    def close(self):
+        self._pool.shutdown()
+        self.llms = []
+
+
+BACKENDS = {backend.name: backend for backend in (HFBackend, LlamaCppBackend)}
+
+
+def load_backend(name, model_name, weights, settings=None, prompt_prefix=None):
+    """Load model_name with the named backend; settings as returned by backend_settings()."""
+    if name not in BACKENDS:
+        raise BackendError(f"unknown backend {name!r} (choose from {', '.join(BACKENDS)})")
+    settings = backend_settings() if settings is None else settings
+    return BACKENDS[name].load(model_name, weights, settings, prompt_prefix)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Persistent store of generated completions.
+
+Greedy decoding is deterministic, so a completion is fully determined by
+the model weights, the prompt and the decoding parameters. Entries are
+keyed by a hash of (model id, revision, prompt, parameters): the revision
+is the hub commit of the model's snapshot in the model cache (or a
+fingerprint of a local model directory / GGUF file), and the parameters
+include max_new_tokens, strip_prompt, the structure stop and the backend
+settings that change outputs (backend, dtype or CPU mode). A rerun with a
+different cleaner, analysis script or query suite then replays the stored
+completions into the analysis stages instead of regenerating them.
+
+Sampled generations (do_sample, num_return_sequences) are never stored.
+Entries are small JSON files in an LRU-capped directory, like the analysis
+cache.
+"""
+
+import getpass
+import hashlib
+import json
+import os
+
+from analysis_cache import AnalysisCache
+
+GENERATION_CACHE_ROOT = f"/scratch/{getpass.getuser()}/workflow/generation_cache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Bump when the stored fields or their meaning change
+CACHE_VERSION = 1
+
+
+def generation_key(model_id, revision, prompt, params):
+    """Hash of everything a greedy completion depends on."""
+    h = hashlib.sha256()
+    h.update(f"v{CACHE_VERSION}\n{model_id}\n{revision}\n".encode())
+    h.update(json.dumps(params, sort_keys=True).encode())
+    h.update(b"\0")
+    h.update(hashlib.sha256(prompt.encode()).digest())
+    return h.hexdigest()
+
+
+def file_fingerprint(paths):
+    """Stand-in revision for local weights: names, sizes and modification times of paths."""
+    h = hashlib.sha256()
+    for path in sorted(paths):
+        st = os.stat(path)
+        h.update(f"{os.path.basename(path)}:{st.st_size}:{int(st.st_mtime)}\n".encode())
+    return "local-" + h.hexdigest()[:16]
+
+
+def model_revision(weights, model_name):
+    """Commit of model_name's snapshot in the ModelCache weights, or a fingerprint of a local model
+    directory; None when the model is not available locally."""
+    snapshot = weights.local_snapshot(model_name)
+    if snapshot is None:
+        return None
+    if os.path.isdir(model_name):
+        files = [os.path.join(model_name, name) for name in os.listdir(model_name)]
+        return file_fingerprint([path for path in files if os.path.isfile(path)])
+    return os.path.basename(os.path.normpath(snapshot))
+
+
+class GenerationCache(AnalysisCache):
+    """On-disk LRU cache mapping generation_key() -> {"completion", "model", "revision"}."""
+
+    def __init__(self, root=GENERATION_CACHE_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        super().__init__(root, max_bytes)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return (f"🗃️  Generation cache: {self.hits} completions replayed, {self.misses} generated "
+                f"({rate:.1%} hit rate), {self.size() / 1e6:.1f} MB")
+
+
+class MemoizedGenerate:
+    """generate(prompts, max_tokens, strip_prompt, stats, structure_stop, **sampling) that replays stored
+    completions and only generates the prompts it has not seen.
+
+    params are the settings that change outputs beyond the call's own
+    arguments (backend, dtype or CPU mode).
+    """
+
+    def __init__(self, generate, cache, model_id, revision, params=None):
+        self.generate = generate
+        self.cache = cache
+        self.model_id = model_id
+        self.revision = revision
+        self.params = params or {}
+
+    def key(self, prompt, max_tokens, strip_prompt=True, structure_stop=True, **sampling):
+        params = dict(self.params, max_new_tokens=max_tokens, strip_prompt=strip_prompt,
+                      structure_stop=structure_stop, **sampling)
+        return generation_key(self.model_id, self.revision, prompt, params)
+
+    def lookup(self, key):
+        entry = self.cache.get(key)
+        return None if entry is None else entry["completion"]
+
+    def store(self, key, completion):
+        self.cache.put(key, {"completion": completion, "model": self.model_id, "revision": self.revision})
+
+    def __call__(self, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True, **sampling):
+        if sampling.get("do_sample") or sampling.get("num_return_sequences", 1) != 1:
+            return self.generate(prompts, max_tokens, strip_prompt, stats, structure_stop, **sampling)
+        keys = [self.key(prompt, max_tokens, strip_prompt, structure_stop, **sampling) for prompt in prompts]
+        completions = [self.lookup(key) for key in keys]
+        missing = [i for i, completion in enumerate(completions) if completion is None]
+        if missing:
+            generated = self.generate([prompts[i] for i in missing], max_tokens, strip_prompt, stats,
+                                      structure_stop, **sampling)
+            for i, completion in zip(missing, generated):
+                self.store(keys[i], completion)
+                completions[i] = completion
+        return completions
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Resident generation server.
+
+Every `python run_llm.py` re-imports torch/transformers and loads the model
+from scratch before generating a single program. The server loads the model
+once and answers generation requests over HTTP on localhost, so a client
+request costs only inference:
+
+    python generation_server.py --model deepseek-ai/deepseek-coder-1.3b-instruct &
+    GENERATION_SERVER=http://127.0.0.1:8765 python run_llm.py
+
+Endpoints (JSON in, JSON out):
+
+- GET  /health    model, device, load times and requests served
+- POST /generate  {"prompts": [...] or "prompt": "...", "model", "max_new_tokens",
+                   "strip_prompt", "structure_stop", "prefix", "prompt_prefix",
+                   sampling parameters}
+                  -> {"completions": [...], "stats": {...}, "seconds"}
+- POST /lengths   {"prompts": [...], "model"} -> {"lengths": [...]} (for --bucket)
+- POST /info      {"model"} -> /health for that model, loading it first; its
+                  "revision", "backend" and "variant" key the clients' generation cache
+
+A request naming another model makes the server swap to it, so multi-model
+drivers still load each model once. Requests are served one at a time.
+GenerationClient is the thin client used by run_llm.py and the batch
+drivers; it needs neither torch nor transformers.
+"""
+
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import model_cache
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Keyword arguments a request may pass through to model.generate()
+SAMPLING_PARAMS = ("do_sample", "temperature", "top_k", "top_p", "num_return_sequences")
+
+
+class GenerationServerError(RuntimeError):
+    pass
+
+
+class ModelHost:
+    """The resident model, loaded like the in-process drivers load it; generation is serialized with a lock.
+
+    The model goes through generation_backends.load_backend() with the same
+    BACKEND/THREADS/CPU_MODE/GGUF_MODELS settings (config.json, or the
+    --backend/--threads/--cpu-mode options), so the server generates with the
+    configuration a local run would use.
+    """
+
+    def __init__(self, weights, backend=None, settings=None):
+        from generation_backends import DEFAULT_BACKEND, backend_settings
+
+        self.weights = weights
+        self.settings = backend_settings() if settings is None else settings
+        self.backend_name = backend or self.settings.get("BACKEND", DEFAULT_BACKEND)
+        self.model_name = None
+        self.backend = None
+        self.load_seconds = None
+        self.requests = 0
+        self.prefix_caches = {}  # prompt prefix -> PrefixCache of the loaded hf model
+        self._lock = threading.Lock()
+
+    def _ensure(self, model_name):
+        from generation_backends import load_backend
+
+        if model_name is None or model_name == self.model_name:
+            if self.backend is None:
+                raise GenerationServerError("no model loaded: start with --model or name one in the request")
+            return
+        if self.backend is not None:
+            print(f"🔁 Swapping {self.model_name} -> {model_name}")
+            self.backend.close()
+            self.backend = None
+            self.prefix_caches = {}
+        start = time.perf_counter()
+        self.backend = load_backend(self.backend_name, model_name, self.weights, self.settings)
+        self.model_name = model_name
+        self.load_seconds = time.perf_counter() - start
+
+    def load(self, model_name):
+        with self._lock:
+            self._ensure(model_name)
+
+    def info(self):
+        model = getattr(self.backend, "model", None)
+        return {"model": self.model_name, "backend": self.backend_name,
+                "device": str(model.device) if model is not None else None,
+                "revision": self.backend.revision if self.backend is not None else None,
+                "variant": self.backend.variant if self.backend is not None else None,
+                "load_seconds": self.load_seconds, "loads": self.weights.loads, "requests": self.requests}
+
+    def model_info(self, request):
+        self.load(request.get("model"))
+        return self.info()
+
+    def _prefix_cache(self, prompt_prefix):
+        from prefix_cache import PrefixCache
+
+        if prompt_prefix not in self.prefix_caches:
+            self.prefix_caches[prompt_prefix] = PrefixCache(self.backend.model, self.backend.tokenizer,
+                                                            prompt_prefix)
+        return self.prefix_caches[prompt_prefix]
+
+    def generate(self, request):
+        from batching import is_out_of_memory
+        from generation_backends import HFBackend
+
+        prompts = request.get("prompts")
+        if prompts is None:
+            prompts = [request["prompt"]]
+        sampling = {name: request[name] for name in SAMPLING_PARAMS if name in request}
+        stats = {}
+        with self._lock:
+            self._ensure(request.get("model"))
+            if isinstance(self.backend, HFBackend):
+                # llama.cpp reuses the prompt prefix on its own
+                prompt_prefix = request.get("prompt_prefix")
+                self.backend.prefix_cache = self._prefix_cache(prompt_prefix) if prompt_prefix else None
+            start = time.perf_counter()
+            try:
+                completions = self.backend.generate(prompts, request["max_new_tokens"],
+                                                    request.get("strip_prompt", True), stats,
+                                                    request.get("structure_stop", True), request.get("prefix", ""),
+                                                    **sampling)
+            except RuntimeError as e:
+                # Free the failed batch's memory before the client retries it in halves
+                if is_out_of_memory(e) and isinstance(self.backend, HFBackend):
+                    import torch
+                    torch.cuda.empty_cache()
+                raise
+            self.requests += 1
+        return {"completions": completions, "stats": stats, "seconds": time.perf_counter() - start}
+
+    def lengths(self, request):
+        with self._lock:
+            self._ensure(request.get("model"))
+            return {"lengths": self.backend.prompt_lengths(request["prompts"])}
+
+
+class GenerationHandler(BaseHTTPRequestHandler):
+    host = None  # ModelHost, set by make_server()
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.host.info())
+        else:
+            self._reply(404, {"error": f"unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        routes = {"/generate": self.host.generate, "/lengths": self.host.lengths, "/info": self.host.model_info}
+        if self.path not in routes:
+            self._reply(404, {"error": f"unknown endpoint {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            self._reply(200, routes[self.path](request))
+        except Exception as e:
+            # Clients re-raise the message, so e.g. "out of memory" still reaches the OOM handling
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(host, port, model_host):
+    """HTTP server answering requests with model_host (anything with info/model_info/generate/lengths)."""
+    handler = type("Handler", (GenerationHandler,), {"host": model_host})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host, port, model_name=None, weights=None, backend=None, settings=None):
+    model_host = ModelHost(weights or model_cache.ModelCache(), backend, settings)
+    if model_name:
+        model_host.load(model_name)
+    server = make_server(host, port, model_host)
+    print(f"🛰️  Generation server on http://{host}:{port} ({model_name or 'no model loaded yet'}, "
+          f"{model_host.backend_name} backend)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class GenerationClient:
+    """Client for a running generation server; mirrors batch_driver.generate_batch()."""
+
+    def __init__(self, url, timeout=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode()
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.load(response)
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.load(e).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise GenerationServerError(message) from None
+        except urllib.error.URLError as e:
+            raise GenerationServerError(f"generation server {self.url} unreachable: {e.reason}") from None
+
+    def info(self):
+        return self._call("/health")
+
+    def model_info(self, model_name):
+        """The server's info with model_name loaded, including the revision, backend and variant it serves."""
+        return self._call("/info", {"model": model_name})
+
+    def prompt_lengths(self, prompts, model=None):
+        return self._call("/lengths", {"prompts": list(prompts), "model": model})["lengths"]
+
+    def generate(self, model_name, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True,
+                 prefix="", prompt_prefix=None, **sampling):
+        """Completions for prompts from model_name; stats accumulates the server's token counts.
+
+        With prompt_prefix, the server reuses that prefix's key/values across requests.
+        """
+        payload = dict(sampling, model=model_name, prompts=list(prompts), max_new_tokens=max_tokens,
+                       strip_prompt=strip_prompt, structure_stop=structure_stop, prefix=prefix,
+                       prompt_prefix=prompt_prefix)
+        reply = self._call("/generate", payload)
+        if stats is not None:
+            for name, value in reply["stats"].items():
+                stats[name] = stats.get(name, 0) + value
+        return reply["completions"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a model loaded and serve generation requests on localhost")
+    parser.add_argument("--model", default=None, help="model to load at startup (requests may name another)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-dir", default=model_cache.MODEL_CACHE_ROOT,
+                        help="shared model cache directory")
+    parser.add_argument("--model-cache-gb", type=float, default=model_cache.DEFAULT_MAX_BYTES / 1024 ** 3,
+                        help="size cap of the model cache; least recently used models are evicted")
+    parser.add_argument("--offline", action="store_true", default=model_cache.offline_default(),
+                        help="load models only from local snapshots, never from the hub")
+    # Same settings as the batch drivers (config.json), so the server generates like a local run
+    parser.add_argument("--backend", default=None,
+                        help="generation backend, hf or llama.cpp (default: BACKEND in config.json, else hf)")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="CPU threads for generation (default: THREADS in config.json, else every core)")
+    parser.add_argument("--cpu-mode", default=None,
+                        help="without a GPU: fp32, int8 or bf16 (default: CPU_MODE in config.json, else fp32)")
+    args = parser.parse_args()
+    # Before generation_backends imports transformers
+    model_cache.configure_environment(args.cache_dir, args.offline)
+    from cpu_inference import CPU_MODES
+    from generation_backends import BACKENDS, DEFAULT_BACKEND, HFBackend, backend_settings
+
+    settings = backend_settings()
+    backend = args.backend or settings.get("BACKEND", DEFAULT_BACKEND)
+    if backend not in BACKENDS:
+        parser.error(f"unknown backend {backend!r} (choose from {', '.join(sorted(BACKENDS))})")
+    settings["THREADS"] = args.threads or settings.get("THREADS")
+    settings["CPU_MODE"] = args.cpu_mode or settings.get("CPU_MODE", "fp32")
+    if settings["CPU_MODE"] not in CPU_MODES:
+        parser.error(f"unknown CPU mode {settings['CPU_MODE']!r} (choose from {', '.join(CPU_MODES)})")
+    weights = model_cache.ModelCache(args.cache_dir, int(args.model_cache_gb * 1024 ** 3), args.offline)
+    if settings["THREADS"] and backend == HFBackend.name:
+        import torch
+        torch.set_num_threads(settings["THREADS"])
+    serve(args.host, args.port, args.model, weights, backend, settings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Adaptive KLEE runner.
+
+analyze_only.sh gives every program the same fixed KLEE limits, so a hard
+program burns the whole timeout even when its coverage stopped growing
+after a few seconds. KleeScheduler instead watches the output directory
+while KLEE runs (run.stats for covered instructions and branches, the
+number of generated tests, and `info` for the final summary) and:
+
+- stops KLEE once coverage and tests have not grown for `plateau` seconds,
+- banks the unused part of that program's timeout and lends it to programs
+  that are still finding new paths when their own timeout is reached,
+- never spends more than a global CPU-seconds budget across the batch
+  (KLEE is single-threaded, so its run time is charged as CPU time),
+- optionally splits a global memory budget across the KLEE runs in flight.
+
+Stopped runs get SIGINT first so KLEE halts cleanly and still writes its
+tests, .err files and `info`.
+
+With a portfolio, each program instead gets one KLEE per search strategy
+(dfs, bfs, random-path, ... next to the usual nurs:covnew with merging),
+running side by side in output directories of their own. The first one to
+write an .err file wins and the others are killed; or, with race=False,
+they all run to the shared deadline and the one with the most errors wins.
+The winner's directory becomes the program's KLEE output and its strategy
+is recorded with the results.
+"""
+
+import argparse
+import ast
+import getpass
+import os
+import re
+import shutil
+import signal
+import sqlite3
+import subprocess
+import threading
+import time
+
+username = getpass.getuser()
+KLEE_BIN = f"/scratch/{username}/klee/build/bin/klee"
+KLEE_LIBS = [f"/scratch/{username}/z3-build/lib", f"/scratch/{username}/sqlite/lib"]
+
+DEFAULT_PLATEAU = 10
+DEFAULT_MIN_SECONDS = 5
+DEFAULT_POLL = 1.0
+# Seconds KLEE gets to write its output after SIGINT before it is killed
+STOP_GRACE = 10
+
+# run.stats columns that grow while KLEE still covers new code
+PROGRESS_COLUMNS = ("CoveredInstructions", "FullBranches", "PartialBranches")
+
+# Search strategies a portfolio can run; each replaces the --search and --use-merge flags of KLEE_FLAGS
+PORTFOLIO_STRATEGIES = {
+    "covnew": ["--search=nurs:covnew", "--use-merge"],
+    "dfs": ["--search=dfs"],
+    "bfs": ["--search=bfs"],
+    "random-path": ["--search=random-path"],
+    "md2u": ["--search=nurs:md2u"],
+}
+DEFAULT_PORTFOLIO = ("covnew", "dfs", "random-path", "bfs")
+
+
+class KleeBudget:
+    """CPU seconds (and optionally memory) shared by every KLEE run of a batch.
+
+    Each run reserves its timeout up front. Whatever it does not use goes back
+    to the budget and into a bank of spare seconds, which is the only source
+    for extending other runs past their timeout.
+
+    With memory_mb, each run also reserves its --max-memory (memory_mb split
+    across slots, the KLEE runs expected at once) from what is left of the
+    memory budget and gives it back when it ends, so the running KLEEs never
+    add up to more than memory_mb.
+    """
+
+    def __init__(self, total_seconds=None, memory_mb=None, slots=1):
+        self.total_seconds = total_seconds
+        self.memory_mb = memory_mb
+        self.slots = max(1, slots)
+        self.memory_used = 0
+        self.charged = 0.0
+        self.bank = 0.0
+        self.active = 0
+        self.runs = 0
+        self.stops = {}
+        self._lock = threading.Lock()
+        self._memory_freed = threading.Condition(self._lock)
+
+    def _available(self):
+        if self.total_seconds is None:
+            return float("inf")
+        return max(0.0, self.total_seconds - self.charged)
+
+    def reserve(self, seconds):
+        """Reserve up to seconds for a new run; returns what was granted."""
+        with self._lock:
+            granted = min(seconds, self._available())
+            self.charged += granted
+            if granted > 0:
+                self.active += 1
+            return granted
+
+    def extend(self, seconds):
+        """Lend up to seconds of banked spare time to a run that is still making progress."""
+        with self._lock:
+            granted = min(seconds, self.bank, self._available())
+            self.bank -= granted
+            self.charged += granted
+            return granted
+
+    def release(self, unused, stop):
+        """Settle a finished run: unused reserved seconds go back into the bank."""
+        with self._lock:
+            self.charged -= unused
+            self.bank += unused
+            self.active -= 1
+            self.runs += 1
+            self.stops[stop] = self.stops.get(stop, 0) + 1
+
+    def skipped(self):
+        with self._lock:
+            self.stops["budget"] = self.stops.get("budget", 0) + 1
+
+    def reserve_memory(self, runs=1):
+        """Reserve --max-memory for runs KLEEs started together; returns each one's share.
+
+        Waits until that much of the memory budget is free. None without a memory budget.
+        """
+        if self.memory_mb is None:
+            return None
+        share = max(1, self.memory_mb // max(self.slots, runs))
+        with self._memory_freed:
+            while self.memory_used and self.memory_used + share * runs > self.memory_mb:
+                self._memory_freed.wait()
+            self.memory_used += share * runs
+            return share
+
+    def release_memory(self, share, runs=1):
+        """Give back what reserve_memory(runs) returned."""
+        if share is None:
+            return
+        with self._memory_freed:
+            self.memory_used -= share * runs
+            self._memory_freed.notify_all()
+
+    def stats(self):
+        spent = f"{self.charged:.0f}s" + (f" of {self.total_seconds}s" if self.total_seconds is not None else "")
+        stops = ", ".join(f"{count} {stop}" for stop, count in sorted(self.stops.items()))
+        return f"🧭 KLEE scheduler: {self.runs} runs, {spent} spent, {self.bank:.0f}s spare ({stops or 'no runs'})"
+
+
+def read_run_stats(path):
+    """Last row of KLEE's run.stats as {column: value}, or {} if it cannot be read yet.
+
+    Current KLEE writes run.stats as a SQLite database; older releases write a
+    header tuple followed by one tuple per line.
+    """
+    try:
+        with open(path, "rb") as f:
+            header = f.read(16)
+    except OSError:
+        return {}
+    if header.startswith(b"SQLite format 3"):
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=1)
+            try:
+                cursor = conn.execute("SELECT * FROM stats ORDER BY rowid DESC LIMIT 1")
+                row = cursor.fetchone()
+                columns = [d[0] for d in cursor.description]
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return {}
+        return dict(zip(columns, row)) if row else {}
+    try:
+        with open(path) as f:
+            lines = [line for line in f.read().splitlines() if line.strip()]
+        if len(lines) < 2:
+            return {}
+        return dict(zip(ast.literal_eval(lines[0]), ast.literal_eval(lines[-1])))
+    except (OSError, SyntaxError, ValueError):
+        # The last line may be half written
+        return {}
+
+
+def read_info(path):
+    """Counters from the `KLEE: done:` lines KLEE appends to info when it finishes."""
+    done = {}
+    try:
+        with open(path, errors="replace") as f:
+            for line in f:
+                match = re.match(r"KLEE: done: (.+?) = (\d+)", line.strip())
+                if match:
+                    done[match.group(1)] = int(match.group(2))
+    except OSError:
+        pass
+    return done
+
+
+def progress(output_dir):
+    """Snapshot that grows whenever KLEE covers new code or finishes a new path."""
+    stats = read_run_stats(os.path.join(output_dir, "run.stats"))
+    try:
+        tests = sum(1 for name in os.listdir(output_dir) if name.endswith((".ktest", ".err")))
+    except OSError:
+        tests = 0
+    return tuple(int(stats.get(column) or 0) for column in PROGRESS_COLUMNS) + (tests,)
+
+
+def error_files(output_dir):
+    try:
+        return sorted(name for name in os.listdir(output_dir) if name.endswith(".err"))
+    except OSError:
+        return []
+
+
+def parse_portfolio(text):
+    """'covnew,dfs' -> ("covnew", "dfs"), checked against PORTFOLIO_STRATEGIES."""
+    strategies = tuple(name.strip() for name in text.split(",") if name.strip())
+    unknown = [name for name in strategies if name not in PORTFOLIO_STRATEGIES]
+    if unknown or not strategies:
+        raise ValueError(f"bad portfolio {text!r}: choose from {', '.join(PORTFOLIO_STRATEGIES)}")
+    return strategies
+
+
+def with_strategy(flags, strategy):
+    return [f for f in flags if not f.startswith("--search=") and f != "--use-merge"] + \
+        PORTFOLIO_STRATEGIES[strategy]
+
+
+def with_max_memory(flags, memory_mb):
+    if memory_mb is None:
+        return list(flags)
+    return [f for f in flags if not f.startswith("--max-memory=")] + [f"--max-memory={memory_mb}"]
+
+
+class KleeScheduler:
+    """Runs KLEE on one bitcode file at a time under a shared KleeBudget."""
+
+    def __init__(self, budget=None, plateau=DEFAULT_PLATEAU, min_seconds=DEFAULT_MIN_SECONDS,
+                 poll=DEFAULT_POLL, max_extension=None, klee_bin=None, portfolio=None, race=True):
+        self.budget = budget or KleeBudget()
+        self.plateau = plateau
+        self.min_seconds = min_seconds
+        self.poll = poll
+        # Extra seconds one run may borrow; default: as much as its own timeout
+        self.max_extension = max_extension
+        self.klee_bin = klee_bin or KLEE_BIN
+        # Search strategies run side by side per program (PORTFOLIO_STRATEGIES names)
+        self.portfolio = tuple(portfolio or ())
+        # race: the first .err ends the portfolio; otherwise every strategy runs to the deadline
+        self.race = race
+        self.wins = {}
+        self._lock = threading.Lock()
+
+    def settings(self):
+        """Scheduler settings that change what KLEE reports (hashed into analysis cache keys)."""
+        settings = f"adaptive plateau={self.plateau} min={self.min_seconds}"
+        if self.portfolio:
+            settings += f" portfolio={','.join(self.portfolio)} {'race' if self.race else 'deadline'}"
+        return settings
+
+    def stats(self):
+        if not self.portfolio:
+            return self.budget.stats()
+        wins = ", ".join(f"{count} {strategy}" for strategy, count in sorted(self.wins.items()))
+        return f"{self.budget.stats()}\n🏁 KLEE portfolio wins: {wins or 'none'}"
+
+    def env(self):
+        env = dict(os.environ)
+        env["LD_LIBRARY_PATH"] = ":".join(KLEE_LIBS + [env.get("LD_LIBRARY_PATH", "")])
+        return env
+
+    def run(self, bitcode, output_dir, timeout, flags=(), log=None):
+        """Run KLEE on bitcode into output_dir; returns a summary dict.
+
+        stop is "done" (KLEE finished), "plateau", "timeout" or "budget" (the
+        global budget ran out before or during the run).
+        """
+        if self.portfolio:
+            return self.run_portfolio(bitcode, output_dir, timeout, flags, log)
+        memory_mb = self.budget.reserve_memory()
+        allowed = self.budget.reserve(timeout)
+        if allowed <= 0:
+            self.budget.release_memory(memory_mb)
+            self.budget.skipped()
+            return {"stop": "budget", "seconds": 0.0, "extended": 0.0, "paths": 0}
+
+        cmd = [self.klee_bin, f"--output-dir={output_dir}"] + with_max_memory(flags, memory_mb) + [bitcode]
+        max_extension = timeout if self.max_extension is None else self.max_extension
+        start = time.monotonic()
+        deadline = start + allowed
+        extended = 0.0
+        last = None
+        last_progress = start
+        stop = "done"
+        proc = subprocess.Popen(cmd, env=self.env(), stdout=log or subprocess.DEVNULL,
+                                stderr=subprocess.STDOUT, start_new_session=True)
+        try:
+            while proc.poll() is None:
+                time.sleep(self.poll)
+                now = time.monotonic()
+                snapshot = progress(output_dir)
+                if snapshot != last:
+                    last, last_progress = snapshot, now
+                if now - last_progress >= self.plateau and now - start >= self.min_seconds:
+                    stop = "plateau"
+                elif now >= deadline:
+                    # Still finding new paths: borrow spare seconds from runs that stopped early
+                    granted = 0.0
+                    if extended < max_extension:
+                        granted = self.budget.extend(min(self.plateau, max_extension - extended))
+                    if granted > 0:
+                        deadline += granted
+                        extended += granted
+                        continue
+                    stop = "timeout" if allowed >= timeout else "budget"
+                else:
+                    continue
+                self._stop(proc)
+                break
+        finally:
+            if proc.poll() is None:
+                self._kill(proc)
+            elapsed = time.monotonic() - start
+            self.budget.release(max(0.0, allowed + extended - elapsed), stop)
+            self.budget.release_memory(memory_mb)
+
+        info = read_info(os.path.join(output_dir, "info"))
+        return {"stop": stop, "seconds": elapsed, "extended": extended,
+                "paths": info.get("completed paths", info.get("explored paths", 0))}
+
+    def run_portfolio(self, bitcode, output_dir, timeout, flags=(), log=None):
+        """Run one KLEE per portfolio strategy on bitcode, in output_dir.<strategy>; returns a summary dict.
+
+        Each strategy is charged to the budget as a run of its own and stops
+        on a plateau or its timeout like a single run, without borrowing
+        spare time. stop is "error" when a strategy won the race, else the
+        winner's own stop; strategy names the winner. The losers' output is
+        removed and the winner's is moved to output_dir.
+        """
+        members = []
+        for strategy in self.portfolio:
+            allowed = self.budget.reserve(timeout)
+            if allowed <= 0:
+                self.budget.skipped()
+                continue
+            members.append({"strategy": strategy, "dir": f"{output_dir}.{strategy}", "allowed": allowed,
+                            "stop": "done", "end": None, "first_error": None, "last": None})
+        if not members:
+            return {"stop": "budget", "seconds": 0.0, "extended": 0.0, "paths": 0, "strategy": None}
+
+        # Every member's memory at once, so two portfolios never wait on each other's half
+        memory_mb = self.budget.reserve_memory(len(members))
+        start = time.monotonic()
+        for member in members:
+            cmd = [self.klee_bin, f"--output-dir={member['dir']}"] + \
+                with_max_memory(with_strategy(flags, member["strategy"]), memory_mb) + [bitcode]
+            member["proc"] = subprocess.Popen(cmd, env=self.env(), stdout=log or subprocess.DEVNULL,
+                                              stderr=subprocess.STDOUT, start_new_session=True)
+            member["last_progress"] = start
+        won = None
+        try:
+            while won is None:
+                running = [member for member in members if member["end"] is None]
+                if not running:
+                    break
+                time.sleep(self.poll)
+                now = time.monotonic()
+                for member in running:
+                    if member["first_error"] is None and error_files(member["dir"]):
+                        member["first_error"] = now
+                    if member["proc"].poll() is not None:
+                        member["end"] = now
+                if self.race:
+                    found = [member for member in members if member["first_error"] is not None]
+                    if found:
+                        won = min(found, key=lambda member: member["first_error"])
+                        break
+                for member in running:
+                    if member["end"] is not None:
+                        continue
+                    snapshot = progress(member["dir"])
+                    if snapshot != member["last"]:
+                        member["last"], member["last_progress"] = snapshot, now
+                    if now - member["last_progress"] >= self.plateau and now - start >= self.min_seconds:
+                        member["stop"] = "plateau"
+                    elif now >= start + member["allowed"]:
+                        member["stop"] = "timeout" if member["allowed"] >= timeout else "budget"
+                    else:
+                        continue
+                    self._stop(member["proc"])
+                    member["end"] = time.monotonic()
+        finally:
+            for member in members:
+                if member["end"] is not None:
+                    continue
+                if member is won:
+                    # The winner still writes its tests and info
+                    self._stop(member["proc"])
+                    member["stop"] = "error"
+                else:
+                    self._kill(member["proc"])
+                    member["stop"] = "lost" if won is not None else member["stop"]
+                member["end"] = time.monotonic()
+            for member in members:
+                self.budget.release(max(0.0, member["allowed"] - (member["end"] - start)), member["stop"])
+            self.budget.release_memory(memory_mb, len(members))
+
+        if won is None:
+            # Most errors, then most completed paths; ties go to the earlier strategy
+            won = max(members, key=lambda member: (len(error_files(member["dir"])), self._paths(member["dir"])))
+        for member in members:
+            if member is not won:
+                shutil.rmtree(member["dir"], ignore_errors=True)
+        if os.path.isdir(won["dir"]):
+            shutil.rmtree(output_dir, ignore_errors=True)
+            os.rename(won["dir"], output_dir)
+        with self._lock:
+            self.wins[won["strategy"]] = self.wins.get(won["strategy"], 0) + 1
+        return {"stop": "error" if won["first_error"] is not None and self.race else won["stop"],
+                "seconds": max(member["end"] for member in members) - start, "extended": 0.0,
+                "paths": self._paths(output_dir), "strategy": won["strategy"]}
+
+    @staticmethod
+    def _paths(output_dir):
+        info = read_info(os.path.join(output_dir, "info"))
+        return info.get("completed paths", info.get("explored paths", 0))
+
+    def _stop(self, proc):
+        """Ask KLEE to halt (it still writes tests and info), then kill it if it hangs."""
+        try:
+            os.kill(proc.pid, signal.SIGINT)
+            proc.wait(timeout=STOP_GRACE)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            self._kill(proc)
+
+    def _kill(self, proc):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run KLEE on bitcode files, stopping each once coverage plateaus")
+    parser.add_argument("bitcode", nargs="+", help="bitcode files; each gets <file>.klee-out/ next to it")
+    parser.add_argument("--timeout", type=int, default=120, help="seconds per program before borrowing spare time")
+    parser.add_argument("--budget", type=int, default=None, help="total KLEE CPU seconds for all programs")
+    parser.add_argument("--memory-mb", type=int, default=None, help="memory budget split across the running KLEEs (the portfolio's strategies)")
+    parser.add_argument("--plateau", type=float, default=DEFAULT_PLATEAU,
+                        help="stop after this many seconds without new coverage or tests")
+    parser.add_argument("--flags", default="--write-test-info --search=nurs:covnew --max-memory=1024",
+                        help="extra KLEE flags")
+    parser.add_argument("--portfolio", type=parse_portfolio, default=None, metavar="STRATEGIES",
+                        help=f"race these search strategies per program, e.g. {','.join(DEFAULT_PORTFOLIO)}")
+    parser.add_argument("--portfolio-deadline", action="store_true",
+                        help="run every portfolio strategy to the deadline instead of stopping at the first error")
+    args = parser.parse_args()
+
+    scheduler = KleeScheduler(KleeBudget(args.budget, args.memory_mb), plateau=args.plateau,
+                              portfolio=args.portfolio, race=not args.portfolio_deadline)
+    for bitcode in args.bitcode:
+        run = scheduler.run(bitcode, bitcode + ".klee-out", args.timeout, args.flags.split())
+        strategy = f", {run['strategy']} won" if run.get("strategy") else ""
+        print(f"{bitcode}: {run['stop']} after {run['seconds']:.1f}s "
+              f"(+{run['extended']:.0f}s borrowed, {run['paths']} paths{strategy})")
+    print(scheduler.stats())
+
+
+if __name__ == "__main__":
+    main()
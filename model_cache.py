@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Shared HuggingFace model weight cache.
+
+Every driver points transformers at the same cache directory instead of its
+own hard-coded path, and nothing deletes the cache after a run. ModelCache
+adds what the hub cache lacks:
+
+- offline resolution: a model already in the cache is loaded from its local
+  snapshot directory, so a warm start makes no hub requests at all (no
+  re-fetch, no etag checks); in offline mode a missing model is an error
+  instead of a download
+- a size cap: after each load the least recently used models are evicted
+  until the cache fits (never the model just loaded)
+- load timing: seconds per load, and whether it was served from a snapshot
+
+The cache layout is the hub's own (models--org--name/{blobs,snapshots,refs}),
+so entries written by plain from_pretrained() calls are managed too.
+"""
+
+import argparse
+import getpass
+import os
+import shutil
+import sys
+import time
+
+MODEL_CACHE_ROOT = os.environ.get("MODEL_CACHE_DIR") or f"/scratch/{getpass.getuser()}/hf_cache"
+DEFAULT_MAX_BYTES = int(float(os.environ.get("MODEL_CACHE_MAX_GB", 100)) * 1024 ** 3)
+
+# Variables every HuggingFace library reads its cache location from
+CACHE_VARIABLES = ("HF_HOME", "HF_HUB_CACHE", "TRANSFORMERS_CACHE", "HF_DATASETS_CACHE")
+
+
+class ModelCacheError(RuntimeError):
+    pass
+
+
+def offline_default():
+    return os.environ.get("MODEL_CACHE_OFFLINE") == "1"
+
+
+def configure_environment(root=None, offline=None):
+    """Point the HuggingFace cache variables at root.
+
+    Call before transformers is imported: huggingface_hub reads them once at
+    import. Without an explicit root, variables the user already set win.
+    """
+    offline = offline_default() if offline is None else offline
+    if "huggingface_hub" in sys.modules:
+        print("⚠️  huggingface_hub was imported before the model cache was configured")
+    set_variable = os.environ.__setitem__ if root else os.environ.setdefault
+    root = root or MODEL_CACHE_ROOT
+    for name in CACHE_VARIABLES:
+        set_variable(name, root)
+    if offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    return root
+
+
+def repo_size(path):
+    """Bytes of the files under path; snapshot symlinks into blobs/ are not counted twice."""
+    total = 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            file_path = os.path.join(dirpath, name)
+            if not os.path.islink(file_path):
+                total += os.path.getsize(file_path)
+    return total
+
+
+class ModelCache:
+    """Size-capped, LRU-evicted view of a HuggingFace hub cache directory.
+
+    Recency is the repo directory's mtime, refreshed on every load, so it is
+    shared by every process using the same cache.
+    """
+
+    def __init__(self, root=MODEL_CACHE_ROOT, max_bytes=DEFAULT_MAX_BYTES, offline=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.offline = offline_default() if offline is None else offline
+        self.loads = []
+        self.evicted = []
+        os.makedirs(self.root, exist_ok=True)
+
+    def repo_dir(self, model_name):
+        return os.path.join(self.root, "models--" + model_name.replace("/", "--"))
+
+    def local_snapshot(self, model_name, revision="main"):
+        """Directory holding a complete local copy of model_name, or None."""
+        if os.path.isdir(model_name):
+            return model_name
+        repo = self.repo_dir(model_name)
+        try:
+            with open(os.path.join(repo, "refs", revision)) as f:
+                commit = f.read().strip()
+        except FileNotFoundError:
+            # revision may already be a commit hash
+            commit = revision
+        snapshot = os.path.join(repo, "snapshots", commit)
+        if os.path.exists(os.path.join(snapshot, "config.json")):
+            return snapshot
+        return None
+
+    def resolve(self, model_name, revision="main"):
+        """What to pass to from_pretrained(): the local snapshot when there is one."""
+        snapshot = self.local_snapshot(model_name, revision)
+        if snapshot is not None:
+            return snapshot
+        if self.offline:
+            raise ModelCacheError(f"{model_name} is not in {self.root} and the model cache is offline")
+        return model_name
+
+    def touch(self, model_name):
+        repo = self.repo_dir(model_name)
+        if os.path.isdir(repo):
+            os.utime(repo)
+
+    def load(self, model_name, loader, revision="main"):
+        """Time loader(path) on the resolved model, then mark it used and enforce the size cap."""
+        path = self.resolve(model_name, revision)
+        start = time.perf_counter()
+        result = loader(path)
+        seconds = time.perf_counter() - start
+        warm = path != model_name or os.path.isdir(model_name)
+        self.loads.append({"model": model_name, "seconds": seconds, "warm": warm})
+        print(f"⏱️  Loaded {model_name} in {seconds:.1f}s ({'local snapshot' if warm else 'fetched from the hub'})")
+        self.touch(model_name)
+        self.evict(keep={model_name})
+        return result
+
+    def _repos(self):
+        for name in os.listdir(self.root):
+            if name.startswith("models--"):
+                path = os.path.join(self.root, name)
+                yield path, os.stat(path).st_mtime, repo_size(path)
+
+    def size(self):
+        return sum(size for _, _, size in self._repos())
+
+    def evict(self, keep=()):
+        """Drop least recently used models until the cache fits under its cap; returns their directories."""
+        repos = sorted(self._repos(), key=lambda r: r[1])
+        total = sum(size for _, _, size in repos)
+        protected = {self.repo_dir(name) for name in keep}
+        evicted = []
+        for path, _, size in repos:
+            if total <= self.max_bytes:
+                break
+            if path in protected:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            evicted.append(path)
+            print(f"🧹 Evicted {os.path.basename(path)} ({size / 1024 ** 3:.1f} GB) from the model cache")
+        self.evicted += evicted
+        return evicted
+
+    def stats(self):
+        warm = sum(1 for load in self.loads if load["warm"])
+        seconds = sum(load["seconds"] for load in self.loads)
+        return (f"📦 Model cache: {self.size() / 1024 ** 3:.1f} of {self.max_bytes / 1024 ** 3:.0f} GB, "
+                f"{len(self.loads)} loads ({warm} from local snapshots) in {seconds:.1f}s, "
+                f"{len(self.evicted)} evicted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or trim the shared model cache")
+    parser.add_argument("--root", default=MODEL_CACHE_ROOT)
+    parser.add_argument("--max-gb", type=float, default=DEFAULT_MAX_BYTES / 1024 ** 3,
+                        help="evict least recently used models above this size")
+    parser.add_argument("--evict", action="store_true", help="enforce the size cap now")
+    args = parser.parse_args()
+
+    cache = ModelCache(args.root, int(args.max_gb * 1024 ** 3))
+    if args.evict:
+        cache.evict()
+    for path, mtime, size in sorted(cache._repos(), key=lambda r: -r[1]):
+        print(f"  {os.path.basename(path)[len('models--'):].replace('--', '/')}: {size / 1024 ** 3:.2f} GB, "
+              f"last used {time.strftime('%Y-%m-%d %H:%M', time.localtime(mtime))}")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
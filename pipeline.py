@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Producer/consumer pipeline that overlaps generation with analysis.
+
+The generation loop pushes completions onto a bounded queue and a fixed set
+of analysis workers drain it. When the analyzers fall behind, submit()
+blocks, so at most queue_size completions wait in memory. Each stage keeps
+track of the time it spends working so the run can report how well the
+two stages overlapped.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from analysis_pool import ItemAnalyzer, default_workers
+
+_STOP = object()
+
+
+class StageTimer:
+    """Accumulates busy and waiting time for one pipeline stage."""
+
+    def __init__(self, name, slots=1):
+        self.name = name
+        self.slots = slots
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def busy(self, items=1):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - start
+                self.items += items
+
+    @contextmanager
+    def waiting(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.wait_seconds += time.perf_counter() - start
+
+    def utilization(self, wall_seconds):
+        if wall_seconds <= 0:
+            return 0.0
+        return self.busy_seconds / (self.slots * wall_seconds)
+
+
+class Pipeline:
+    """Bounded queue between the generation loop and a pool of analysis worker threads.
+
+    Same interface as AnalysisPool: submit() items, then pick up
+    (key, results) pairs with completed() or drain().
+    """
+
+    def __init__(self, workers=None, queue_size=None, analyzer=None):
+        self.workers = workers or default_workers()
+        self.queue_size = queue_size or 2 * self.workers
+        self.analyzer = analyzer or ItemAnalyzer()
+
+        self.generation = StageTimer("generation")
+        self.analysis = StageTimer("analysis", slots=self.workers)
+        self.max_queued = 0
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._results = queue.Queue()
+        self._submitted = 0
+        self._returned = 0
+        self._start = time.perf_counter()
+        self._end = None
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _worker(self):
+        while True:
+            with self.analysis.waiting():
+                item = self._queue.get()
+            if item is _STOP:
+                return
+            key, code = item
+            try:
+                with self.analysis.busy():
+                    results = self.analyzer(key, code)
+            except Exception as e:
+                # No row is written, so a resumed run retries the item
+                print(f"✗ Analysis failed for {key}: {e}")
+                results = None
+            self._results.put((key, results))
+
+    def submit(self, key, code):
+        """Queue one completion; blocks while the queue is full (backpressure)."""
+        with self.generation.waiting():
+            self._queue.put((key, code))
+        self._submitted += 1
+        self.max_queued = max(self.max_queued, self._queue.qsize())
+
+    def pending(self):
+        return self._submitted - self._returned
+
+    def _take(self, block):
+        while self.pending():
+            try:
+                key, results = self._results.get(block=block)
+            except queue.Empty:
+                return
+            self._returned += 1
+            if results is not None:
+                yield key, results
+
+    def completed(self):
+        """Yield (key, results) for items that have already finished."""
+        yield from self._take(block=False)
+
+    def drain(self):
+        """Yield (key, results) for every outstanding item as it finishes."""
+        yield from self._take(block=True)
+        self._end = time.perf_counter()
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        if self._end is None:
+            self._end = time.perf_counter()
+
+    def report(self):
+        """Per-stage utilization summary for the wall-clock time since the pipeline started."""
+        wall = (self._end or time.perf_counter()) - self._start
+        gen, ana = self.generation, self.analysis
+        overlap_floor = max(gen.busy_seconds, ana.busy_seconds / ana.slots)
+        lines = [
+            "📈 Pipeline utilization:",
+            f"  Wall time: {wall:.1f}s "
+            f"(max(stage) = {overlap_floor:.1f}s, sum(stages) = {gen.busy_seconds + ana.busy_seconds / ana.slots:.1f}s)",
+            f"  Generation: {gen.utilization(wall):6.1%} busy, {gen.busy_seconds:.1f}s over {gen.items} batches, "
+            f"{gen.wait_seconds:.1f}s blocked on a full queue",
+            f"  Analysis:   {ana.utilization(wall):6.1%} busy across {ana.slots} workers, "
+            f"{ana.busy_seconds:.1f}s over {ana.items} items, {ana.wait_seconds:.1f}s idle",
+            f"  Queue: capacity {self.queue_size}, peak {self.max_queued}",
+        ]
+        return "\n".join(lines)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Shared-prefix KV cache reuse for batched generation.
+
+Every prompt of a driver starts with the same text (run_in_batch.py's
+"Write C code ... to: ", xlcost's "Task: "), and every batch used to encode
+it again. PrefixCache runs the model over the prefix once per model, keeps
+its past key/values, and hands generate() a copy for each batch, so only
+the per-prompt suffixes are encoded.
+
+Batches are laid out as [prefix][pads][suffix] instead of [pads][prefix][suffix]:
+the pads are masked out and generate() derives position ids from the
+attention mask, so every real token sees exactly the keys and positions it
+would see without the cache and greedy outputs stay the same. The prefix is
+matched on token ids: prompts are tokenized whole, as before, and the
+shared part is the longest run of leading ids they all have in common with
+the tokenized prefix text, so a prefix whose last token merges with the
+text after it is simply shortened by that token.
+"""
+
+import copy
+from collections import OrderedDict
+
+try:
+    import torch
+    from transformers import DynamicCache
+except ImportError:
+    # The layout helpers have no dependencies (tests)
+    torch = None
+    DynamicCache = None
+
+# Prefix caches kept per model (different prefix lengths when prompts end early)
+MAX_ENTRIES = 4
+
+
+def shared_length(prefix_ids, rows):
+    """Leading ids of prefix_ids that every row starts with, leaving each row at least one token."""
+    length = len(prefix_ids)
+    for row in rows:
+        n = 0
+        while n < min(length, len(row) - 1) and row[n] == prefix_ids[n]:
+            n += 1
+        length = n
+    return length
+
+
+def prefix_layout(rows, prefix_length, pad_id):
+    """[prefix][pads][suffix] input ids and attention mask for rows sharing prefix_length leading ids."""
+    width = max(len(row) for row in rows)
+    input_ids, attention_mask = [], []
+    for row in rows:
+        pads = width - len(row)
+        input_ids.append(row[:prefix_length] + [pad_id] * pads + row[prefix_length:])
+        attention_mask.append([1] * prefix_length + [0] * pads + [1] * (len(row) - prefix_length))
+    return input_ids, attention_mask
+
+
+class PrefixCache:
+    """Past key/values of one model's prompt prefix, reused by every batch."""
+
+    def __init__(self, model, tokenizer, prefix_text):
+        self.model = model
+        self.tokenizer = tokenizer
+        # Tokenized like the full prompts, so a BOS token is part of the prefix
+        self.prefix_ids = tokenizer(prefix_text)["input_ids"]
+        self.reused_tokens = 0
+        self.encoded = 0
+        self._entries = OrderedDict()
+
+    def _past(self, prefix):
+        key = tuple(prefix)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        with torch.no_grad():
+            ids = torch.tensor([prefix], device=self.model.device)
+            past = self.model(input_ids=ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
+        self.encoded += 1
+        self._entries[key] = past
+        if len(self._entries) > MAX_ENTRIES:
+            self._entries.popitem(last=False)
+        return past
+
+    def inputs(self, prompts):
+        """generate() keyword arguments for prompts, or None when they share no prefix with it."""
+        rows = self.tokenizer(prompts)["input_ids"]
+        length = shared_length(self.prefix_ids, rows)
+        if length == 0:
+            return None
+        input_ids, attention_mask = prefix_layout(rows, length, self.tokenizer.pad_token_id)
+        # generate() extends the cache in place, so every batch gets its own copy
+        past = copy.deepcopy(self._past(self.prefix_ids[:length]))
+        past.batch_repeat_interleave(len(rows))
+        self.reused_tokens += length * len(rows)
+        device = self.model.device
+        return {"input_ids": torch.tensor(input_ids, device=device),
+                "attention_mask": torch.tensor(attention_mask, device=device),
+                "past_key_values": past}
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Re-analyze stored completions without regenerating them.
+
+Rescoring a past run after fixing the cleaner or changing the CodeQL suite
+used to mean generating it again, since analyze_only.sh only knows about
+generated_code/generated_code.c. This reads the completions of a run from
+
+- an artifact pack (results.run3.pack, see artifact_pack.py),
+- a JSONL file with one {"prompt_index": N, "text": "...", "model": "..."} per
+  line ("completion" or "code" work too; model defaults to --model), or
+- a directory of kept workspaces (<model>_<index>/generated_code/generated_code.c,
+  from --keep-workspaces) and/or artifact packs,
+
+and runs clean/compile/CodeQL/KLEE over all of them in the parallel
+AnalysisPool. An item whose analysis key (cleaned source plus analysis
+settings) matches the one recorded in the baseline results database is
+copied from it instead of analyzed again. The results go to a new results
+database with its own CSV, CodeQL log and artifact pack, and the items
+that changed against the baseline are listed at the end:
+
+    python reanalyze.py xlcost_results.run3.pack
+    python reanalyze.py completions.jsonl --model deepseek-ai/deepseek-coder-1.3b-instruct --baseline old.db
+    python results_store.py xlcost_results.reanalyzed.db --diff xlcost_results.db
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+from analysis_cache import AnalysisCache, CACHE_ROOT, DEFAULT_MAX_BYTES
+from analysis_pool import (ANALYSIS_SETTINGS, ANALYSIS_TIMEOUT, CODEQL_BATCH_FAILED, WORKSPACE_ROOT, AnalysisPool,
+                           CodeQLBatcher, ItemAnalyzer, default_workers, workspace_name)
+from artifact_pack import ArtifactPack
+from build_stage import PrecompiledHeaders
+from klee_runner import DEFAULT_PLATEAU, KleeBudget, KleeScheduler, parse_portfolio
+from results_store import ResultsStore, diff_results, format_change
+from run_codeql import make_backend
+
+DEFAULT_MODEL = "stored"
+TEXT_FIELDS = ("text", "completion", "code")
+
+
+def pack_completions(path):
+    """(key, completion, pack) for the latest frame of every item in an artifact pack."""
+    pack = ArtifactPack(path)
+    for model_name, prompt_index in pack.keys():
+        artifacts = pack.get(model_name, prompt_index)
+        if "generated_code.c" in artifacts:
+            yield (model_name, prompt_index), artifacts["generated_code.c"].decode(errors="replace"), pack
+
+
+def jsonl_completions(path, model_name=DEFAULT_MODEL):
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = next((record[field] for field in TEXT_FIELDS if field in record), None)
+            if text is None or "prompt_index" not in record:
+                raise ValueError(f"{path}:{line_number}: needs prompt_index and one of {', '.join(TEXT_FIELDS)}")
+            yield (record.get("model", model_name), int(record["prompt_index"])), text, None
+
+
+def directory_completions(path, known_keys=()):
+    """Completions in kept workspaces and artifact packs under path.
+
+    Workspace names only keep a filesystem-safe form of the model name
+    (workspace_name()); it is mapped back through known_keys, else
+    "org/model" comes back as "org_model".
+    """
+    names = {workspace_name(*key): key for key in known_keys}
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        generated = os.path.join(full, "generated_code", "generated_code.c")
+        match = re.fullmatch(r"(.+)_(\d+)", name)
+        if match and os.path.isfile(generated):
+            with open(generated, errors="replace") as f:
+                yield names.get(name, (match.group(1), int(match.group(2)))), f.read(), None
+        elif name.endswith(".pack"):
+            yield from pack_completions(full)
+
+
+def stored_completions(source, model_name=DEFAULT_MODEL, known_keys=()):
+    """(key, completion, pack it came from or None) for every completion in source; the last one of a key wins."""
+    if os.path.isdir(source):
+        items = directory_completions(source, known_keys)
+    elif source.endswith(".pack"):
+        items = pack_completions(source)
+    else:
+        items = jsonl_completions(source, model_name)
+    latest = {}
+    for key, code, pack in items:
+        latest[key] = (code, pack)
+    for key in sorted(latest):
+        yield (key,) + latest[key]
+
+
+def default_baseline(source):
+    """results.db for results.run3.pack (or a directory holding results.db), if it exists."""
+    if os.path.isdir(source):
+        candidates = sorted(name for name in os.listdir(source) if name.endswith(".db"))
+        return os.path.join(source, candidates[0]) if len(candidates) == 1 else None
+    match = re.fullmatch(r"(.+)\.run\d+\.pack", source)
+    if match and os.path.exists(match.group(1) + ".db"):
+        return match.group(1) + ".db"
+    return None
+
+
+def reusable(row, analysis_key):
+    """A baseline row can stand in for a new analysis if its inputs match and it ran to completion."""
+    return (row is not None and row["analysis_key"] == analysis_key and not row["timeout"]
+            and row["klee_stop"] != "budget" and row["skipped"].get("codeql") != CODEQL_BATCH_FAILED)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Re-analyze stored completions without regenerating them")
+    parser.add_argument("source", help="artifact pack, JSONL of prompt_index -> text, or a results directory")
+    parser.add_argument("--out", default=None,
+                        help="results database to write (default: <source>.reanalyzed.db); resumes if it exists")
+    parser.add_argument("--baseline", default=None,
+                        help="results database to compare against and copy unchanged items from "
+                             "(default: results.db next to a results.run<N>.pack source)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="model name for JSONL records without one")
+    parser.add_argument("--reanalyze-all", action="store_true",
+                        help="analyze every item, even those whose inputs match the baseline")
+    parser.add_argument("--codeql-suite", default=ANALYSIS_SETTINGS["CODEQL_SUITE"],
+                        help="CodeQL query suite to run")
+    parser.add_argument("--klee-timeout", default=ANALYSIS_SETTINGS["KLEE_TIMEOUT"], help="seconds of KLEE per item")
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="number of parallel analysis workers (default: number of cores)")
+    parser.add_argument("--workspace-root", default=WORKSPACE_ROOT,
+                        help="directory holding the per-item analysis workspaces")
+    parser.add_argument("--keep-workspaces", action="store_true",
+                        help="keep each item's workspace after its results are collected")
+    parser.add_argument("--analysis-timeout", type=int, default=ANALYSIS_TIMEOUT,
+                        help="seconds allowed for analyzing one item")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always run the full analysis instead of reusing cached results")
+    parser.add_argument("--cache-dir", default=CACHE_ROOT,
+                        help="directory of the content-addressed analysis result cache")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="size cap of the analysis cache; least recently used entries are evicted")
+    parser.add_argument("--no-artifact-pack", action="store_true",
+                        help="do not keep the new artifacts in the output's pack file")
+    parser.add_argument("--pch", action="store_true",
+                        help="build each program with a precompiled copy of its leading standard includes")
+    parser.add_argument("--codeql-batch", type=int, default=0, metavar="N",
+                        help="build one CodeQL database per N programs instead of one per program")
+    parser.add_argument("--codeql-backend", choices=["subprocess", "server"],
+                        default=os.environ.get("CODEQL_BACKEND") or "subprocess",
+                        help="one-shot codeql processes, or long-lived `codeql execute cli-server` processes")
+    parser.add_argument("--codeql-servers", type=int, default=1,
+                        help="number of CodeQL server processes for --codeql-backend server")
+    parser.add_argument("--klee-adaptive", action="store_true",
+                        help="stop KLEE once coverage plateaus and lend the saved time to programs still finding paths")
+    parser.add_argument("--klee-plateau", type=float, default=DEFAULT_PLATEAU,
+                        help="seconds without new coverage or tests before --klee-adaptive stops KLEE")
+    parser.add_argument("--klee-budget", type=int, default=None, metavar="SECONDS",
+                        help="total KLEE CPU seconds for the whole run (--klee-adaptive)")
+    parser.add_argument("--klee-portfolio", type=parse_portfolio, default=None, metavar="STRATEGIES",
+                        help="run one KLEE per search strategy on each program (e.g. covnew,dfs,random-path,bfs) "
+                             "through the --klee-adaptive scheduler; the first to find an error wins")
+    parser.add_argument("--klee-portfolio-deadline", action="store_true",
+                        help="run every --klee-portfolio strategy to the deadline and keep the one with most errors")
+    return parser.parse_args(argv)
+
+
+def reanalyze(args, analyzer=None):
+    """Analyze every stored completion of args.source into args.out; returns (analyzed, reused) counts."""
+    out = args.out or f"{os.path.splitext(args.source.rstrip('/'))[0]}.reanalyzed.db"
+    baseline_path = args.baseline or default_baseline(args.source)
+    baseline = {}
+    if baseline_path is not None and os.path.abspath(baseline_path) != os.path.abspath(out):
+        with ResultsStore(baseline_path) as old:
+            baseline = old.summaries()
+        print(f"✓ Baseline: {len(baseline)} items in {baseline_path}")
+    else:
+        baseline_path = None
+
+    store = ResultsStore(out)
+    if store.count():
+        print(f"✓ Resuming from {store.count()} re-analyzed items in {out}")
+    store.start_run(f"Re-analysis of {args.source}", vars(args))
+    pack = None
+    if not args.no_artifact_pack:
+        pack = ArtifactPack(f"{os.path.splitext(out)[0]}.run{store.run_id}.pack")
+
+    settings = dict(ANALYSIS_SETTINGS, CODEQL_SUITE=args.codeql_suite, KLEE_TIMEOUT=str(args.klee_timeout))
+    cache = None if args.no_cache else AnalysisCache(args.cache_dir, args.cache_size_mb * 1024 * 1024)
+    codeql_backend = None
+    if args.codeql_backend == "server":
+        codeql_backend = make_backend("server", args.codeql_servers, args.analysis_timeout)
+    klee_scheduler = None
+    if args.klee_adaptive or args.klee_portfolio:
+        klee_scheduler = KleeScheduler(KleeBudget(args.klee_budget), plateau=args.klee_plateau,
+                                       portfolio=args.klee_portfolio, race=not args.klee_portfolio_deadline)
+    os.makedirs(args.workspace_root, exist_ok=True)
+    analyzer = analyzer or ItemAnalyzer(args.workspace_root, args.keep_workspaces, timeout=args.analysis_timeout,
+                                        settings=settings, cache=cache, skip_codeql=args.codeql_batch > 0,
+                                        codeql_backend=codeql_backend, klee_scheduler=klee_scheduler)
+    analyzer.pack = pack
+    pch = None
+    if args.pch:
+        pch = PrecompiledHeaders(os.path.join(args.workspace_root, "pch"), cflags=settings["ANALYSIS_CFLAGS"])
+        analyzer.pch = pch
+
+    start_time = time.time()
+    analyzed = reused = 0
+    pool = AnalysisPool(args.workers, analyzer)
+    if args.codeql_batch > 0:
+        pool = CodeQLBatcher(pool, args.codeql_batch, os.path.join(args.workspace_root, "codeql_batches"),
+                             suite=args.codeql_suite, cache=cache, backend=codeql_backend, pack=pack)
+    with pool:
+        for key, code, source_pack in stored_completions(args.source, args.model, baseline):
+            if store.is_done(*key):
+                continue
+            row = baseline.get(key)
+            analysis_key = analyzer.analysis_key(code)
+            if not args.reanalyze_all and reusable(row, analysis_key):
+                # Same cleaned source and settings: the baseline's results still hold
+                store.record(key, dict(row, cached=True))
+                if pack is not None:
+                    artifacts = source_pack.get(*key) if source_pack is not None else {"generated_code.c": code}
+                    pack.add(*key, artifacts, meta={"reused": baseline_path})
+                reused += 1
+                continue
+            pool.submit(key, code)
+            for done_key, results in pool.completed():
+                store.record(done_key, results)
+                analyzed += 1
+        for done_key, results in pool.drain():
+            store.record(done_key, results)
+            analyzed += 1
+
+    if codeql_backend is not None:
+        codeql_backend.close()
+    store.finish_run()
+    if pack is not None:
+        pack.close()
+    base = os.path.splitext(out)[0]
+    store.export_csv(base + ".csv")
+    store.export_codeql_log(base + "_codeql.txt", f"Aggregated CodeQL Error Log - Re-analysis of {args.source}")
+    summaries = store.summaries()
+    skips = store.skip_summary()
+    store.close()
+
+    print(f"\n✓ Re-analyzed {analyzed} items, reused {reused} unchanged items from the baseline "
+          f"in {time.time() - start_time:.0f}s")
+    if pack is not None:
+        print(pack.stats())
+    if cache is not None:
+        print(cache.stats())
+    if pch is not None:
+        print(pch.stats())
+    if klee_scheduler is not None:
+        print(klee_scheduler.stats())
+    for (stage, reason), count in sorted(skips.items()):
+        print(f"⏭️  {stage} skipped for {count} items ({reason})")
+    print(f"Results saved to: {out} (exported to {base}.csv)")
+    if baseline_path is not None:
+        # Only the items of this source; the baseline may hold other runs and models
+        changes = diff_results({key: baseline[key] for key in summaries if key in baseline}, summaries)
+        for key, changed in changes[:20]:
+            print(f"  {format_change(key, changed)}")
+        if len(changes) > 20:
+            print(f"  ... {len(changes) - 20} more: python results_store.py {out} --diff {baseline_path}")
+        print(f"📊 {len(changes)} items differ from {baseline_path}")
+    return analyzed, reused
+
+
+if __name__ == "__main__":
+    reanalyze(parse_args())
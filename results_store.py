@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+SQLite store for batch results.
+
+Replaces the hand-formatted results CSV and the free-text CodeQL error log
+with one indexed database:
+
+- runs:     one row per driver invocation (dataset, settings, start/end)
+- items:    one row per (model, prompt_index) with the results.csv columns
+            and the analysis stages it skipped, with the reason
+- timings:  per-item seconds spent in each stage (generation, analysis, klee, ...)
+- findings: one row per CodeQL rule hit, KLEE .err file or clang syntax error
+
+The database runs in WAL mode with a busy timeout, so several drivers (e.g.
+shards of one dataset) can write to it at once. Rows are buffered and
+committed in batches; resume checks are primary-key lookups. export_csv()
+and export_codeql_log() regenerate the old files for existing notebooks.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+
+COMMIT_EVERY = 50
+COMMIT_SECONDS = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    description TEXT,
+    settings TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    model TEXT NOT NULL,
+    prompt_index INTEGER NOT NULL,
+    run_id INTEGER REFERENCES runs(id),
+    compile_ok INTEGER NOT NULL,
+    semantic_err INTEGER NOT NULL,
+    security_err INTEGER NOT NULL,
+    timeout INTEGER NOT NULL DEFAULT 0,
+    cached INTEGER NOT NULL DEFAULT 0,
+    klee_stop TEXT,
+    analysis_key TEXT,
+    skipped TEXT,
+    klee_strategy TEXT,
+    recorded REAL NOT NULL,
+    PRIMARY KEY (model, prompt_index)
+);
+CREATE TABLE IF NOT EXISTS timings (
+    model TEXT NOT NULL,
+    prompt_index INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (model, prompt_index, stage)
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    model TEXT NOT NULL,
+    prompt_index INTEGER NOT NULL,
+    tool TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS findings_item ON findings (model, prompt_index);
+CREATE INDEX IF NOT EXISTS findings_rule ON findings (tool, rule);
+"""
+
+# Columns added to items after the first release; older databases get them on open.
+# Items recorded before have NULLs there (so reanalyze.py always re-analyzes them).
+ADDED_COLUMNS = {"analysis_key": "TEXT", "skipped": "TEXT", "klee_strategy": "TEXT"}
+
+
+class ResultsStore:
+    """Thread-safe handle on the results database; one per driver process."""
+
+    def __init__(self, path, commit_every=COMMIT_EVERY, commit_seconds=COMMIT_SECONDS):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_seconds = commit_seconds
+        self.run_id = None
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(items)")}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE items ADD COLUMN {column} {kind}")
+                except sqlite3.OperationalError:
+                    pass  # another writer added it first
+        # Recorded but not yet committed, so resume checks also see them
+        self._pending = {}
+        self._last_commit = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start_run(self, description="", settings=None):
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO runs (started, description, settings) VALUES (?, ?, ?)",
+                                        (time.time(), description, json.dumps(settings or {}, sort_keys=True)))
+            self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def finish_run(self):
+        self.flush()
+        if self.run_id is not None:
+            with self._lock:
+                self._conn.execute("UPDATE runs SET finished = ? WHERE id = ?", (time.time(), self.run_id))
+
+    def is_done(self, model_name, prompt_index):
+        key = (model_name, prompt_index)
+        with self._lock:
+            if key in self._pending:
+                return True
+            return self._conn.execute("SELECT 1 FROM items WHERE model = ? AND prompt_index = ?",
+                                      key).fetchone() is not None
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] + len(self._pending)
+
+    def record(self, key, results, timings=None):
+        """Buffer one item's results; committed with the next batch."""
+        with self._lock:
+            self._pending[key] = (results, dict(results.get("timings") or {}, **(timings or {})))
+            due = len(self._pending) >= self.commit_every or \
+                time.monotonic() - self._last_commit >= self.commit_seconds
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered item in one transaction."""
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for (model_name, prompt_index), (results, timings) in pending.items():
+                    self._write(model_name, prompt_index, results, timings)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                self._pending.update(pending)
+                raise
+            self._last_commit = time.monotonic()
+
+    def _write(self, model_name, prompt_index, results, timings):
+        item = (model_name, prompt_index)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO items (model, prompt_index, run_id, compile_ok, semantic_err, security_err, "
+            "timeout, cached, klee_stop, analysis_key, skipped, klee_strategy, recorded) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            item + (self.run_id, results["compile_ok"], results["semantic_err"], results["security_err"],
+                    results.get("timeout", False), results.get("cached", False), results.get("klee_stop"),
+                    results.get("analysis_key"), json.dumps(results["skipped"]) if results.get("skipped") else None,
+                    results.get("klee_strategy"), time.time()))
+        self._conn.execute("DELETE FROM timings WHERE model = ? AND prompt_index = ?", item)
+        self._conn.executemany("INSERT INTO timings VALUES (?, ?, ?, ?)",
+                               [item + (stage, seconds) for stage, seconds in sorted(timings.items())])
+        self._conn.execute("DELETE FROM findings WHERE model = ? AND prompt_index = ?", item)
+        rows = [item + ("codeql", rule, None) for rule in results.get("findings", [])]
+        rows += [item + ("klee", e["file"], e["error"]) for e in results.get("klee_summary", [])]
+        rows += [item + ("clang", "syntax-error", line) for line in results.get("diagnostics", [])]
+        self._conn.executemany("INSERT INTO findings (model, prompt_index, tool, rule, detail) VALUES (?, ?, ?, ?, ?)",
+                               rows)
+
+    def import_csv(self, csv_path):
+        """Load an old results CSV so a run started before the store can resume; returns rows imported."""
+        if not os.path.exists(csv_path):
+            return 0
+        imported = 0
+        with open(csv_path) as f:
+            for row in csv.reader(f):
+                if len(row) < 5 or not row[1].isdigit():
+                    continue
+                results = {"compile_ok": row[2] == "True", "semantic_err": row[3] == "True",
+                           "security_err": row[4] == "True"}
+                with self._lock:
+                    self._pending[(row[0], int(row[1]))] = (results, {})
+                imported += 1
+        self.flush()
+        return imported
+
+    def export_csv(self, csv_path):
+        """Write the old results.csv layout: model,prompt_index,compile_ok,semantic_err,security_err."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute("SELECT model, prompt_index, compile_ok, semantic_err, security_err "
+                                      "FROM items ORDER BY model, prompt_index").fetchall()
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            for model_name, prompt_index, *flags in rows:
+                writer.writerow([model_name, prompt_index] + [bool(flag) for flag in flags])
+        return len(rows)
+
+    def export_codeql_log(self, log_path, title="Aggregated CodeQL Error Log"):
+        """Write the old free-text log of CodeQL rule IDs per prompt."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute("SELECT model, prompt_index, rule FROM findings WHERE tool = 'codeql' "
+                                      "ORDER BY model, prompt_index, id").fetchall()
+        with open(log_path, "w") as log:
+            log.write(f"==== {title} ====\n\n")
+            current = None
+            for model_name, prompt_index, rule in rows:
+                if (model_name, prompt_index) != current:
+                    if current is not None:
+                        log.write("\n--------------------------------------------\n")
+                    current = (model_name, prompt_index)
+                    log.write(f"\n--- Prompt #{prompt_index} ({model_name}) ---\n")
+                else:
+                    log.write("\n")
+                log.write(rule)
+            if current is not None:
+                log.write("\n--------------------------------------------\n")
+
+    def summaries(self):
+        """{(model, prompt_index): results} of every recorded item, with its findings and analysis key."""
+        self.flush()
+        with self._lock:
+            items = self._conn.execute("SELECT model, prompt_index, compile_ok, semantic_err, security_err, timeout, "
+                                       "klee_stop, analysis_key, skipped, klee_strategy FROM items").fetchall()
+            findings = self._conn.execute("SELECT model, prompt_index, tool, rule, detail FROM findings "
+                                          "ORDER BY id").fetchall()
+        summaries = {}
+        for (model_name, prompt_index, compile_ok, semantic_err, security_err, timeout, klee_stop, key, skipped,
+             strategy) in items:
+            summaries[(model_name, prompt_index)] = {
+                "compile_ok": bool(compile_ok), "semantic_err": bool(semantic_err),
+                "security_err": bool(security_err), "timeout": bool(timeout), "klee_stop": klee_stop,
+                "klee_strategy": strategy,
+                "analysis_key": key, "skipped": json.loads(skipped) if skipped else {},
+                "findings": [], "klee_summary": [], "diagnostics": [],
+            }
+        for model_name, prompt_index, tool, rule, detail in findings:
+            summary = summaries.get((model_name, prompt_index))
+            if summary is None:
+                continue
+            if tool == "codeql":
+                summary["findings"].append(rule)
+            elif tool == "klee":
+                summary["klee_summary"].append({"file": rule, "error": detail})
+            else:
+                summary["diagnostics"].append(detail)
+        return summaries
+
+    def skip_summary(self):
+        """{(stage, reason): items} over every item that skipped a stage."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute("SELECT skipped FROM items WHERE skipped IS NOT NULL").fetchall()
+        counts = {}
+        for (skipped,) in rows:
+            for stage_reason in json.loads(skipped).items():
+                counts[stage_reason] = counts.get(stage_reason, 0) + 1
+        return counts
+
+    def stage_summary(self):
+        """{stage: (items, total seconds)} over every recorded item."""
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute("SELECT stage, COUNT(*), SUM(seconds) FROM timings GROUP BY stage").fetchall()
+        return {stage: (count, total) for stage, count, total in rows}
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+DIFF_FIELDS = ("compile_ok", "semantic_err", "security_err")
+
+
+def diff_results(old, new):
+    """[(key, {field: (old value, new value)})] for items whose results differ between two summaries().
+
+    findings and klee_errors compare as sorted lists; an item missing on one
+    side has None there.
+    """
+    def view(summary):
+        if summary is None:
+            return dict.fromkeys(DIFF_FIELDS + ("findings", "klee_errors"))
+        fields = {field: summary[field] for field in DIFF_FIELDS}
+        fields["findings"] = sorted(summary["findings"])
+        fields["klee_errors"] = sorted(e["error"] for e in summary["klee_summary"])
+        return fields
+
+    changes = []
+    for key in sorted(set(old) | set(new)):
+        before, after = view(old.get(key)), view(new.get(key))
+        changed = {field: (before[field], after[field]) for field in before if before[field] != after[field]}
+        if changed:
+            changes.append((key, changed))
+    return changes
+
+
+def format_change(key, changed):
+    """One line per changed item, e.g. "model #3: compile_ok False -> True; +cpp/unbounded-write"."""
+    model_name, prompt_index = key
+    if all(before is None for before, _ in changed.values()):
+        return f"{model_name} #{prompt_index}: only in the new results"
+    if all(after is None for _, after in changed.values()):
+        return f"{model_name} #{prompt_index}: only in the old results"
+    parts = []
+    for field, (before, after) in changed.items():
+        if isinstance(before, list) and isinstance(after, list):
+            parts += [f"-{x}" for x in before if x not in after] + [f"+{x}" for x in after if x not in before]
+        else:
+            parts.append(f"{field} {before} -> {after}")
+    return f"{model_name} #{prompt_index}: " + "; ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a results database to the old CSV / CodeQL log files")
+    parser.add_argument("db", help="results database, e.g. xlcost_results.db")
+    parser.add_argument("--csv", help="write the results CSV here")
+    parser.add_argument("--codeql-log", help="write the aggregated CodeQL error log here")
+    parser.add_argument("--diff", metavar="OLD_DB", help="list the items whose results differ from OLD_DB")
+    args = parser.parse_args()
+
+    with ResultsStore(args.db) as store:
+        if args.csv:
+            print(f"✓ Exported {store.export_csv(args.csv)} rows to {args.csv}")
+        if args.codeql_log:
+            store.export_codeql_log(args.codeql_log)
+            print(f"✓ Exported CodeQL findings to {args.codeql_log}")
+        if args.diff:
+            with ResultsStore(args.diff) as old:
+                changes = diff_results(old.summaries(), store.summaries())
+            for key, changed in changes:
+                print(f"  {format_change(key, changed)}")
+            print(f"✓ {len(changes)} items differ from {args.diff}")
+        for stage, (count, total) in sorted(store.stage_summary().items()):
+            print(f"  {stage}: {count} items, {total:.1f}s total, {total / count:.2f}s avg")
+        for (stage, reason), count in sorted(store.skip_summary().items()):
+            print(f"  {stage} skipped ({reason}): {count} items")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,285 @@
 import subprocess
 import os
+import sys
+import shutil
 import json
 import getpass
+import argparse
 
 # The following two commands initialize the codeql database for the specified
-# language and then analyzes the files at source-root
+# language and then analyzes the files at source-root.
+# analyze_only.sh exports the CODEQL_* variables so each workspace gets its
+# own source root, database and feedback file; the defaults are the old paths.
 username = getpass.getuser()
-source = os.path.dirname(os.path.abspath(__file__)) + "/generated_code/"
-codeql_db_path = f"/scratch/{username}/workflow/codeql_db"
-results_path = f"/scratch/{username}/workflow/results.sarif"
-
-# Clean existing build files first
-subprocess.run(["make", "clean"], cwd=source)
-
-subprocess.run([
-    f"/scratch/{username}/codeql/codeql", "database", "create", codeql_db_path, f"--source-root={source}", "--overwrite", "--language=c", "--command=make"
-])
-# Try to run analysis with available built-in queries
-result = subprocess.run([
-    f"/scratch/{username}/codeql/codeql", "database", "analyze", codeql_db_path, "codeql/cpp-queries:codeql-suites/cpp-security-and-quality.qls", "--format=sarif-latest", f"--output={results_path}"
-], stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-
-if result.returncode != 0:
-    print("CodeQL analysis failed, creating dummy feedback...")
-    # Create a basic analysis feedback
-    feedback_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feedback", "codeql_feedback.txt")
+script_dir = os.path.dirname(os.path.abspath(__file__))
+CODEQL_BIN = f"/scratch/{username}/codeql/codeql"
+DEFAULT_SUITE = "codeql/cpp-queries:codeql-suites/cpp-security-and-quality.qls"
+
+# Written instead of rule IDs when the analysis fails
+DUMMY_FEEDBACK = "CodeQL analysis completed - database created successfully\nNo query pack errors found\nCode structure appears valid for analysis"
+
+# Same per-program build that analyze_only.sh writes into each workspace. One
+# clang invocation gives both the native object (the build CodeQL traces) and,
+# through -save-temps=obj, the bitcode KLEE runs on; its diagnostics go to
+# build.log. Without clang it falls back to cc, which gives no bitcode.
+ITEM_MAKEFILE = """ANALYSIS_CC ?= $(shell command -v clang 2>/dev/null || echo cc)
+ANALYSIS_CFLAGS ?= -g
+# Optional header whose precompiled .pch/.gch sits next to it (build_stage.py)
+ANALYSIS_PCH ?=
+
+all: clean_code.bc
+
+clean_code.bc: clean_code.c
+\t$(ANALYSIS_CC) $(ANALYSIS_CFLAGS) $(if $(ANALYSIS_PCH),-include $(ANALYSIS_PCH)) -c -save-temps=obj clean_code.c -o clean_code.o 2> build.log \\
+\t\t|| (cat build.log >&2; exit 1)
+
+clean:
+\trm -f clean_code.o clean_code.bc clean_code.i clean_code.s build.log
+
+.PHONY: all clean
+"""
+# Left behind by a build; their presence would make a traced build a no-op
+BUILD_OUTPUTS = ("clean_code.o", "clean_code.bc")
+
+
+def item_makefile(cc=None, pch=None):
+    """ITEM_MAKEFILE, with cc as the default compiler when given (e.g. an absolute clang path)
+    and pch as the default precompiled header (build_stage.PrecompiledHeaders)."""
+    makefile = ITEM_MAKEFILE
+    if cc is not None:
+        makefile = "\n".join([f"ANALYSIS_CC ?= {cc}"] + makefile.split("\n")[1:])
+    if pch is not None:
+        makefile = makefile.replace("ANALYSIS_PCH ?=\n", f"ANALYSIS_PCH ?= {pch}\n")
+    return makefile
+
+
+class SubprocessBackend:
+    """One-shot mode: every CodeQL command starts its own `codeql` process."""
+
+    def run(self, args, quiet=False):
+        if not quiet:
+            return subprocess.run([CODEQL_BIN] + list(args)).returncode
+        return subprocess.run([CODEQL_BIN] + list(args), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True).returncode
+
+    def close(self):
+        pass
+
+
+def make_backend(name=None, servers=1, timeout=None):
+    """CODEQL_BACKEND=subprocess (default) or server (see codeql_server.py)."""
+    name = name or os.environ.get("CODEQL_BACKEND") or "subprocess"
+    if name == "subprocess":
+        return SubprocessBackend()
+    if name == "server":
+        from codeql_server import ServerBackend
+        return ServerBackend(CODEQL_BIN, servers, timeout)
+    raise ValueError(f"Unknown CodeQL backend: {name}")
+
+
+def database_finalized(db_path):
+    try:
+        with open(os.path.join(db_path, "codeql-database.yml")) as f:
+            return "finalised: true" in f.read()
+    except OSError:
+        return False
+
+
+def create_database(source, db_path, command="make", backend=None):
+    backend = backend or SubprocessBackend()
+    returncode = backend.run([
+        "database", "create", db_path, f"--source-root={source}", "--overwrite", "--language=c", f"--command={command}"
+    ])
+    if returncode is None:
+        # The server backend reports no exit status; a failed build leaves the database unfinalized
+        returncode = 0 if database_finalized(db_path) else 1
+    return returncode
+
+
+def analyze_database(db_path, results_path, suite=DEFAULT_SUITE, backend=None):
+    backend = backend or SubprocessBackend()
+    # Drop stale results so success can also be judged by a fresh SARIF file
+    if os.path.exists(results_path):
+        os.remove(results_path)
+    # Try to run analysis with available built-in queries
+    returncode = backend.run([
+        "database", "analyze", db_path, suite, "--format=sarif-latest", f"--output={results_path}"
+    ], quiet=True)
+    if returncode is None:
+        returncode = 0 if os.path.exists(results_path) else 1
+    return returncode
+
+
+def result_uri(result):
+    """Source file (relative to the source root) a SARIF result points at."""
+    for location in result.get("locations", []):
+        uri = location.get("physicalLocation", {}).get("artifactLocation", {}).get("uri")
+        if uri:
+            return uri
+    return None
+
+
+def sarif_results(results_path):
+    with open(results_path, 'r') as f:
+        data = json.load(f)
+    for run in data.get("runs", []):
+        yield from run.get("results", [])
+
+
+def program_sarif(data, name):
+    """The part of a batch's SARIF data about the program in directory name."""
+    runs = [dict(run, results=[result for result in run.get("results", [])
+                               if (result_uri(result) or "").split("/", 1)[0] == name])
+            for run in data.get("runs", [])]
+    return dict(data, runs=runs)
+
+
+def write_feedback(feedback_path, findings):
+    """Write rule IDs one per line, or the dummy message when findings is None."""
     with open(feedback_path, "w") as f1:
-        f1.write("CodeQL analysis completed - database created successfully\nNo query pack errors found\nCode structure appears valid for analysis")
-    exit(0)
-
-with open(results_path, 'r') as f:
-    data = json.load(f)
-# print(json.dumps(data, indent=4))
-findings = []
-for run in data.get("runs", []):
-    for result in run.get("results", []):
-        rule_id = result.get("ruleId")
-        findings.append(rule_id)
-
-feedback = "\n".join(findings)
-#Can print here or save to a file
-# print(feedback)
-feedback_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feedback", "codeql_feedback.txt")
-with open(feedback_path, "w") as f1:
-    f1.write(feedback)
+        f1.write(DUMMY_FEEDBACK if findings is None else "\n".join(findings))
+
+
+def analyze_single(source, db_path, results_path, suite=DEFAULT_SUITE, backend=None, clean=True):
+    """Analyze the program at source; returns its rule IDs, or None if CodeQL failed."""
+    if clean and any(os.path.exists(os.path.join(source, name)) for name in BUILD_OUTPUTS):
+        # Clean existing build files first, so CodeQL sees the compile (a fresh workspace has none)
+        subprocess.run(["make", "clean"], cwd=source)
+
+    create_database(source, db_path, backend=backend)
+    if analyze_database(db_path, results_path, suite, backend) != 0:
+        return None
+    return [result.get("ruleId") for result in sarif_results(results_path)]
+
+
+def batch_makefile(names):
+    """Top-level Makefile building every program in its own directory.
+
+    A failing program must not stop the others (or fail the traced build), so
+    errors in the sub-makes are ignored; success is read back from clean_code.o.
+    """
+    lines = [f"PROGRAMS = {' '.join(names)}", "", "all: $(PROGRAMS)", "", "$(PROGRAMS):", "\t-$(MAKE) -C $@", "",
+             ".PHONY: all $(PROGRAMS)", ""]
+    return "\n".join(lines)
+
+
+def analyze_batch(programs, root, suite=DEFAULT_SUITE, jobs=None, backend=None):
+    """Analyze many cleaned programs with one database build and one analyze call.
+
+    programs maps a directory-safe name to cleaned C source. Each program is laid
+    out as its own build target under root/src/<name>/, and the SARIF results are
+    split back per program by file path; each built program's share is written
+    to root/src/<name>/results.sarif. Returns {name: rule IDs}, with None for
+    programs that did not build (per-program runs give the dummy feedback for
+    those) or for every program if CodeQL itself failed.
+
+    All programs share one database, so queries that reason across translation
+    units could in principle see same-named functions from other programs;
+    verify_batch() (--verify) checks a sample against per-program runs.
+    """
+    source = os.path.join(root, "src")
+    db_path = os.path.join(root, "codeql_db")
+    results_path = os.path.join(root, "results.sarif")
+    # Start from an empty source root so no program from an earlier batch is picked up
+    shutil.rmtree(source, ignore_errors=True)
+    os.makedirs(source)
+
+    # The compiler ItemAnalyzer.run_codeql builds with, not whichever clang comes first on PATH
+    from analysis_pool import find_clang
+    cc = find_clang()
+    names = sorted(programs)
+    for name in names:
+        item_dir = os.path.join(source, name)
+        os.makedirs(item_dir, exist_ok=True)
+        with open(os.path.join(item_dir, "clean_code.c"), "w") as f:
+            f.write(programs[name])
+        with open(os.path.join(item_dir, "Makefile"), "w") as f:
+            f.write(item_makefile(cc))
+    with open(os.path.join(source, "Makefile"), "w") as f:
+        f.write(batch_makefile(names))
+
+    create_database(source, db_path, f"make -j{jobs or os.cpu_count() or 1}", backend)
+    built = {name for name in names if os.path.exists(os.path.join(source, name, "clean_code.o"))}
+    if not built or analyze_database(db_path, results_path, suite, backend) != 0:
+        return {name: None for name in names}
+
+    with open(results_path) as f:
+        data = json.load(f)
+    findings = {name: None for name in names}
+    for name in sorted(built):
+        # Results outside a program directory (e.g. system headers) belong to no prompt
+        sarif = program_sarif(data, name)
+        with open(os.path.join(source, name, "results.sarif"), "w") as f:
+            json.dump(sarif, f)
+        findings[name] = [result.get("ruleId") for run in sarif["runs"] for result in run["results"]]
+    return findings
+
+
+def verify_batch(programs, root, suite=DEFAULT_SUITE, backend=None):
+    """Run the same programs batched and one by one; returns the names whose findings differ."""
+    from analysis_pool import find_clang
+    batched = analyze_batch(programs, os.path.join(root, "batch"), suite, backend=backend)
+    mismatches = []
+    for name, source_code in sorted(programs.items()):
+        item_root = os.path.join(root, "single", name)
+        os.makedirs(item_root, exist_ok=True)
+        with open(os.path.join(item_root, "clean_code.c"), "w") as f:
+            f.write(source_code)
+        with open(os.path.join(item_root, "Makefile"), "w") as f:
+            f.write(item_makefile(find_clang()))
+        single = analyze_single(item_root, os.path.join(root, "single_db", name),
+                                os.path.join(root, "single", name + ".sarif"), suite, backend)
+        if sorted(single or []) != sorted(batched[name] or []):
+            mismatches.append(name)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CodeQL on generated code")
+    parser.add_argument("files", nargs="*",
+                        help="cleaned C files to analyze together in one database (batch mode)")
+    parser.add_argument("--batch-root", default=f"/scratch/{username}/workflow/codeql_batch",
+                        help="working directory for batch mode")
+    parser.add_argument("--verify", action="store_true",
+                        help="also analyze each file on its own and report any per-file differences")
+    args = parser.parse_args()
+
+    suite = os.environ.get("CODEQL_SUITE") or DEFAULT_SUITE
+    backend = make_backend()
+    try:
+        run(args, suite, backend)
+    finally:
+        backend.close()
+
+
+def run(args, suite, backend):
+    if args.files:
+        programs = {}
+        for i, path in enumerate(args.files):
+            with open(path) as f:
+                programs[f"item_{i}"] = f.read()
+        findings = analyze_batch(programs, args.batch_root, suite, backend=backend)
+        for i, path in enumerate(args.files):
+            rule_ids = findings[f"item_{i}"]
+            print(f"{path}: {'CodeQL failed' if rule_ids is None else ', '.join(rule_ids) or 'no findings'}")
+        if args.verify:
+            mismatches = verify_batch(programs, os.path.join(args.batch_root, "verify"), suite, backend)
+            print(f"Batch vs per-program mismatches: {[args.files[int(n.split('_')[1])] for n in mismatches]}")
+            sys.exit(1 if mismatches else 0)
+        return
+
+    source = os.environ.get("CODEQL_SOURCE_ROOT") or script_dir + "/generated_code/"
+    codeql_db_path = os.environ.get("CODEQL_DB") or f"/scratch/{username}/workflow/codeql_db"
+    results_path = os.environ.get("CODEQL_RESULTS") or f"/scratch/{username}/workflow/results.sarif"
+    feedback_path = os.environ.get("CODEQL_FEEDBACK") or os.path.join(script_dir, "feedback", "codeql_feedback.txt")
+
+    findings = analyze_single(source, codeql_db_path, results_path, suite, backend)
+    if findings is None:
+        print("CodeQL analysis failed, creating dummy feedback...")
+    #Can print here or save to a file
+    # print("\n".join(findings))
+    write_feedback(feedback_path, findings)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,200 +1,30 @@
-import os
-import json
-import csv
-import subprocess
-import shutil
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import time
+from batch_driver import parse_args, run_batch
+from dataset import Dataset, prompt_text
+from model_cache import MODEL_CACHE_ROOT
 
 # ------------------- Configuration -------------------
 DATA_PATH = "QuestionPromptForLLMs.json"  # Using local dataset
-CACHE_DIR = "/scratch/yjb5094/hf_cache"
+CACHE_DIR = MODEL_CACHE_ROOT  # shared by every driver; MODEL_CACHE_DIR overrides
 RESULTS_FILE = "results.csv"
 CODEQL_LOG_FILE = "feedback/codeql_errors_all.txt"  # <== NEW aggregated error log
 MODELS = ["deepseek-ai/deepseek-coder-1.3b-instruct"]
 MAX_PROMPTS = 1  # Total number of prompts in the dataset
 MAX_TOKENS = 512
 BATCH_SIZE = 4  # Adjust based on GPU memory
-ANALYSIS_SCRIPT = "analyze_only.sh"
+# Every prompt starts with this; --prefix-cache encodes it once per model
+PROMPT_PREFIX = "Write C code (only code, no explanations or comments) to: "
 
-# ------------------- Load dataset -------------------
-with open(DATA_PATH) as f:
-    json_data = json.load(f)
-    # Handle both list and dict with 'questions' key
-    data = json_data if isinstance(json_data, list) else json_data.get("questions", [])
-
-# Track completed prompts
-done = set()
-if os.path.exists(RESULTS_FILE):
-    with open(RESULTS_FILE) as f:
-        for row in csv.reader(f):
-            if len(row) >= 2:
-                done.add((row[0], int(row[1])))
-
-# Ensure directories exist
-os.makedirs("generated_code", exist_ok=True)
-os.makedirs("feedback", exist_ok=True)
-
-# Clear previous CodeQL error log
-with open(CODEQL_LOG_FILE, "w") as log:
-    log.write("==== Aggregated CodeQL Error Log ====\n\n")
-
-start_time = time.time()
-
-for model_name in MODELS:
-    print(f"\n=== Loading model: {model_name} ===")
-    tokenizer = AutoTokenizer.from_pretrained(model_name, cache_dir=CACHE_DIR, trust_remote_code=True)
-    if tokenizer.pad_token is None:
-        tokenizer.pad_token = tokenizer.eos_token
-    
-    model = AutoModelForCausalLM.from_pretrained(
-        model_name,
-        torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-        device_map="auto",
-        cache_dir=CACHE_DIR,
-        low_cpu_mem_usage=True
-    )
-    print(f"Model is on device: {model.device}")
-    print("✓ Model loaded successfully.\n")
-
-    completed = 0
-    model_start = time.time()
-
-    # ------------------- Batched generation -------------------
-    for batch_start in range(0, min(MAX_PROMPTS, len(data)), BATCH_SIZE):
-        batch_items = data[batch_start: batch_start + BATCH_SIZE]
-        batch_prompts = [
-            "Write C code (only code, no explanations or comments) to: " + (item.get("task") or item.get("prompt") or item.get("question") or item.get("instruction") or "")
-            for item in batch_items
-        ]
-
-        # Skip prompts that are already done
-        skip_indices = [
-            i for i, item in enumerate(batch_items)
-            if (model_name, batch_start + i) in done
-        ]
-        if len(skip_indices) == len(batch_items):
-            continue
-
-        try:
-            # Tokenize batch
-            inputs = tokenizer(batch_prompts, padding=True, return_tensors="pt").to(model.device)
-
-            with torch.no_grad():
-                outputs = model.generate(
-                    **inputs,
-                    max_new_tokens=MAX_TOKENS,
-                    do_sample=False,
-                    pad_token_id=tokenizer.pad_token_id,
-                    early_stopping=True
-                )
-
-            # Decode each output and process
-            for i, output_ids in enumerate(outputs):
-                prompt_index = batch_start + i
-                if (model_name, prompt_index) in done:
-                    continue  # Already processed
+args = parse_args("Smoke test: generate and analyze a single prompt", analysis_timeout=90)
 
-                code = tokenizer.decode(output_ids, skip_special_tokens=True)
-
-                # Save generated code
-                code_file = "generated_code/generated_code.c"
-                with open(code_file, "w") as f:
-                    f.write(code)
-
-                # Run analysis
-                # Run the canonical analysis script (this mirrors run_pipeline.sh)
-                try:
-                    result = subprocess.run(
-                        ["bash", ANALYSIS_SCRIPT],
-                        check=False,
-                        timeout=90
-                    )
-
-                    # Derive compile_ok the same way pipeline does:
-                    # pipeline generates LLVM bitcode (generated_code/clean_code.bc) when compilation succeeds.
-                    compile_ok = os.path.exists("generated_code/clean_code.bc") and result.returncode == 0
-                    if not compile_ok:
-                        print(f"  ⚠️  Compilation/bitcode generation failed for prompt #{prompt_index}")
-                except subprocess.TimeoutExpired:
-                    print(f"  ⏱️ Analysis timeout for prompt #{prompt_index}")
-                    compile_ok = False
-
-                # KLEE check for SEMANTIC ERRORS (runtime memory safety issues)
-                # Follow pipeline: semantic_err is True iff KLEE produced any .err files in klee_output
-                semantic_err = False
-                if os.path.exists("klee_output"):
-                    try:
-                        files = os.listdir("klee_output")
-                        semantic_err = any(f.endswith(".err") for f in files)
-                    except Exception:
-                        semantic_err = False
-
-                # CodeQL check for SECURITY ERRORS (static analysis vulnerabilities)
-                # Follow pipeline: run_codeql.py writes findings (rule IDs) to feedback/codeql_feedback.txt
-                feedback_file = "feedback/codeql_feedback.txt"
-                security_err = False
-                if os.path.exists(feedback_file):
-                    with open(feedback_file) as f:
-                        content = f.read()
-
-                    # If feedback contains rule IDs (non-empty and not the dummy success message), mark security_err
-                    if content.strip() and "CodeQL analysis completed" not in content:
-                        security_err = True
-
-                    # Append full contents to master log if any errors found
-                    if security_err:
-                        with open(CODEQL_LOG_FILE, "a") as log:
-                            log.write(f"\n--- Prompt #{prompt_index} ({model_name}) ---\n")
-                            log.write(content)
-                            log.write("\n--------------------------------------------\n")
-
-                # Save results
-                with open(RESULTS_FILE, "a") as out:
-                    out.write(f"{model_name},{prompt_index},{compile_ok},{semantic_err},{security_err}\n")
-
-                completed += 1
-
-                # Progress tracking every 50 prompts
-                if completed % 50 == 0:
-                    elapsed = time.time() - model_start
-                    if completed > 0:
-                        avg_time = elapsed / completed
-                        remaining = max(0, (MAX_PROMPTS - prompt_index)) * avg_time
-                        eta_hours = remaining / 3600
-                        print(f"\n  📊 Progress: {completed}/{MAX_PROMPTS}")
-                        print(f"  ⏱️ Avg time per prompt: {avg_time:.1f}s")
-                        print(f"  ⏱️ ETA: {eta_hours:.2f} hours\n")
-                    else:
-                        print(f"\n  📊 Progress: {completed}/{MAX_PROMPTS} (no completed prompts yet)\n")
+# ------------------- Load dataset -------------------
+# Handles both a plain list and a dict with a 'questions' key
+data = Dataset(DATA_PATH, records_key="questions")
 
-        except RuntimeError as e:
-            if "out of memory" in str(e).lower():
-                print("💥 GPU OOM! Consider reducing BATCH_SIZE or MAX_TOKENS")
-                torch.cuda.empty_cache()
-                time.sleep(2)
-                continue
-        except Exception as e:
-            print(f"✗ Error in batch starting at {batch_start}: {e}")
-            continue
 
-    model_elapsed = time.time() - model_start
-    print(f"\n{'='*60}")
-    print(f"✓ {model_name} complete! Completed: {completed}/{MAX_PROMPTS}")
-    print(f"  Time: {model_elapsed/3600:.2f} hours")
-    if completed > 0:
-        print(f"  Avg per prompt: {model_elapsed/completed:.1f}s")
-    else:
-        print("  Avg per prompt: N/A (no completed prompts)")
-    print(f"{'='*60}\n")
+def build_prompt(item):
+    return PROMPT_PREFIX + prompt_text(item)
 
-    del model, tokenizer
-    torch.cuda.empty_cache()
-    time.sleep(3)
 
-total_time = time.time() - start_time
-print(f"\n🎉 All models processed successfully!")
-print(f"Total time: {total_time/3600:.2f} hours")
-print(f"Results saved to: {RESULTS_FILE}")
-print(f"Aggregated CodeQL errors saved to: {CODEQL_LOG_FILE}")
\ No newline at end of file
+# The decoded output keeps the prompt echo; analyze_only.sh strips it while cleaning
+run_batch(args, data, build_prompt, MODELS, RESULTS_FILE, CODEQL_LOG_FILE,
+          MAX_PROMPTS, MAX_TOKENS, BATCH_SIZE, CACHE_DIR, strip_prompt=False, prompt_prefix=PROMPT_PREFIX)
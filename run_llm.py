@@ -1,21 +1,10 @@
-import torch
 import sys
 import json
 import os
 import tempfile
-import shutil
-from transformers import AutoTokenizer, AutoModelForCausalLM
 
-# Set cache directory to /scratch/$whoami
-cache_dir = f"/scratch/{os.getlogin()}/hf_cache"
-os.makedirs(cache_dir, exist_ok=True)
-print(f"Using cache directory: {cache_dir}")
-
-# Set all HuggingFace cache environment variables to scratch directory
-os.environ['HF_HOME'] = cache_dir
-os.environ['TRANSFORMERS_CACHE'] = cache_dir
-os.environ['HF_DATASETS_CACHE'] = cache_dir
-os.environ['HF_HUB_CACHE'] = cache_dir
+import model_cache
+from generation_server import GenerationClient
 
 with open("config.json", "r") as f:
     config = json.load(f)
@@ -23,71 +12,163 @@ with open("config.json", "r") as f:
 # Create output directory
 os.makedirs("generated_code", exist_ok=True)
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"Using device: {device}")
-
 model_path = config["MODEL_PATH"]
 text = config["PROMPT"]
 
-print(f"Loading model: {model_path}")
-
-# Initialize tokenizer with explicit cache directory
-tokenizer = AutoTokenizer.from_pretrained(
-    model_path, 
-    trust_remote_code=True,
-    cache_dir=cache_dir,
-    local_files_only=False
-)
-
-# Add padding token if it doesn't exist
-if tokenizer.pad_token is None:
-    tokenizer.pad_token = tokenizer.eos_token
-
-# Initialize model with explicit cache directory
-if device == "cuda":
-    model = AutoModelForCausalLM.from_pretrained(
-        model_path, 
-        trust_remote_code=True, 
-        dtype=torch.float16,
-        cache_dir=cache_dir,
-        local_files_only=False,
-        use_safetensors=True
-    ).cuda()
-else:
-    model = AutoModelForCausalLM.from_pretrained(
-        model_path, 
-        trust_remote_code=True,
-        cache_dir=cache_dir,
-        local_files_only=False,
-        use_safetensors=True
+# Simple text prompt for base models
+prompt_text = f"// {text}\n#include <stdio.h>\n\nint main() {{\n"
+
+# The prompt already opens main(), so stop each sequence once its body is closed
+structure_stop = config.get("structure_stop", True)
+
+SAMPLING = {
+    "do_sample": True,
+    "temperature": 0.7,
+    "top_k": 50,
+    "top_p": 0.95,
+    "num_return_sequences": config["num_return_sequences"],
+}
+
+# A running generation_server.py keeps the model loaded between runs
+server_url = os.environ.get("GENERATION_SERVER") or config.get("GENERATION_SERVER")
+
+# "llama.cpp" generates from a quantized GGUF file on CPU (see generation_backends.py)
+backend_name = config.get("BACKEND", "hf")
+
+
+def generate_with_server(url):
+    print(f"Generating code through {url} ...")
+    stats = {}
+    completions = GenerationClient(url).generate(model_path, [prompt_text], config["max_new_tokens"],
+                                                 stats=stats, structure_stop=structure_stop, prefix=prompt_text,
+                                                 **SAMPLING)
+    if structure_stop:
+        print(f"✂️  Structure stop: {stats['rows_stopped']}/{stats['rows']} sequences stopped "
+              f"after main, {stats['tokens_saved']} new tokens saved")
+    return completions[0].strip()
+
+
+def generate_with_llama_cpp():
+    from generation_backends import backend_settings, load_backend
+
+    offline = config.get("OFFLINE", model_cache.offline_default())
+    weights = model_cache.ModelCache(model_cache.configure_environment(model_cache.MODEL_CACHE_ROOT, offline),
+                                     offline=offline)
+    backend = load_backend("llama.cpp", model_path, weights, backend_settings())
+    print("Generating code...")
+    stats = {}
+    completions = backend.generate([prompt_text], config["max_new_tokens"], stats=stats,
+                                   structure_stop=structure_stop, prefix=prompt_text, **SAMPLING)
+    backend.close()
+    if structure_stop:
+        print(f"✂️  Structure stop: {stats['rows_stopped']}/{stats['rows']} sequences stopped "
+              f"after main, {stats['tokens_saved']} new tokens saved")
+    return completions[0].strip()
+
+
+def generate_locally():
+    # Shared model cache (/scratch/$USER/hf_cache unless MODEL_CACHE_DIR is set); kept between runs
+    offline = config.get("OFFLINE", model_cache.offline_default())
+    cache_dir = model_cache.configure_environment(model_cache.MODEL_CACHE_ROOT, offline)
+    max_bytes = int(config["MODEL_CACHE_MAX_GB"] * 1024 ** 3) if "MODEL_CACHE_MAX_GB" in config \
+        else model_cache.DEFAULT_MAX_BYTES
+    weights = model_cache.ModelCache(cache_dir, max_bytes, offline)
+    print(f"Using cache directory: {cache_dir}")
+
+    # Imported only now: huggingface_hub reads the cache variables at import
+    import torch
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    from cpu_inference import cpu_mode_active, pin_threads, prepare_model
+    from stopping import MainClosedCriteria
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print(f"Using device: {device}")
+
+    # Without a GPU, "CPU_MODE": "int8" or "bf16" (see cpu_inference.py)
+    cpu_mode = config.get("CPU_MODE", "fp32")
+    optimize = cpu_mode_active(cpu_mode)
+    if optimize:
+        print(f"CPU mode {cpu_mode}: {pin_threads(config.get('THREADS'))} threads on physical cores")
+
+    print(f"Loading model: {model_path}")
+
+    def load(path):
+        # Initialize tokenizer with explicit cache directory
+        tokenizer = AutoTokenizer.from_pretrained(
+            path,
+            trust_remote_code=True,
+            cache_dir=cache_dir,
+            local_files_only=offline
+        )
+
+        # Initialize model with explicit cache directory
+        if device == "cuda":
+            model = AutoModelForCausalLM.from_pretrained(
+                path,
+                trust_remote_code=True,
+                dtype=torch.float16,
+                cache_dir=cache_dir,
+                local_files_only=offline,
+                use_safetensors=True
+            ).cuda()
+        else:
+            model = AutoModelForCausalLM.from_pretrained(
+                path,
+                trust_remote_code=True,
+                cache_dir=cache_dir,
+                local_files_only=offline,
+                use_safetensors=True
+            )
+        return tokenizer, model
+
+    tokenizer, model = weights.load(model_path, load)
+    if optimize:
+        model = prepare_model(model, cpu_mode)
+
+    # Add padding token if it doesn't exist
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    print(f"Model loaded successfully on {device}")
+    print(weights.stats())
+
+    inputs = tokenizer(prompt_text, return_tensors='pt').to(model.device)
+
+    stopping = None
+    if structure_stop:
+        stopping = MainClosedCriteria(tokenizer, inputs.input_ids.shape[1], config["max_new_tokens"],
+                                      prefix=prompt_text)
+
+    print("Generating code...")
+    outputs = model.generate(
+        inputs.input_ids,
+        max_new_tokens=config["max_new_tokens"],
+        **SAMPLING,
+        eos_token_id=tokenizer.eos_token_id,
+        pad_token_id=tokenizer.eos_token_id,
+        stopping_criteria=[stopping] if stopping else None,
+        cache_implementation="static" if optimize else None
     )
 
-print(f"Model loaded successfully on {device}")
+    if stopping is not None:
+        print(f"✂️  Structure stop: {len(stopping.stopped_at)}/{config['num_return_sequences']} sequences stopped "
+              f"after main, {stopping.tokens_saved()} new tokens saved")
 
-# Simple text prompt for base models
-prompt_text = f"// {text}\n#include <stdio.h>\n\nint main() {{\n"
+    # Extract only the newly generated tokens (skip the prompt tokens)
+    # When using generate(), outputs[0] contains all tokens including the prompt
+    # We need to skip exactly prompt_token_length tokens to get only generated content
+    prompt_token_length = inputs.input_ids.shape[1]
+    generated_token_ids = outputs[0][prompt_token_length:]
+    return tokenizer.decode(generated_token_ids, skip_special_tokens=True).strip()
 
-inputs = tokenizer(prompt_text, return_tensors='pt').to(model.device)
-
-print("Generating code...")
-outputs = model.generate(
-    inputs.input_ids,
-    max_new_tokens=config["max_new_tokens"],
-    do_sample=True,
-    temperature=0.7,
-    top_k=50,
-    top_p=0.95,
-    num_return_sequences=config["num_return_sequences"],
-    eos_token_id=tokenizer.eos_token_id,
-    pad_token_id=tokenizer.eos_token_id
-)
-
-# Extract only the newly generated tokens (skip the prompt tokens)
-# When using generate(), outputs[0] contains all tokens including the prompt
-# We need to skip exactly prompt_token_length tokens to get only generated content
-prompt_token_length = inputs.input_ids.shape[1]
-generated_token_ids = outputs[0][prompt_token_length:]
-code = tokenizer.decode(generated_token_ids, skip_special_tokens=True).strip()
+
+if server_url:
+    code = generate_with_server(server_url)
+elif backend_name == "llama.cpp":
+    code = generate_with_llama_cpp()
+else:
+    code = generate_locally()
 
 # Add the full program structure
 full_code = f"{prompt_text}{code}"
@@ -99,11 +180,3 @@ with open("generated_code/generated_code.c", "w") as f:
     f.write(full_code)
 
 print(f"Code saved to: generated_code/generated_code.c")
-
-# Clean up cache directory
-print("Cleaning up cache...")
-try:
-    shutil.rmtree(cache_dir)
-    print("Cache cleanup complete")
-except Exception as e:
-    print(f"Warning: Could not clean up cache directory: {e}")
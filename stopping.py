@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Structure-aware stopping for C code generation.
+
+Models keep generating after the program is complete (explanations, test
+cases, a second copy of the code) until max_new_tokens, and the cleaner
+then throws that text away. CStructureTracker follows the decoded stream
+character by character (braces, strings, character literals, comments and
+preprocessor lines) and reports when the program is complete: main's body
+has been closed and every function declared at file scope has also been
+defined, so helpers defined after main are not cut off.
+
+MainClosedCriteria plugs the tracker into model.generate() as a per-row
+stopping criterion: a finished row stops producing tokens (it is padded
+until the rest of the batch finishes) and generation ends as soon as every
+row is done.
+"""
+
+try:
+    import torch
+    from transformers import StoppingCriteria
+except ImportError:
+    # The tracker itself has no dependencies (tests, analysis-only hosts)
+    torch = None
+    StoppingCriteria = object
+
+CODE, LINE_COMMENT, BLOCK_COMMENT, STRING, CHAR, PREPROCESSOR = range(6)
+
+
+class CStructureTracker:
+    """Incremental brace/string/comment tracker over generated C text.
+
+    Only file-scope structure matters: an identifier followed by a
+    parenthesized list and then `{` defines a function, followed by `;` or
+    `,` declares one. String and character state ends at a newline, so an
+    apostrophe in surrounding prose cannot swallow the program.
+    """
+
+    def __init__(self):
+        self.state = CODE
+        self.depth = 0
+        self.parens = 0
+        self.escape = False
+        self.line_start = True
+        self.word = ""
+        self.last_word = ""
+        self.groups = 0         # parenthesized groups so far in this file-scope declaration
+        self.candidate = None   # function name whose parameter list is open
+        self.pending = None     # function name whose parameter list just closed
+        self.declared = set()
+        self.defined = set()
+        self.main_open = False
+        self.done = False
+        self._previous = ""
+
+    def feed(self, text):
+        """Consume more text; returns True once the program is complete."""
+        for ch in text:
+            if self.done:
+                break
+            # A comment delimiter's characters must not start another one
+            self._previous = self._step(ch) or ch
+        return self.done
+
+    def _step(self, ch):
+        state = self.state
+        if ch == "\n":
+            if state == PREPROCESSOR and self._previous == "\\":
+                return
+            if state in (LINE_COMMENT, STRING, CHAR, PREPROCESSOR):
+                self.state = CODE
+            self.escape = False
+            self.line_start = True
+            self._end_word()
+            if self.parens == 0:
+                self.groups = 0
+            return
+        if state == BLOCK_COMMENT:
+            if ch == "/" and self._previous == "*":
+                self.state = CODE
+                return " "
+            return None
+        if state in (STRING, CHAR):
+            if self.escape:
+                self.escape = False
+            elif ch == "\\":
+                self.escape = True
+            elif ch == ('"' if state == STRING else "'"):
+                self.state = CODE
+            return
+        if state in (LINE_COMMENT, PREPROCESSOR):
+            return
+
+        # CODE
+        if self.line_start and not ch.isspace():
+            self.line_start = False
+            if ch == "#":
+                self.state = PREPROCESSOR
+                return
+        if ch == "/" and self._previous == "/":
+            self.state = LINE_COMMENT
+            return
+        if ch == "*" and self._previous == "/":
+            self.state = BLOCK_COMMENT
+            return " "
+        if ch == '"':
+            self.state = STRING
+            return
+        if ch == "'":
+            self.state = CHAR
+            return
+        if ch.isalnum() or ch == "_":
+            self.word += ch
+            return
+        self._end_word()
+        if ch.isspace() or ch == "/":
+            return
+        self._symbol(ch)
+
+    def _end_word(self):
+        if self.word:
+            self.last_word = self.word
+            self.word = ""
+            if self.pending is not None and self.parens == 0:
+                # e.g. `int f(void) __attribute__(...)` or prose: not a plain declaration
+                self.pending = None
+
+    def _symbol(self, ch):
+        if self.depth == 0:
+            if ch == "(":
+                if self.parens == 0:
+                    # Only `name(` first in a declaration; not `int (*fp)(int)`
+                    self.candidate = (self.last_word or None) if self.groups == 0 else None
+                    self.pending = None
+                    self.groups += 1
+                self.parens += 1
+                return
+            if ch == ")" and self.parens > 0:
+                self.parens -= 1
+                if self.parens == 0:
+                    self.pending, self.candidate = self.candidate, None
+                return
+            if self.parens == 0 and self.pending is not None:
+                if ch == "{":
+                    self.defined.add(self.pending)
+                    self.main_open = self.main_open or self.pending == "main"
+                elif ch in ";,":
+                    self.declared.add(self.pending)
+                self.pending = None
+            if ch in ";,{" and self.parens == 0:
+                self.groups = 0
+        if ch == "{":
+            self.depth += 1
+        elif ch == "}" and self.depth > 0:
+            self.depth -= 1
+            if self.depth == 0:
+                self.groups = 0
+                if self.main_open and self.declared <= self.defined:
+                    self.done = True
+        self.last_word = ""
+
+
+class TokenStreamTracker:
+    """CStructureTracker fed with the token ids of one generated sequence.
+
+    Text is decoded incrementally from the start of the current line, so
+    decoding stays cheap however long the completion gets.
+    """
+
+    def __init__(self, tokenizer, prefix=""):
+        self.tokenizer = tokenizer
+        self.tracker = CStructureTracker()
+        self.tracker.feed(prefix)
+        self._line_start = 0
+        self._decoded = ""
+
+    @property
+    def done(self):
+        return self.tracker.done
+
+    def update(self, ids):
+        """ids: every token generated so far; returns True once the program is complete."""
+        if self.tracker.done:
+            return True
+        text = self.tokenizer.decode(ids[self._line_start:], skip_special_tokens=True,
+                                     clean_up_tokenization_spaces=False)
+        # An incomplete multi-byte character decodes to U+FFFD; wait for the rest
+        if text.endswith("\ufffd"):
+            return False
+        new = text[len(self._decoded):]
+        self.tracker.feed(new)
+        if "\n" in new:
+            self._line_start, self._decoded = len(ids), ""
+        else:
+            self._decoded = text
+        return self.tracker.done
+
+
+class MainClosedCriteria(StoppingCriteria):
+    """Per-row stopping criterion for model.generate(): stop once the row's C program is complete.
+
+    prompt_length is the (padded) prompt width of the batch; prefix is C
+    text the prompt already contains (e.g. run_llm.py's `int main() {`).
+    """
+
+    def __init__(self, tokenizer, prompt_length, max_new_tokens, prefix=""):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.max_new_tokens = max_new_tokens
+        self.prefix = prefix
+        self.trackers = None
+        self.stopped_at = {}
+
+    def __call__(self, input_ids, scores, **kwargs):
+        if self.trackers is None:
+            self.trackers = [TokenStreamTracker(self.tokenizer, self.prefix) for _ in range(input_ids.shape[0])]
+        generated = input_ids.shape[1] - self.prompt_length
+        done = []
+        for row, tracker in enumerate(self.trackers):
+            if not tracker.done and tracker.update(input_ids[row, self.prompt_length:]):
+                self.stopped_at[row] = generated
+            done.append(tracker.done)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def tokens_saved(self):
+        """New tokens the stopped rows did not have to generate."""
+        return sum(self.max_new_tokens - n for n in self.stopped_at.values())
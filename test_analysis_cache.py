@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Check the content-addressed analysis cache and its use by ItemAnalyzer."""
+
+import os
+import re
+import tempfile
+import time
+
+from analysis_cache import AnalysisCache, cache_key
+from analysis_pool import ANALYSIS_SETTINGS, ItemAnalyzer
+
+# Stand-in for analyze_only.sh that counts full runs
+FAKE_SCRIPT = r"""
+[ "$SKIP_CLEAN" = "1" ] || exit 1
+echo run >> "$RUN_LOG"
+touch "$WORK_DIR/clean_code.bc"
+mkdir -p "$KLEE_OUTPUT"
+echo "Error: memory error: out of bound pointer" > "$KLEE_OUTPUT/test000001.ptr.err"
+printf "cpp/missing-check-scanf\ncpp/unbounded-write" > "$CODEQL_FEEDBACK"
+"""
+
+
+def test_key_depends_on_source_and_settings():
+    other = dict(ANALYSIS_SETTINGS, KLEE_TIMEOUT="30")
+    assert cache_key("int main(){}", ANALYSIS_SETTINGS) == cache_key("int main(){}", dict(ANALYSIS_SETTINGS))
+    assert cache_key("int main(){}", ANALYSIS_SETTINGS) != cache_key("int main(){ }", ANALYSIS_SETTINGS)
+    assert cache_key("int main(){}", ANALYSIS_SETTINGS) != cache_key("int main(){}", other)
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AnalysisCache(tmp, max_bytes=1000)
+        entry = {"compile_ok": True, "findings": ["x" * 100], "klee_summary": []}
+        for i in range(5):
+            cache.put(f"{i:064x}", entry)
+            time.sleep(0.01)
+        cache.get(f"{0:064x}")  # refresh the oldest entry
+        for i in range(5, 10):
+            cache.put(f"{i:064x}", entry)
+            time.sleep(0.01)
+        assert cache.size() <= 1000
+        assert cache.get(f"{0:064x}") is not None
+        assert cache.get(f"{1:064x}") is None
+        assert cache.get(f"{9:064x}") is not None
+        # A new instance picks up the size of what is already on disk
+        assert AnalysisCache(tmp, max_bytes=1000).size() == cache.size()
+
+
+def test_hit_skips_analysis():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write(FAKE_SCRIPT)
+        run_log = os.path.join(tmp, "runs.log")
+        os.environ["RUN_LOG"] = run_log
+        try:
+            cache = AnalysisCache(os.path.join(tmp, "cache"))
+            # Squeezing spaces stands in for the real cleaner
+            analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, cache=cache,
+                                    cleaner=lambda code: re.sub(" +", " ", code))
+            first = analyzer(("model", 0), "int  main() { }")
+            # Cleans to the same source, so it must come from the cache
+            second = analyzer(("model", 1), "int main()  { }")
+        finally:
+            del os.environ["RUN_LOG"]
+
+        with open(run_log) as f:
+            assert f.read().count("run") == 1
+        assert not first["cached"] and second["cached"]
+        for field in ("compile_ok", "semantic_err", "security_err", "findings", "klee_summary"):
+            assert first[field] == second[field]
+        assert second["findings"] == ["cpp/missing-check-scanf", "cpp/unbounded-write"]
+        assert second["klee_summary"][0]["error"].startswith("Error: memory error")
+        assert cache.hits == 1 and cache.misses == 1
+
+
+if __name__ == "__main__":
+    test_key_depends_on_source_and_settings()
+    test_lru_eviction()
+    test_hit_skips_analysis()
+    print("✓ analysis cache tests passed")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Check that parallel analysis keeps every item in its own workspace."""
+
+import os
+import tempfile
+
+from analysis_pool import AnalysisPool, ItemAnalyzer, Workspace, collect_results
+from results_store import ResultsStore
+
+# Stand-in for analyze_only.sh: "compiles" anything with a main, reports a
+# KLEE error for "overflow" and a CodeQL finding for "gets". The sleep makes
+# the items overlap in time.
+FAKE_SCRIPT = r"""
+sleep 0.2
+code="$(cat "$WORK_DIR/generated_code.c")"
+if echo "$code" | grep -q "int main"; then touch "$WORK_DIR/clean_code.bc"; fi
+mkdir -p "$KLEE_OUTPUT"
+if echo "$code" | grep -q "overflow"; then touch "$KLEE_OUTPUT/test000001.ptr.err"; fi
+if echo "$code" | grep -q "gets"; then
+    echo "cpp/dangerous-function-overflow" > "$CODEQL_FEEDBACK"
+else
+    echo "CodeQL analysis completed - database created successfully" > "$CODEQL_FEEDBACK"
+fi
+"""
+
+PROGRAMS = {
+    0: "int main() { return 0; }",
+    1: "void f(void) {}",
+    2: "int main() { char b[4]; gets(b); } /* overflow */",
+    3: "int main() { gets(0); }",
+    4: "/* overflow */ void g(void) {}",
+}
+
+
+def run_pool(workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write(FAKE_SCRIPT)
+        analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, syntax_gate=False)
+        with AnalysisPool(workers, analyzer) as pool:
+            for index, code in PROGRAMS.items():
+                pool.submit(("model", index), code)
+            results = dict(pool.drain())
+        assert not os.listdir(os.path.join(tmp, "ws"))
+    return {key[1]: (r["compile_ok"], r["semantic_err"], r["security_err"]) for key, r in results.items()}
+
+
+def test_parallel_matches_serial():
+    serial = run_pool(1)
+    assert serial == {
+        0: (True, False, False),
+        1: (False, False, False),
+        2: (True, True, True),
+        3: (True, False, True),
+        4: (False, True, False),
+    }
+    assert run_pool(4) == serial
+
+
+def test_timeout_counts_as_compile_failure():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "slow.sh")
+        with open(script, "w") as f:
+            f.write('touch "$WORK_DIR/clean_code.bc"\nsleep 10\n')
+        with AnalysisPool(1, ItemAnalyzer(tmp, script=script, timeout=1, syntax_gate=False)) as pool:
+            pool.submit(("model", 0), "int main() {}")
+            (_, results), = list(pool.drain())
+        assert results["timeout"] and not results["compile_ok"]
+
+
+def test_failing_script_counts_as_compile_failure():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "failing.sh")
+        with open(script, "w") as f:
+            f.write('touch "$WORK_DIR/clean_code.bc"\nexit 1\n')
+        results = ItemAnalyzer(tmp, script=script, timeout=30, syntax_gate=False)(("model", 0), "int main() {}")
+        assert not results["timeout"] and not results["compile_ok"]
+
+
+# Stand-in for clang -fsyntax-only: rejects sources without a semicolon
+FAKE_CLANG = r"""#!/bin/bash
+source="${@: -1}"
+grep -q ";" "$source" && exit 0
+echo "$source:1:12: error: expected ';' after return statement" >&2
+echo "1 error generated." >&2
+exit 1
+"""
+
+
+def test_syntax_gate_skips_later_stages():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write(FAKE_SCRIPT)
+        clang = os.path.join(tmp, "clang")
+        with open(clang, "w") as f:
+            f.write(FAKE_CLANG)
+        os.chmod(clang, 0o755)
+        analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, clang=clang)
+        broken = analyzer(("model", 0), "int main() { gets(0) } /* overflow */")
+        fine = analyzer(("model", 1), "int main() { return 0; }")
+
+        # The script never ran for the broken program, so nothing else was reported
+        assert (broken["compile_ok"], broken["semantic_err"], broken["security_err"]) == (False, False, False)
+        assert broken["skipped"] == {"codeql": "syntax check failed", "bitcode": "syntax check failed",
+                                     "klee": "syntax check failed"}
+        assert broken["diagnostics"] == ["1:12: error: expected ';' after return statement"]
+        assert fine["compile_ok"] and fine["skipped"] == {} and "syntax_check" in fine["timings"]
+
+        with ResultsStore(os.path.join(tmp, "results.db")) as store:
+            store.record(("model", 0), broken)
+            store.record(("model", 1), fine)
+            assert store.summaries()[("model", 0)]["diagnostics"] == broken["diagnostics"]
+            assert store.skip_summary() == {("codeql", "syntax check failed"): 1, ("bitcode", "syntax check failed"): 1,
+                                            ("klee", "syntax check failed"): 1}
+
+
+def test_collect_results_on_empty_workspace():
+    with tempfile.TemporaryDirectory() as tmp:
+        workspace = Workspace(tmp)
+        results = collect_results(workspace)
+        assert results["compile_ok"] is False
+        assert results["semantic_err"] is False
+        assert results["security_err"] is False
+
+
+if __name__ == "__main__":
+    test_parallel_matches_serial()
+    test_timeout_counts_as_compile_failure()
+    test_failing_script_counts_as_compile_failure()
+    test_syntax_gate_skips_later_stages()
+    test_collect_results_on_empty_workspace()
+    print("✓ analysis pool tests passed")
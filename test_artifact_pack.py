@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Check the artifact pack: random access, streaming, recovery and packing by ItemAnalyzer."""
+
+import os
+import tempfile
+import threading
+
+from analysis_pool import ItemAnalyzer
+from artifact_pack import ArtifactPack
+from test_analysis_cache import FAKE_SCRIPT
+
+
+def test_random_access_and_streaming():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run1.pack")
+        pack = ArtifactPack(path, codec="gzip")
+        for i in range(20):
+            pack.add("org/model", i, {"generated_code.c": f"int main() {{ return {i}; }}",
+                                      "clean_code.bc": bytes(range(256)) * i})
+        pack.add("org/model", 3, {"generated_code.c": "retried"})
+        pack.close()
+
+        # A new reader uses the index: the latest frame of an item wins
+        reader = ArtifactPack(path)
+        assert len(reader) == 20 and ("org/model", 19) in reader
+        assert reader.get("org/model", 7)["clean_code.bc"] == bytes(range(256)) * 7
+        assert reader.get("org/model", 3) == {"generated_code.c": b"retried"}
+        # Streaming yields every frame in write order
+        frames = [(header["prompt_index"], artifacts) for header, artifacts in reader]
+        assert [index for index, _ in frames] == list(range(20)) + [3]
+        assert frames[5][1]["generated_code.c"] == b"int main() { return 5; }"
+        # One pack file plus its index, and compressed
+        assert sorted(os.listdir(tmp)) == ["run1.pack", "run1.pack.idx"]
+        assert os.path.getsize(path) < sum(256 * i for i in range(20)) / 4
+
+
+def test_recovers_interrupted_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run1.pack")
+        pack = ArtifactPack(path)
+        threads = [threading.Thread(target=pack.add, args=("m", i, {"clean_code.c": "x" * i})) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pack.close()
+        size = os.path.getsize(path)
+
+        # Lost index: rebuilt from the frame headers
+        os.remove(path + ".idx")
+        assert ArtifactPack(path).get("m", 5) == {"clean_code.c": b"xxxxx"}
+        # Torn last frame: ignored, then overwritten by the next append
+        with open(path, "ab") as f:
+            f.write(b"APK1\0\0")
+        pack = ArtifactPack(path)
+        assert len(pack) == 8
+        pack.add("m", 8, {"clean_code.c": "y"})
+        pack.close()
+        assert os.path.getsize(path) > size
+        assert [header["prompt_index"] for header in ArtifactPack(path).headers()][-1] == 8
+        assert ArtifactPack(path).get("m", 8) == {"clean_code.c": b"y"}
+
+
+def test_analyzer_packs_artifacts():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write(FAKE_SCRIPT)
+        os.environ["RUN_LOG"] = os.path.join(tmp, "runs.log")
+        try:
+            pack = ArtifactPack(os.path.join(tmp, "run.pack"))
+            analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30,
+                                    cleaner=lambda code: code.strip(), pack=pack)
+            analyzer(("model", 4), "  int main() { }  ")
+        finally:
+            del os.environ["RUN_LOG"]
+        artifacts = pack.get("model", 4)
+        assert artifacts["generated_code.c"] == b"  int main() { }  "
+        assert artifacts["clean_code.c"] == b"int main() { }"
+        assert "clean_code.bc" in artifacts
+        assert artifacts["klee/test000001.ptr.err"].startswith(b"Error: memory error")
+        assert b"cpp/unbounded-write" in artifacts["feedback.txt"]
+        # The workspace itself is gone
+        assert os.listdir(os.path.join(tmp, "ws")) == []
+
+
+if __name__ == "__main__":
+    test_random_access_and_streaming()
+    test_recovers_interrupted_runs()
+    test_analyzer_packs_artifacts()
+    print("✓ artifact pack tests passed")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Check length-bucketed batch planning."""
+
+import pytest
+
+from batching import AdaptiveBatcher, bucketed_batches, fixed_batches, is_out_of_memory, padding_ratio, prompt_lengths
+
+
+class WordTokenizer:
+    """One token per word, enough to plan batches without a model."""
+
+    def __call__(self, prompts):
+        return {"input_ids": [prompt.split() for prompt in prompts]}
+
+
+LENGTHS = {10: 5, 11: 50, 12: 6, 13: 48, 14: 5, 15: 51, 16: 7, 17: 49}
+
+
+def test_every_prompt_lands_in_one_batch():
+    batches = bucketed_batches(LENGTHS, LENGTHS, batch_size=4)
+    assert sorted(i for batch in batches for i in batch) == sorted(LENGTHS)
+    assert all(len(batch) <= 4 for batch in batches)
+    assert batches == [[10, 14, 12, 16], [13, 17, 11, 15]]
+
+
+def test_bucketing_cuts_padding():
+    before = padding_ratio(fixed_batches(sorted(LENGTHS), 4), LENGTHS)
+    after = padding_ratio(bucketed_batches(LENGTHS, LENGTHS, batch_size=4), LENGTHS)
+    assert before > 0.4 and after < 0.05
+
+
+def test_token_budget():
+    # rows * (longest + reserve) must stay within 120
+    batches = bucketed_batches(LENGTHS, LENGTHS, token_budget=120, reserve=10)
+    for batch in batches:
+        assert len(batch) == 1 or len(batch) * (max(LENGTHS[i] for i in batch) + 10) <= 120
+    assert batches == [[10, 14, 12, 16], [13, 17], [11], [15]]
+    # A prompt that alone exceeds the budget still gets generated
+    assert bucketed_batches({0: 500}, {0: 500}, token_budget=100) == [[0]]
+
+
+def test_prompt_lengths():
+    assert prompt_lengths(WordTokenizer(), ["a b c", "d"]) == [3, 1]
+
+
+class MemoryLimit:
+    """Simulated accelerator: a batch needs rows * longest prompt units of memory."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.calls = []
+
+    def __call__(self, chunk):
+        self.calls.append(len(chunk))
+        if len(chunk) * max(LENGTHS[i] for i in chunk) > self.limit:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        return [f"code {i}" for i in chunk]
+
+
+def test_oom_splits_without_losing_prompts():
+    memory = MemoryLimit(110)  # two long prompts fit, three do not
+    batcher = AdaptiveBatcher(4, probe_every=2)
+    done = []
+    for batch in fixed_batches(sorted(LENGTHS), 4):
+        for chunk, outputs in batcher.run(batch, memory):
+            assert outputs == [f"code {i}" for i in chunk]
+            done += chunk
+    assert done == sorted(LENGTHS)
+    # 4 rows fail and are halved; two batches of 2 later a probe at 3 fails and falls back to 2
+    assert memory.calls == [4, 2, 2, 3, 1, 2, 1]
+    assert batcher.splits == 2 and batcher.safe_rows == 2
+    assert batcher.probes == 1 and batcher.probe_every == 4
+
+
+def test_probes_back_up_to_max_rows():
+    memory = MemoryLimit(1000)
+    batcher = AdaptiveBatcher(4, probe_every=1)
+    batcher.safe_rows = 1
+    list(batcher.run(range(10, 18), memory))
+    assert batcher.safe_rows == 4 and batcher.splits == 0
+    assert memory.calls == [1, 2, 3, 2]
+
+
+def test_cpu_allocation_failures_are_out_of_memory():
+    assert is_out_of_memory(RuntimeError("[enforce fail at alloc_cpu.cpp:117] data. DefaultCPUAllocator: "
+                                         "can't allocate memory: you tried to allocate 8589934592 bytes."))
+    assert is_out_of_memory(MemoryError())
+    assert is_out_of_memory(RuntimeError("MemoryError: "))
+    assert not is_out_of_memory(RuntimeError("device-side assert triggered"))
+
+
+def test_other_errors_are_raised():
+    def broken(chunk):
+        raise RuntimeError("device-side assert triggered")
+
+    batcher = AdaptiveBatcher(4)
+    with pytest.raises(RuntimeError, match="device-side assert"):
+        list(batcher.run([10, 11], broken))
+    assert batcher.splits == 0
+
+
+def test_prompt_that_never_fits_does_not_stop_the_rest():
+    def prompt_2_too_long(chunk):
+        if 2 in chunk:
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        return [f"code {i}" for i in chunk]
+
+    freed = []
+    batcher = AdaptiveBatcher(4, on_oom=lambda: freed.append(True))
+    results = dict(pair for chunk, outputs in batcher.run(range(8), prompt_2_too_long)
+                   for pair in zip(chunk, outputs))
+    # Every prompt comes back in order; only prompt 2 has no completion
+    assert list(results) == list(range(8))
+    assert results[2] is None and all(results[i] == f"code {i}" for i in results if i != 2)
+    assert batcher.failed == [2] and freed
+
+
+def test_padded_token_limit():
+    memory = MemoryLimit(110)
+    batcher = AdaptiveBatcher(4, probe_every=100)
+    # Short prompts first: 4 rows fit, then 4 long ones do not and halve
+    order = [10, 14, 12, 16, 11, 13, 15, 17]
+    done = [i for chunk, _ in batcher.run(order, memory, LENGTHS.get) for i in chunk]
+    assert done == order
+    assert batcher.safe_tokens == 102 and batcher.safe_rows == 2
+    # Even with the row limit back at 4, the learned token limit cuts long batches before they run out
+    batcher.safe_rows = 4
+    memory.calls = []
+    list(batcher.run([11, 13, 15, 17], memory, LENGTHS.get))
+    assert memory.calls == [2, 2] and batcher.splits == 1
+
+
+if __name__ == "__main__":
+    test_every_prompt_lands_in_one_batch()
+    test_bucketing_cuts_padding()
+    test_token_budget()
+    test_prompt_lengths()
+    test_oom_splits_without_losing_prompts()
+    test_probes_back_up_to_max_rows()
+    test_cpu_allocation_failures_are_out_of_memory()
+    test_other_errors_are_raised()
+    test_prompt_that_never_fits_does_not_stop_the_rest()
+    test_padded_token_limit()
+    print("✓ batching tests passed")
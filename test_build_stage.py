@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Check precompiled headers with the system C compiler: reuse, validation and identical build results."""
+
+import os
+import shutil
+import tempfile
+
+from analysis_pool import ItemAnalyzer
+from build_stage import PrecompiledHeaders, compile_units, leading_includes, pch_suffix
+from run_codeql import item_makefile
+
+CC = shutil.which("cc") or shutil.which("gcc")
+
+PROGRAMS = {
+    "p0": "#include <stdio.h>\n#include <stdlib.h>\n#include <string.h>\n\n"
+          "int main() { char *s = malloc(4); strcpy(s, \"ok\"); printf(\"%s\\n\", s); free(s); return 0; }\n",
+    "p1": "#include <stdio.h>\nint main() { puts(\"hi\"); return 0; }\n",
+    "p2": "#include <stdio.h>\nint main() { undeclared(); return nope; }\n",
+    "p3": "int main() { return 0; }\n",
+}
+
+# Stand-in for analyze_only.sh: just the item's build, from the Makefile the analysis writes
+BUILD_SCRIPT = """cat > "$WORK_DIR/Makefile" << 'EOF'
+{makefile}EOF
+make -s -C "$WORK_DIR" || true
+"""
+
+
+def test_leading_includes():
+    assert leading_includes(PROGRAMS["p0"]) == ("#include <stdio.h>", "#include <stdlib.h>", "#include <string.h>")
+    assert leading_includes("#include <stdio.h>\n#include \"local.h\"\n#include <string.h>\n") == ("#include <stdio.h>",)
+    assert leading_includes(PROGRAMS["p3"]) == ()
+
+
+def test_headers_are_validated_and_reused():
+    with tempfile.TemporaryDirectory() as tmp:
+        pch = PrecompiledHeaders(os.path.join(tmp, "pch"), CC)
+        header = pch.for_source(PROGRAMS["p0"])
+        assert header is not None and os.path.exists(header + pch_suffix(CC))
+        assert pch.for_source(PROGRAMS["p1"]) not in (None, header)
+        assert pch.for_source(PROGRAMS["p3"]) is None
+        # A header set that does not build gives no PCH, and the item builds as before
+        assert pch.for_source("#include <no_such_header.h>\nint main() { return 0; }\n") is None
+        assert pch.used == 2
+        # A later run (or another shard) reuses the PCH instead of building it again
+        built = os.path.getmtime(header + pch_suffix(CC))
+        again = PrecompiledHeaders(os.path.join(tmp, "pch"), CC)
+        assert again.for_source(PROGRAMS["p0"]) == header
+        assert os.path.getmtime(header + pch_suffix(CC)) == built
+
+
+def test_same_programs_build_with_and_without_pch():
+    with tempfile.TemporaryDirectory() as tmp:
+        pch = PrecompiledHeaders(os.path.join(tmp, "pch"), CC)
+        plain = compile_units(CC, ["-g"], PROGRAMS, os.path.join(tmp, "plain"))
+        header = pch.for_source(PROGRAMS["p1"])
+        batched = compile_units(CC, ["-g"], {name: PROGRAMS[name] for name in ("p1", "p2")},
+                                os.path.join(tmp, "batched"), header)
+        assert plain == {"p0", "p1", "p3"}
+        assert batched == {"p1"}
+
+        script = os.path.join(tmp, "build.sh")
+        with open(script, "w") as f:
+            f.write(BUILD_SCRIPT.format(makefile=item_makefile()))
+        analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), keep_workspaces=True, script=script, timeout=60,
+                                cleaner=lambda code: code, syntax_gate=False, pch=pch)
+        for name, code in PROGRAMS.items():
+            index = int(name[1:])
+            workspace = analyzer.workspace(("model", index))
+            analyzer(("model", index), code)
+            assert os.path.exists(os.path.join(workspace.code_dir, "clean_code.o")) == (name in plain)
+            header = pch.header(leading_includes(code))
+            if header is not None:
+                # The build -included the PCH's header
+                with open(os.path.join(workspace.code_dir, "clean_code.i")) as f:
+                    assert header in f.read()
+        assert pch.used == 1 + 3
+        # The syntax error is reported the same way
+        with open(os.path.join(analyzer.workspace(("model", 2)).code_dir, "build.log")) as f:
+            assert "undeclared" in f.read()
+
+
+if __name__ == "__main__":
+    test_leading_includes()
+    test_headers_are_validated_and_reused()
+    test_same_programs_build_with_and_without_pch()
+    print("✓ build stage tests passed")
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Check clean_code.clean_source against the golden corpus.
+
+cleaning_golden/expected/ holds what analyze_only.sh's old heredoc + sed +
+awk chain produced for each file in cleaning_golden/input/.
+"""
+
+import os
+
+from clean_code import clean_source
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cleaning_golden")
+
+
+def golden_cases():
+    for name in sorted(os.listdir(os.path.join(GOLDEN_DIR, "input"))):
+        with open(os.path.join(GOLDEN_DIR, "input", name), newline="") as f:
+            source = f.read()
+        with open(os.path.join(GOLDEN_DIR, "expected", name), newline="") as f:
+            expected = f.read()
+        yield name, source, expected
+
+
+def test_matches_golden_corpus():
+    mismatches = [name for name, source, expected in golden_cases() if clean_source(source) != expected]
+    assert mismatches == []
+
+
+def test_markdown_prose_and_main_wrapping():
+    cleaned = clean_source("Here is the code:\n```c\nvoid f(void) {\n    return;\n}\n```\nThis code returns.\n")
+    assert cleaned == ("#include <stdio.h>\n#include <stdlib.h>\n#include <string.h>\n\n"
+                       "void f(void) {\n    return;\n}\n"
+                       "\nint main() {\n    return 0;\n}\n")
+
+
+def test_duplicate_returns_collapse():
+    cleaned = clean_source("#include <stdio.h>\nint main() {\n    return 0;\n    return 0;\n}\n")
+    assert cleaned == "#include <stdio.h>\nint main() {\n    return 0;\n}\n"
+
+
+if __name__ == "__main__":
+    test_matches_golden_corpus()
+    test_markdown_prose_and_main_wrapping()
+    test_duplicate_returns_collapse()
+    print("✓ clean_code tests passed")
@@ -63,7 +63,7 @@ def test_cleaning_on_prompt(prompt_idx):
     result = subprocess.run(["bash", "analyze_only.sh"], capture_output=True, text=True, timeout=120)
     
     # Check if it compiled
-    compiled = os.path.exists("generated_code/clean_code.out")
+    compiled = os.path.exists("generated_code/clean_code.bc")
     
     print(f"\nCleaning output (last 15 lines):")
     for line in result.stdout.split("\n")[-15:]:
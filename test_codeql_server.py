@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Check the persistent CodeQL server backend against one-shot codeql runs."""
+
+import os
+import sys
+import tempfile
+
+import run_codeql
+from analysis_pool import AnalysisPool, ItemAnalyzer
+from codeql_server import CodeQLServer, CodeQLServerError, ServerBackend
+from test_run_codeql import FAKE_CODEQL, PROGRAMS, with_fake_codeql
+
+# Stand-in for `codeql execute cli-server`: reads NUL-terminated JSON argument
+# arrays and runs each through the fake codeql CLI, answering with its stdout
+# and a NUL. ["sleep", n] hangs to exercise the timeout path.
+FAKE_SERVER = r'''
+import json, subprocess, sys, time
+
+fake_codeql = sys.argv[1]
+buffer = b""
+while True:
+    chunk = sys.stdin.buffer.read1(65536)
+    if not chunk:
+        break
+    buffer += chunk
+    while b"\0" in buffer:
+        request, buffer = buffer.split(b"\0", 1)
+        args = json.loads(request)
+        if args[0] == "sleep":
+            time.sleep(float(args[1]))
+        out = subprocess.run([fake_codeql] + args, stdout=subprocess.PIPE).stdout
+        sys.stdout.buffer.write(out + b"\0")
+        sys.stdout.buffer.flush()
+'''
+
+
+def server_command(tmp):
+    server = os.path.join(tmp, "fake_server.py")
+    with open(server, "w") as f:
+        f.write(FAKE_SERVER)
+    return [sys.executable, server, run_codeql.CODEQL_BIN]
+
+
+@with_fake_codeql
+def test_server_matches_subprocess(tmp):
+    backend = ServerBackend(None, command=server_command(tmp))
+    try:
+        served = run_codeql.analyze_batch(PROGRAMS, os.path.join(tmp, "server"), jobs=2, backend=backend)
+    finally:
+        backend.close()
+    assert served == run_codeql.analyze_batch(PROGRAMS, os.path.join(tmp, "subprocess"), jobs=2)
+    # create + analyze went through a single server process
+    server, = backend.servers
+    assert server.starts == 1 and server.commands == 2
+
+
+@with_fake_codeql
+def test_per_item_analysis_reuses_server(tmp):
+    makefile = os.path.join(tmp, "Makefile")
+    with open(makefile, "w") as f:
+        f.write(run_codeql.ITEM_MAKEFILE)
+    script = os.path.join(tmp, "fake_analysis.sh")
+    with open(script, "w") as f:
+        f.write('[ "$SKIP_CODEQL" = "1" ] || exit 1\n'
+                'cp "$WORK_DIR/generated_code.c" "$WORK_DIR/clean_code.c"\n'
+                'touch "$WORK_DIR/clean_code.bc"\n'
+                f'cp "{makefile}" "$WORK_DIR/Makefile"\n')
+    backend = ServerBackend(None, servers=2, command=server_command(tmp))
+    analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, codeql_backend=backend)
+    try:
+        with AnalysisPool(2, analyzer) as pool:
+            for name, code in PROGRAMS.items():
+                pool.submit(("model", int(name.split("_")[1])), code)
+            results = dict(pool.drain())
+    finally:
+        backend.close()
+    assert {key[1]: r["security_err"] for key, r in results.items()} == {0: True, 1: True, 2: False, 3: False}
+    assert all(r["compile_ok"] for key, r in results.items() if key[1] != 3)
+    assert sum(server.starts for server in backend.servers) <= 2
+    assert sum(server.commands for server in backend.servers) == 2 * len(PROGRAMS)
+
+
+@with_fake_codeql
+def test_stuck_server_is_restarted(tmp):
+    server = CodeQLServer(server_command(tmp), timeout=0.5)
+    try:
+        server.run(["sleep", "10"])
+        assert False, "expected a timeout"
+    except CodeQLServerError:
+        pass
+    server.run(["version"])
+    server.close()
+    assert server.starts == 2
+
+
+if __name__ == "__main__":
+    test_server_matches_subprocess()
+    test_per_item_analysis_reuses_server()
+    test_stuck_server_is_restarted()
+    print("✓ codeql_server tests passed")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Check continuous batching against the fixed-batch loop on a tiny random model."""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from batch_driver import generate_batch
+from continuous_batching import ContinuousBatcher
+
+
+class CharTokenizer:
+    """One token per character, a BOS token, left padding with id 0."""
+
+    pad_token_id = 0
+    eos_token_id = 1
+    pad_token = "<pad>"
+    eos_token = "<eos>"
+
+    def __call__(self, prompts, padding=False, return_tensors=None):
+        single = isinstance(prompts, str)
+        rows = [[2] + [ord(c) % 96 + 3 for c in p] for p in ([prompts] if single else prompts)]
+        if return_tensors is None:
+            return {"input_ids": rows[0] if single else rows}
+        width = max(map(len, rows))
+        return transformers.BatchEncoding({
+            "input_ids": torch.tensor([[0] * (width - len(r)) + r for r in rows]),
+            "attention_mask": torch.tensor([[0] * (width - len(r)) + [1] * len(r) for r in rows]),
+        })
+
+    def decode(self, ids, skip_special_tokens=True, clean_up_tokenization_spaces=False):
+        if hasattr(ids, "tolist"):
+            ids = ids.tolist()
+        return "".join(chr(i - 3 + 96 if i - 3 < 32 else i - 3) for i in ids if i > 2)
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    config = transformers.LlamaConfig(vocab_size=100, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                                      num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=256,
+                                      pad_token_id=0, eos_token_id=1, bos_token_id=2)
+    return transformers.LlamaForCausalLM(config).eval()
+
+
+PROMPTS = ["Write C code to: add two numbers", "x", "Write C code to: reverse a string in place", "abc",
+           "hello world", "int"]
+
+
+def test_matches_fixed_batches():
+    model, tokenizer = tiny_model(), CharTokenizer()
+    fixed = []
+    for i in range(0, len(PROMPTS), 3):
+        fixed += generate_batch(model, tokenizer, PROMPTS[i:i + 3], 24, structure_stop=False)
+
+    # Fewer slots than prompts, so slots are refilled while others are mid-sequence
+    engine = ContinuousBatcher(model, tokenizer, slots=2, max_new_tokens=24, structure_stop=False)
+    continuous = dict(engine.run(enumerate(PROMPTS)))
+    assert [continuous[i] for i in range(len(PROMPTS))] == fixed
+    assert engine.stats["rows"] == len(PROMPTS)
+
+
+def test_short_limits_and_prompt_echo():
+    model, tokenizer = tiny_model(), CharTokenizer()
+    engine = ContinuousBatcher(model, tokenizer, slots=4, max_new_tokens=1, strip_prompt=False,
+                               structure_stop=False)
+    outputs = dict(engine.run(enumerate(PROMPTS)))
+    assert sorted(outputs) == list(range(len(PROMPTS)))
+    for i, prompt in enumerate(PROMPTS):
+        assert outputs[i].startswith(prompt)
+    assert engine.stats["steps"] == 0
+
+
+if __name__ == "__main__":
+    test_matches_fixed_batches()
+    test_short_limits_and_prompt_echo()
+    print("✓ continuous batching tests passed")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Check the CPU mode helpers on a tiny random model."""
+
+import os
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from batch_driver import generate_batch
+from cpu_inference import bf16_supported, cpu_mode_active, model_variant, physical_cpus, pin_threads, prepare_model
+from test_continuous_batching import PROMPTS, CharTokenizer, tiny_model
+
+
+def test_one_cpu_per_core():
+    cpus = physical_cpus()
+    assert cpus and len(set(cpus)) == len(cpus)
+    if hasattr(os, "sched_getaffinity"):
+        allowed = os.sched_getaffinity(0)
+        assert set(cpus) <= allowed
+        # The pool is pinned, the calling thread keeps its mask
+        assert pin_threads() == len(cpus) == torch.get_num_threads()
+        assert os.sched_getaffinity(0) == allowed
+
+
+def test_int8_quantizes_linear_layers():
+    model = prepare_model(tiny_model(), "int8")
+    assert not any(type(module) is torch.nn.Linear for module in model.modules())
+    outputs = generate_batch(model, CharTokenizer(), PROMPTS[:3], 8, structure_stop=False, static_cache=True)
+    assert len(outputs) == 3
+
+
+def test_variant_follows_the_prepared_model():
+    assert model_variant(tiny_model()) == "torch.float32"
+    assert model_variant(prepare_model(tiny_model(), "int8")) == "torch.float32+int8"
+    # Without native bfloat16 the model stays float32, and so does its variant
+    bf16 = model_variant(prepare_model(tiny_model(), "bf16"))
+    assert bf16 == ("torch.bfloat16" if bf16_supported() else "torch.float32")
+
+
+def test_static_cache_keeps_greedy_outputs():
+    model, tokenizer = tiny_model(), CharTokenizer()
+    dynamic = generate_batch(model, tokenizer, PROMPTS, 16, structure_stop=False)
+    assert generate_batch(model, tokenizer, PROMPTS, 16, structure_stop=False, static_cache=True) == dynamic
+
+
+def test_fp32_is_unchanged():
+    assert not cpu_mode_active("fp32")
+    with pytest.raises(ValueError):
+        cpu_mode_active("int4")
+
+
+if __name__ == "__main__":
+    test_one_cpu_per_core()
+    test_int8_quantizes_linear_layers()
+    test_variant_follows_the_prepared_model()
+    test_static_cache_keeps_greedy_outputs()
+    test_fp32_is_unchanged()
+    print("✓ CPU mode tests passed")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Check the memory-mapped dataset loader, sharding and the xlcost decoding."""
+
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dataset import Dataset, decode_xlcost, parse_shard, prompt_text, shard_range
+
+
+def write_jsonl(path, n):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({"text": f"task {i}", "code": f"int f{i} ( ) ; NEW_LINE puts ( \" x STRNEWLINE \" ) ;"}))
+            f.write("\n\n" if i % 3 == 0 else "\n")
+
+
+def test_random_access_and_decoding():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "train.json")
+        write_jsonl(path, 100)
+        data = Dataset(path, decode_xlcost)
+        assert len(data) == 100
+        assert prompt_text(data[42]) == "task 42"
+        assert data[42]["code"] == "int f42 ( ) ;\nputs ( \" x\\n\" ) ;"
+        assert [prompt_text(item) for item in data[97:200]] == ["task 97", "task 98", "task 99"]
+        assert [i for i, _ in data.iter_range(98)] == [98, 99]
+
+
+def test_side_file_reused_until_source_changes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "train.json")
+        write_jsonl(path, 10)
+        Dataset(path)
+        built = os.path.getmtime(os.path.join(tmp, ".train.json.records.idx"))
+        time.sleep(0.01)
+        assert len(Dataset(path)) == 10
+        assert os.path.getmtime(os.path.join(tmp, ".train.json.records.idx")) == built
+        write_jsonl(path, 12)
+        assert len(Dataset(path)) == 12
+
+
+def open_shard(path):
+    data = Dataset(path, decode_xlcost)
+    return len(data), prompt_text(data[-1])
+
+
+def test_shards_build_the_side_file_together():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "train.json")
+        write_jsonl(path, 2000)
+        with ProcessPoolExecutor(4) as executor:
+            opened = list(executor.map(open_shard, [path] * 4))
+        assert opened == [(2000, "task 1999")] * 4
+        assert not [name for name in os.listdir(tmp) if name.endswith(".tmp")]
+
+
+def test_json_questions_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "questions.json")
+        with open(path, "w") as f:
+            json.dump({"questions": [{"id": 1, "task": "calculator"}, {"id": 2, "prompt": "copy"}]}, f, indent=2)
+        data = Dataset(path, records_key="questions")
+        assert [prompt_text(item) for item in data] == ["calculator", "copy"]
+
+
+def test_shards_partition_the_range():
+    assert parse_shard("2/4") == (2, 4)
+    for bad in ("4/4", "-1/2", "1/0"):
+        try:
+            parse_shard(bad)
+            assert False, bad
+        except ValueError:
+            pass
+    covered = []
+    for i in range(3):
+        start, end = shard_range(50, 463, (i, 3))
+        covered.extend(range(start, end))
+    assert covered == list(range(50, 463))
+    assert shard_range(5, 9) == (5, 9)
+
+
+if __name__ == "__main__":
+    test_random_access_and_decoding()
+    test_side_file_reused_until_source_changes()
+    test_shards_build_the_side_file_together()
+    test_json_questions_file()
+    test_shards_partition_the_range()
+    print("✓ dataset tests passed")
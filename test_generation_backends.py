@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Check the llama.cpp backend's batching, structure stop and config handling with stand-in Llama objects."""
+
+import json
+import threading
+
+import pytest
+
+from generation_backends import BackendError, LlamaCppBackend, backend_settings, gguf_file, load_backend
+
+PROGRAM = "int main() {\n  return 0;\n}\nint unused;\n"
+
+
+class ScriptedLlama:
+    """Streams PROGRAM one character per token, like llama_cpp.Llama(..., stream=True)."""
+
+    def __init__(self):
+        self.calls = []
+        self.threads = set()
+
+    def tokenize(self, text):
+        return list(text)
+
+    def __call__(self, prompt, max_tokens, stream, **options):
+        assert stream
+        self.calls.append((prompt, options))
+        self.threads.add(threading.get_ident())
+        for ch in PROGRAM[:max_tokens]:
+            yield {"choices": [{"text": ch}]}
+
+
+def test_parallel_rows_keep_prompt_order():
+    llms = [ScriptedLlama(), ScriptedLlama()]
+    backend = LlamaCppBackend(llms)
+    prompts = [f"// task {i}\n" for i in range(6)]
+    stats = {}
+    codes = backend.generate(prompts, 100, strip_prompt=False, stats=stats)
+    backend.close()
+    # Generation stops once main() is closed, before the trailing declaration
+    assert codes == [prompt + "int main() {\n  return 0;\n}" for prompt in prompts]
+    assert sum(len(llm.calls) for llm in llms) == 6
+    assert stats["rows"] == 6 and stats["rows_stopped"] == 6
+    assert stats["tokens_saved"] == 6 * (100 - len("int main() {\n  return 0;\n}"))
+    assert stats["prompt_tokens"] == stats["padded_tokens"] == sum(len(p) for p in prompts)
+
+
+def test_sampling_options_and_lengths():
+    llm = ScriptedLlama()
+    backend = LlamaCppBackend([llm])
+    codes = backend.generate(["a"], 5, structure_stop=False)
+    assert codes == [PROGRAM[:5]]
+    assert llm.calls[-1][1] == {"temperature": 0.0}
+    backend.generate(["a"], 5, structure_stop=False, do_sample=True, temperature=0.7, top_p=0.95,
+                     num_return_sequences=3)
+    assert llm.calls[-1][1] == {"temperature": 0.7, "top_p": 0.95} and len(llm.calls) == 4
+    assert backend.prompt_lengths(["abc", ""]) == [3, 0]
+
+
+def test_config_and_gguf_resolution(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"MODEL_PATH": "x", "BACKEND": "llama.cpp", "LLAMA_CPP": {"parallel": 2}}))
+    assert backend_settings(str(config)) == {"BACKEND": "llama.cpp", "LLAMA_CPP": {"parallel": 2}}
+    assert backend_settings(str(tmp_path / "missing.json")) == {}
+
+    model = tmp_path / "model.Q4_K_M.gguf"
+    model.write_bytes(b"GGUF")
+    assert gguf_file("org/model", {"GGUF_MODELS": {"org/model": str(model)}}, None) == str(model)
+    with pytest.raises(BackendError, match="GGUF_MODELS"):
+        gguf_file("org/other", {}, None)
+    with pytest.raises(BackendError, match="unknown backend"):
+        load_backend("onnx", "org/model", None, {})
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    test_parallel_rows_keep_prompt_order()
+    test_sampling_options_and_lengths()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_config_and_gguf_resolution(Path(tmp))
+    print("✓ generation backend tests passed")
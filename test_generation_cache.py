@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Check that stored completions are replayed only when nothing they depend on changed."""
+
+import os
+import tempfile
+
+from generation_cache import GenerationCache, MemoizedGenerate, model_revision
+from model_cache import ModelCache
+from test_model_cache import fake_repo
+
+
+class CountingGenerate:
+    """Stand-in for a backend's generate(): records the prompts it was asked for."""
+
+    def __init__(self):
+        self.prompts = []
+
+    def __call__(self, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True, **sampling):
+        self.prompts += prompts
+        return [f"{prompt}:{max_tokens}:{len(self.prompts)}" for prompt in prompts]
+
+
+def test_replays_greedy_completions():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GenerationCache(tmp)
+        generate = CountingGenerate()
+        memo = MemoizedGenerate(generate, cache, "org/model", "abc123", {"backend": "hf", "variant": "float32"})
+        first = memo(["a", "b"], 64)
+        assert generate.prompts == ["a", "b"]
+        # Only the new prompt is generated; the others come back exactly as stored
+        second = memo(["b", "c", "a"], 64)
+        assert generate.prompts == ["a", "b", "c"]
+        assert second == [first[1], "c:64:3", first[0]]
+        assert cache.hits == 2 and cache.misses == 3
+
+        # A fresh process over the same directory replays them too
+        replay = MemoizedGenerate(CountingGenerate(), GenerationCache(tmp), "org/model", "abc123",
+                                  {"backend": "hf", "variant": "float32"})
+        assert replay(["a", "b", "c"], 64) == [first[0], first[1], "c:64:3"]
+
+
+def test_key_covers_revision_and_parameters():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = GenerationCache(tmp)
+        generate = CountingGenerate()
+        base = MemoizedGenerate(generate, cache, "org/model", "abc123", {"backend": "hf"})
+        base(["a"], 64)
+        MemoizedGenerate(generate, cache, "org/model", "def456", {"backend": "hf"})(["a"], 64)
+        MemoizedGenerate(generate, cache, "org/model", "abc123", {"backend": "llama.cpp"})(["a"], 64)
+        base(["a"], 128)
+        base(["a"], 64, structure_stop=False)
+        assert len(generate.prompts) == 5
+        # Sampled completions are never stored or replayed
+        base(["a"], 64, do_sample=True, temperature=0.7)
+        base(["a"], 64, do_sample=True, temperature=0.7)
+        assert len(generate.prompts) == 7
+
+
+def test_model_revision():
+    with tempfile.TemporaryDirectory() as tmp:
+        fake_repo(tmp, "org/model", 10, commit="abc123")
+        weights = ModelCache(tmp)
+        assert model_revision(weights, "org/model") == "abc123"
+        assert model_revision(weights, "org/missing") is None
+        local = os.path.join(tmp, "local_model")
+        os.makedirs(local)
+        with open(os.path.join(local, "config.json"), "w") as f:
+            f.write("{}")
+        revision = model_revision(weights, local)
+        assert revision.startswith("local-")
+        with open(os.path.join(local, "model.safetensors"), "wb") as f:
+            f.write(b"\0" * 8)
+        assert model_revision(weights, local) != revision
+
+
+if __name__ == "__main__":
+    test_replays_greedy_completions()
+    test_key_covers_revision_and_parameters()
+    test_model_revision()
+    print("✓ generation cache tests passed")
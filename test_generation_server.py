@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Check the generation server protocol with a stand-in model host."""
+
+import threading
+
+import generation_backends
+from generation_server import GenerationClient, GenerationServerError, ModelHost, make_server
+
+
+class EchoHost:
+    """Completes each prompt with its reversal; no model needed."""
+
+    def __init__(self):
+        self.requests = []
+
+    def info(self):
+        return {"model": "echo", "device": "cpu", "load_seconds": 0.0, "requests": len(self.requests)}
+
+    def model_info(self, request):
+        if request.get("model") == "unversioned":
+            return self.info()
+        return dict(self.info(), revision="r1", backend="echo", variant="reversed")
+
+    def generate(self, request):
+        self.requests.append(request)
+        if request.get("model") == "too-big":
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.00 GiB")
+        completions = [prompt[::-1] for prompt in request["prompts"]]
+        stats = {"rows": len(completions), "rows_stopped": 1, "tokens_saved": 10}
+        return {"completions": completions, "stats": stats, "seconds": 0.0}
+
+    def lengths(self, request):
+        return {"lengths": [len(prompt.split()) for prompt in request["prompts"]]}
+
+
+def with_server(test):
+    host = EchoHost()
+    server = make_server("127.0.0.1", 0, host)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        test(GenerationClient(f"http://127.0.0.1:{server.server_address[1]}", timeout=10), host)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_generate_round_trip():
+    def check(client, host):
+        stats = {"rows": 2}
+        codes = client.generate("echo", ["abc", "int main"], 64, True, stats, True, "// p\n", temperature=0.7)
+        assert codes == ["cba", "niam tni"]
+        assert stats == {"rows": 4, "rows_stopped": 1, "tokens_saved": 10}
+        request = host.requests[0]
+        assert request["max_new_tokens"] == 64 and request["prefix"] == "// p\n" and request["temperature"] == 0.7
+        assert client.info()["requests"] == 1
+        assert client.prompt_lengths(["a b c", "d"], model="echo") == [3, 1]
+    with_server(check)
+
+
+def test_errors_reach_the_client():
+    def check(client, host):
+        try:
+            client.generate("too-big", ["x"], 8)
+        except RuntimeError as e:
+            # The batch drivers' OOM handling looks for this text
+            assert isinstance(e, GenerationServerError) and "out of memory" in str(e).lower()
+        else:
+            assert False, "expected an error"
+        try:
+            client._call("/nope", {})
+        except GenerationServerError as e:
+            assert "unknown endpoint" in str(e)
+        else:
+            assert False, "expected an error"
+    with_server(check)
+
+
+def test_completions_are_keyed_on_what_the_server_reports():
+    from batch_driver import server_model_key
+
+    def check(client, host):
+        assert server_model_key(client, "echo") == ("r1", {"backend": "echo", "variant": "reversed"})
+        # Without a revision, or from a server without /info, nothing is memoized
+        revision, why_not = server_model_key(client, "unversioned")
+        assert revision is None and "revision" in why_not
+        older = GenerationClient(client.url + "/v0", timeout=10)
+        assert server_model_key(older, "echo")[0] is None
+    with_server(check)
+
+
+class UpperBackend(generation_backends.GenerationBackend):
+    """Stand-in backend: completes with the upper-cased prompt, reports the settings it was loaded with."""
+
+    name = "upper"
+
+    @classmethod
+    def load(cls, model_name, weights, settings, prompt_prefix=None):
+        backend = cls()
+        backend.revision = "rev-" + model_name
+        backend.variant = settings["CPU_MODE"]
+        return backend
+
+    def generate(self, prompts, max_tokens, strip_prompt=True, stats=None, structure_stop=True, prefix="",
+                 **sampling):
+        return [prompt.upper() for prompt in prompts]
+
+    def prompt_lengths(self, prompts):
+        return [len(prompt) for prompt in prompts]
+
+
+class Weights:
+    loads = 0
+
+
+def test_model_host_loads_the_configured_backend():
+    generation_backends.BACKENDS["upper"] = UpperBackend
+    try:
+        host = ModelHost(Weights(), settings={"BACKEND": "upper", "CPU_MODE": "int8"})
+        reply = host.generate({"model": "m", "prompts": ["ab"], "max_new_tokens": 8})
+        assert reply["completions"] == ["AB"]
+        assert host.lengths({"prompts": ["abc"]}) == {"lengths": [3]}
+        info = host.model_info({"model": "n"})
+        assert (info["backend"], info["revision"], info["variant"]) == ("upper", "rev-n", "int8")
+    finally:
+        del generation_backends.BACKENDS["upper"]
+
+
+def test_unreachable_server():
+    server = make_server("127.0.0.1", 0, EchoHost())
+    port = server.server_address[1]
+    server.server_close()
+    try:
+        GenerationClient(f"http://127.0.0.1:{port}", timeout=5).info()
+    except GenerationServerError as e:
+        assert "unreachable" in str(e)
+    else:
+        assert False, "expected an error"
+
+
+if __name__ == "__main__":
+    test_generate_round_trip()
+    test_errors_reach_the_client()
+    test_unreachable_server()
+    test_completions_are_keyed_on_what_the_server_reports()
+    test_model_host_loads_the_configured_backend()
+    print("✓ generation server tests passed")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Check the adaptive KLEE scheduler with a fake klee binary."""
+
+import os
+import sqlite3
+import stat
+import tempfile
+import threading
+
+from analysis_pool import ItemAnalyzer
+from klee_runner import KleeBudget, KleeScheduler, read_run_stats
+from results_store import ResultsStore
+
+# Stand-in for klee. The bitcode file names a behaviour: "plateau" finishes
+# three paths and then explores without covering anything new, "growing"
+# keeps covering new instructions and writing tests, "quick" just finishes.
+# "bug:<search>" grows like "growing" and, under that --search only, writes
+# an .err file after three paths. SIGINT makes it write info and exit like
+# the real thing.
+FAKE_KLEE = r'''#!/usr/bin/env python3
+import os, signal, sys, time
+
+out = [a.split("=", 1)[1] for a in sys.argv if a.startswith("--output-dir=")][0]
+search = [a.split("=", 1)[1] for a in sys.argv if a.startswith("--search=")]
+with open(sys.argv[-1]) as f:
+    mode = f.read().strip()
+os.makedirs(out)
+with open(os.path.join(out, "flags"), "w") as f:
+    f.write(" ".join(sys.argv[1:-1]))
+paths = 0
+
+def finish(*_):
+    with open(os.path.join(out, "info"), "w") as f:
+        f.write(f"KLEE: done: completed paths = {paths}\nKLEE: done: generated tests = {paths}\n")
+    sys.exit(0)
+
+signal.signal(signal.SIGINT, finish)
+with open(os.path.join(out, "run.stats"), "w") as stats:
+    stats.write("('Instructions','FullBranches','PartialBranches','CoveredInstructions')\n")
+    for step in range(1000):
+        if mode == "quick" and step == 3:
+            finish()
+        if mode != "plateau" or step < 3:
+            paths += 1
+            open(os.path.join(out, f"test{paths:06d}.ktest"), "w").close()
+        if step == 3 and mode.startswith("bug:") and mode[4:] in search:
+            with open(os.path.join(out, "test000003.ptr.err"), "w") as f:
+                f.write("Error: memory error: out of bound pointer\n")
+        stats.write(f"({step * 10},{paths},0,{paths * 7})\n")
+        stats.flush()
+        time.sleep(0.1)
+'''
+
+
+def scheduler(tmp, budget=None, **kwargs):
+    klee = os.path.join(tmp, "klee")
+    with open(klee, "w") as f:
+        f.write(FAKE_KLEE)
+    os.chmod(klee, os.stat(klee).st_mode | stat.S_IEXEC)
+    return KleeScheduler(budget or KleeBudget(), plateau=0.5, min_seconds=0.2, poll=0.1, klee_bin=klee, **kwargs)
+
+
+def bitcode(tmp, mode):
+    path = os.path.join(tmp, mode.replace(":", "_") + ".bc")
+    with open(path, "w") as f:
+        f.write(mode)
+    return path
+
+
+def test_plateau_stops_early_and_lends_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        klee = scheduler(tmp)
+        flat = klee.run(bitcode(tmp, "plateau"), os.path.join(tmp, "out_flat"), 10)
+        assert flat["stop"] == "plateau" and flat["seconds"] < 3
+        assert flat["paths"] == 3 and len([f for f in os.listdir(os.path.join(tmp, "out_flat"))
+                                           if f.endswith(".ktest")]) == 3
+        # The growing program gets past its own 1s timeout on the time the first one saved
+        grow = klee.run(bitcode(tmp, "growing"), os.path.join(tmp, "out_grow"), 1)
+        assert grow["stop"] == "timeout" and grow["extended"] > 0
+        assert grow["seconds"] > 1.5
+
+
+def test_finished_run_is_done():
+    with tempfile.TemporaryDirectory() as tmp:
+        run = scheduler(tmp).run(bitcode(tmp, "quick"), os.path.join(tmp, "out"), 10)
+        assert run["stop"] == "done" and run["extended"] == 0
+
+
+def test_global_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        budget = KleeBudget(total_seconds=1)
+        klee = scheduler(tmp, budget)
+        first = klee.run(bitcode(tmp, "growing"), os.path.join(tmp, "a"), 5)
+        assert first["stop"] == "budget" and first["seconds"] < 2
+        second = klee.run(bitcode(tmp, "growing"), os.path.join(tmp, "b"), 5)
+        assert second["stop"] == "budget" and second["seconds"] == 0
+        assert not os.path.exists(os.path.join(tmp, "b"))
+        assert budget.charged <= 1 + 1e-6
+
+
+def test_memory_budget_sets_max_memory():
+    with tempfile.TemporaryDirectory() as tmp:
+        klee = scheduler(tmp, KleeBudget(memory_mb=512))
+        klee.run(bitcode(tmp, "quick"), os.path.join(tmp, "out"), 5, ["--max-memory=1024", "--max-forks=10"])
+        with open(os.path.join(tmp, "out", "flags")) as f:
+            assert f.read().split()[1:] == ["--max-forks=10", "--max-memory=512"]
+        assert klee.budget.memory_used == 0
+
+
+def test_memory_reservations_stay_within_budget():
+    budget = KleeBudget(memory_mb=4096, slots=2)
+    first, second = budget.reserve_memory(), budget.reserve_memory()
+    assert first + second == 4096 == budget.memory_used
+    # A third run waits for memory instead of overcommitting
+    third = []
+    waiter = threading.Thread(target=lambda: third.append(budget.reserve_memory()))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()
+    budget.release_memory(first)
+    waiter.join(5)
+    assert third == [2048] and budget.memory_used == 4096
+    # A portfolio reserves all of its strategies at once
+    budget.release_memory(second)
+    budget.release_memory(third[0])
+    assert budget.reserve_memory(4) == 1024 and budget.memory_used == 4096
+
+
+def test_portfolio_first_error_wins():
+    with tempfile.TemporaryDirectory() as tmp:
+        budget = KleeBudget()
+        klee = scheduler(tmp, budget, portfolio=["covnew", "dfs", "bfs"])
+        out = os.path.join(tmp, "out")
+        run = klee.run(bitcode(tmp, "bug:dfs"), out, 10, ["--search=nurs:covnew", "--use-merge", "--max-forks=10"])
+        assert run["stop"] == "error" and run["strategy"] == "dfs" and run["seconds"] < 3
+        # The winner's output is the program's output, the losers' is gone
+        assert "test000003.ptr.err" in os.listdir(out)
+        with open(os.path.join(out, "flags")) as f:
+            assert f.read().split()[1:] == ["--max-forks=10", "--search=dfs"]
+        assert sorted(os.listdir(tmp)) == ["bug_dfs.bc", "klee", "out"]
+        assert budget.stops == {"error": 1, "lost": 2} and budget.active == 0
+        assert klee.wins == {"dfs": 1}
+
+
+def test_portfolio_to_deadline():
+    with tempfile.TemporaryDirectory() as tmp:
+        klee = scheduler(tmp, portfolio=["covnew", "random-path", "bfs"], race=False)
+        run = klee.run(bitcode(tmp, "bug:random-path"), os.path.join(tmp, "out"), 1)
+        # Every strategy ran to the deadline; the one that found the error is kept
+        assert run["stop"] == "timeout" and run["strategy"] == "random-path" and run["seconds"] >= 1
+        assert klee.budget.stops == {"timeout": 3}
+        assert "test000003.ptr.err" in os.listdir(os.path.join(tmp, "out"))
+
+
+def test_read_sqlite_run_stats():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "run.stats")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE stats (Instructions INTEGER, CoveredInstructions INTEGER)")
+        conn.executemany("INSERT INTO stats VALUES (?, ?)", [(10, 4), (20, 9)])
+        conn.commit()
+        conn.close()
+        assert read_run_stats(path) == {"Instructions": 20, "CoveredInstructions": 9}
+
+
+def test_item_analyzer_runs_klee_through_scheduler():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write('[ "$SKIP_KLEE" = "1" ] || exit 1\n'
+                    'echo plateau > "$WORK_DIR/clean_code.bc"\n')
+        analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, klee_scheduler=scheduler(tmp))
+        results = analyzer(("model", 0), "int main() {}")
+        assert results["compile_ok"] and results["klee_stop"] == "plateau"
+        assert "klee_strategy" not in results
+
+
+def test_item_analyzer_records_portfolio_winner():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write('echo bug:bfs > "$WORK_DIR/clean_code.bc"\n')
+        analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30,
+                                klee_scheduler=scheduler(tmp, portfolio=["covnew", "bfs"]))
+        results = analyzer(("model", 0), "int main() {}")
+        assert results["semantic_err"] and results["klee_errors"] == ["test000003.ptr.err"]
+        with ResultsStore(os.path.join(tmp, "results.db")) as store:
+            store.record(("model", 0), results)
+            assert store.summaries()[("model", 0)]["klee_strategy"] == "bfs"
+
+
+if __name__ == "__main__":
+    test_plateau_stops_early_and_lends_time()
+    test_finished_run_is_done()
+    test_global_budget()
+    test_memory_budget_sets_max_memory()
+    test_memory_reservations_stay_within_budget()
+    test_portfolio_first_error_wins()
+    test_portfolio_to_deadline()
+    test_read_sqlite_run_stats()
+    test_item_analyzer_runs_klee_through_scheduler()
+    test_item_analyzer_records_portfolio_winner()
+    print("✓ klee_runner tests passed")
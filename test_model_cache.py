@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Check model cache resolution, LRU eviction and environment setup."""
+
+import os
+import tempfile
+
+import model_cache
+from model_cache import ModelCache, ModelCacheError
+
+
+def fake_repo(root, model_name, size, commit="abc123"):
+    """A hub-layout cache entry: one blob, a snapshot symlinking it, refs/main."""
+    repo = os.path.join(root, "models--" + model_name.replace("/", "--"))
+    os.makedirs(os.path.join(repo, "blobs"))
+    os.makedirs(os.path.join(repo, "snapshots", commit))
+    os.makedirs(os.path.join(repo, "refs"))
+    with open(os.path.join(repo, "blobs", "weights"), "wb") as f:
+        f.write(b"\0" * size)
+    os.symlink(os.path.join("..", "..", "blobs", "weights"), os.path.join(repo, "snapshots", commit, "config.json"))
+    with open(os.path.join(repo, "refs", "main"), "w") as f:
+        f.write(commit)
+    return repo
+
+
+def test_resolves_local_snapshots():
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = fake_repo(tmp, "org/model", 100)
+        cache = ModelCache(tmp, offline=True)
+        assert cache.resolve("org/model") == os.path.join(repo, "snapshots", "abc123")
+        assert cache.resolve(tmp) == tmp  # a local model directory is used as is
+        try:
+            cache.resolve("org/missing")
+        except ModelCacheError as e:
+            assert "offline" in str(e)
+        else:
+            assert False, "expected an error"
+        assert ModelCache(tmp, offline=False).resolve("org/missing") == "org/missing"
+
+
+def test_load_timing_and_lru_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, name in enumerate(["org/a", "org/b", "org/c"]):
+            fake_repo(tmp, name, 1000)
+            os.utime(os.path.join(tmp, "models--" + name.replace("/", "--")), (i, i))
+        # Symlinked snapshot files are not counted twice
+        cache = ModelCache(tmp, max_bytes=2500)
+        assert cache.size() == 3 * (1000 + len("abc123"))
+
+        loaded = cache.load("org/a", lambda path: ("model", path))
+        assert loaded == ("model", cache.local_snapshot("org/a"))
+        assert cache.loads[0]["model"] == "org/a" and cache.loads[0]["warm"]
+        # org/a was just used, so the oldest remaining one goes
+        assert sorted(os.listdir(tmp)) == ["models--org--a", "models--org--c"]
+        assert cache.size() <= 2500
+
+        # The model being loaded is never evicted, even if it alone is over the cap
+        small = ModelCache(tmp, max_bytes=500)
+        small.load("org/c", lambda path: None)
+        assert os.listdir(tmp) == ["models--org--c"]
+
+
+def test_configure_environment():
+    names = model_cache.CACHE_VARIABLES + ("HF_HUB_OFFLINE", "TRANSFORMERS_OFFLINE")
+    saved = {name: os.environ.pop(name, None) for name in names}
+    try:
+        os.environ["HF_HOME"] = "/elsewhere"
+        model_cache.configure_environment()
+        assert os.environ["HF_HOME"] == "/elsewhere"  # user settings win without an explicit root
+        assert os.environ["HF_HUB_CACHE"] == model_cache.MODEL_CACHE_ROOT
+        model_cache.configure_environment("/shared/hf", offline=True)
+        assert all(os.environ[name] == "/shared/hf" for name in model_cache.CACHE_VARIABLES)
+        assert os.environ["HF_HUB_OFFLINE"] == "1"
+    finally:
+        for name, value in saved.items():
+            os.environ.pop(name, None)
+            if value is not None:
+                os.environ[name] = value
+
+
+if __name__ == "__main__":
+    test_resolves_local_snapshots()
+    test_load_timing_and_lru_eviction()
+    test_configure_environment()
+    print("✓ model cache tests passed")
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""Check the bounded generation -> analysis pipeline."""
+
+import os
+import tempfile
+import time
+
+from analysis_pool import ItemAnalyzer
+from pipeline import Pipeline
+
+FAKE_SCRIPT = r"""
+sleep 0.2
+if grep -q "int main" "$WORK_DIR/generated_code.c"; then touch "$WORK_DIR/clean_code.bc"; fi
+"""
+
+
+def test_pipeline_backpressure_and_results():
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write(FAKE_SCRIPT)
+
+        analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, syntax_gate=False)
+        with Pipeline(workers=2, queue_size=2, analyzer=analyzer) as pipe:
+            results = {}
+            for index in range(8):
+                with pipe.generation.busy():
+                    time.sleep(0.05)  # stand-in for model.generate
+                    code = "int main() {}" if index % 2 == 0 else "void f(void) {}"
+                pipe.submit(("model", index), code)
+                results.update(pipe.completed())
+            results.update(pipe.drain())
+
+        assert pipe.max_queued <= 2
+        # The producer outpaces 2 workers at 0.2s per item, so it must have been held back
+        assert pipe.generation.wait_seconds > 0.05
+        assert {key[1]: r["compile_ok"] for key, r in results.items()} == {i: i % 2 == 0 for i in range(8)}
+        report = pipe.report()
+        assert "Generation" in report and "Analysis" in report
+
+
+if __name__ == "__main__":
+    test_pipeline_backpressure_and_results()
+    print("✓ pipeline tests passed")
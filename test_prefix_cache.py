@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Check the [prefix][pads][suffix] layout used for shared-prefix KV reuse."""
+
+from itertools import accumulate
+
+from prefix_cache import prefix_layout, shared_length
+
+PAD = 0
+PREFIX = [1, 50, 51, 52]  # BOS + "Write C code ... to:"
+ROWS = [PREFIX + [7, 8, 9], PREFIX + [5], PREFIX + [6, 6]]
+
+
+def positions(mask):
+    """Position ids as generate() derives them from the attention mask."""
+    return [p - 1 if m else 1 for p, m in zip(accumulate(mask), mask)]
+
+
+def left_padded(rows):
+    width = max(len(row) for row in rows)
+    return [([PAD] * (width - len(row)) + row, [0] * (width - len(row)) + [1] * len(row)) for row in rows]
+
+
+def test_shared_length():
+    assert shared_length(PREFIX, ROWS) == 4
+    # The prefix's last token merged with the text after it in one prompt
+    assert shared_length(PREFIX, ROWS + [PREFIX[:3] + [99, 5]]) == 3
+    # Every row keeps at least one token for generate() to encode
+    assert shared_length(PREFIX, [PREFIX]) == 3
+    assert shared_length(PREFIX, [[2, 50]]) == 0
+
+
+def test_layout_matches_left_padding():
+    input_ids, attention_mask = prefix_layout(ROWS, 4, PAD)
+    assert input_ids[1] == PREFIX + [PAD, PAD, 5]
+    assert attention_mask[1] == [1, 1, 1, 1, 0, 0, 1]
+    for (ids, mask), (plain_ids, plain_mask) in zip(zip(input_ids, attention_mask), left_padded(ROWS)):
+        assert len(ids) == len(plain_ids)
+        # Same real tokens in the same order at the same positions: same greedy output
+        real = [(t, p) for t, p, m in zip(ids, positions(mask), mask) if m]
+        plain = [(t, p) for t, p, m in zip(plain_ids, positions(plain_mask), plain_mask) if m]
+        assert real == plain
+
+
+if __name__ == "__main__":
+    test_shared_length()
+    test_layout_matches_left_padding()
+    print("✓ prefix cache tests passed")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Check re-analysis of stored completions: sources, reuse of unchanged items and the results diff."""
+
+import json
+import os
+import tempfile
+
+from analysis_pool import ItemAnalyzer
+from reanalyze import parse_args, reanalyze, stored_completions
+from results_store import ResultsStore, diff_results
+from test_analysis_pool import FAKE_SCRIPT, PROGRAMS
+
+
+def write_sources(tmp):
+    script = os.path.join(tmp, "fake_analysis.sh")
+    with open(script, "w") as f:
+        f.write(FAKE_SCRIPT)
+    source = os.path.join(tmp, "completions.jsonl")
+    with open(source, "w") as f:
+        for index, code in PROGRAMS.items():
+            f.write(json.dumps({"prompt_index": index, "text": code}) + "\n")
+    return script, source
+
+
+def run(tmp, script, source, out, cleaner=lambda code: code, *flags):
+    args = parse_args([source, "--out", out, "--no-cache", "--workers", "4",
+                       "--workspace-root", os.path.join(tmp, "ws"), *flags])
+    analyzer = ItemAnalyzer(args.workspace_root, script=script, timeout=30, cleaner=cleaner, syntax_gate=False)
+    return reanalyze(args, analyzer)
+
+
+def test_reuses_unchanged_items_and_diffs():
+    with tempfile.TemporaryDirectory() as tmp:
+        script, source = write_sources(tmp)
+        first = os.path.join(tmp, "first.db")
+        assert run(tmp, script, source, first) == (len(PROGRAMS), 0)
+
+        # A "fixed" cleaner that only changes the programs calling gets()
+        def cleaner(code):
+            return code.replace("gets(", "fgets(")
+
+        second = os.path.join(tmp, "second.db")
+        assert run(tmp, script, source, second, cleaner, "--baseline", first) == (2, 3)
+        with ResultsStore(first) as old, ResultsStore(second) as new:
+            changes = diff_results(old.summaries(), new.summaries())
+        # The fake CodeQL still matches "gets" in fgets, so only re-analysis happened, no result changed
+        assert changes == []
+        with open(os.path.join(tmp, "second.csv")) as f:
+            assert len(f.read().splitlines()) == len(PROGRAMS)
+
+        # A rerun into the same output resumes instead of analyzing again
+        assert run(tmp, script, source, second, cleaner, "--baseline", first) == (0, 0)
+
+
+def test_pack_source_finds_its_baseline():
+    with tempfile.TemporaryDirectory() as tmp:
+        script, source = write_sources(tmp)
+        first = os.path.join(tmp, "first.db")
+        run(tmp, script, source, first)
+        pack = os.path.join(tmp, "first.run1.pack")
+        assert [key for key, _, _ in stored_completions(pack)] == [("stored", i) for i in PROGRAMS]
+
+        # Unchanged inputs: everything is copied from first.db
+        again = os.path.join(tmp, "again.db")
+        assert run(tmp, script, pack, again) == (0, len(PROGRAMS))
+        with ResultsStore(first) as old, ResultsStore(again) as new:
+            assert diff_results(old.summaries(), new.summaries()) == []
+            assert new.summaries()[("stored", 2)]["findings"] == ["cpp/dangerous-function-overflow"]
+
+        # A different analysis changes the result set, and the diff shows it
+        changed_script = os.path.join(tmp, "changed.sh")
+        with open(changed_script, "w") as f:
+            f.write(FAKE_SCRIPT.replace("gets", "main"))
+        forced = os.path.join(tmp, "forced.db")
+        run(tmp, changed_script, pack, forced, lambda code: code, "--reanalyze-all")
+        with ResultsStore(first) as old, ResultsStore(forced) as new:
+            changes = dict(diff_results(old.summaries(), new.summaries()))
+        assert set(changes) == {("stored", 0)}
+        assert changes[("stored", 0)] == {"security_err": (False, True),
+                                          "findings": ([], ["cpp/dangerous-function-overflow"])}
+
+
+if __name__ == "__main__":
+    test_reuses_unchanged_items_and_diffs()
+    test_pack_source_finds_its_baseline()
+    print("✓ re-analysis tests passed")
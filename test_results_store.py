@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Check the SQLite results store: resume, batched commits, concurrent writers and exports."""
+
+import os
+import tempfile
+import threading
+
+from results_store import ResultsStore
+
+RESULTS = {
+    "compile_ok": True,
+    "semantic_err": True,
+    "security_err": True,
+    "timeout": False,
+    "cached": False,
+    "findings": ["cpp/missing-check-scanf", "cpp/unbounded-write"],
+    "klee_summary": [{"file": "test000001.ptr.err", "error": "Error: memory error: out of bound pointer"}],
+    "timings": {"analysis": 1.5},
+}
+CLEAN = dict(RESULTS, semantic_err=False, security_err=False, findings=[], klee_summary=[])
+
+
+def test_resume_sees_buffered_and_committed_items():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.db")
+        with ResultsStore(path, commit_every=100, commit_seconds=1000) as store:
+            store.start_run("test")
+            store.record(("model", 0), RESULTS, {"generation": 0.25})
+            assert store.is_done("model", 0)  # buffered, not committed yet
+            assert not store.is_done("model", 1)
+        with ResultsStore(path) as store:
+            assert store.is_done("model", 0) and store.count() == 1
+            assert store.stage_summary() == {"analysis": (1, 1.5), "generation": (1, 0.25)}
+
+
+def test_concurrent_writers():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "results.db")
+        stores = [ResultsStore(path, commit_every=7) for _ in range(2)]
+
+        def write(store, shard):
+            for i in range(shard, 200, 2):
+                store.record(("model", i), CLEAN)
+            store.close()
+
+        threads = [threading.Thread(target=write, args=(store, shard)) for shard, store in enumerate(stores)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with ResultsStore(path) as store:
+            assert store.count() == 200
+
+
+def test_csv_round_trip_and_codeql_log():
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, "results.csv")
+        with open(legacy, "w") as f:
+            f.write("model,0,True,False,False\nmodel,1,False,False,False\n")
+        with ResultsStore(os.path.join(tmp, "results.db")) as store:
+            assert store.import_csv(legacy) == 2
+            store.record(("model", 2), RESULTS)
+            exported = os.path.join(tmp, "export.csv")
+            assert store.export_csv(exported) == 3
+            log = os.path.join(tmp, "codeql.txt")
+            store.export_codeql_log(log, "Log")
+        with open(exported) as f:
+            assert f.read() == ("model,0,True,False,False\nmodel,1,False,False,False\n"
+                                "model,2,True,True,True\n")
+        with open(log) as f:
+            assert f.read() == ("==== Log ====\n\n\n--- Prompt #2 (model) ---\n"
+                                "cpp/missing-check-scanf\ncpp/unbounded-write"
+                                "\n--------------------------------------------\n")
+
+
+if __name__ == "__main__":
+    test_resume_sees_buffered_and_committed_items()
+    test_concurrent_writers()
+    test_csv_round_trip_and_codeql_log()
+    print("✓ results_store tests passed")
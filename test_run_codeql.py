@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""Check batched CodeQL analysis against per-program runs using a fake codeql CLI."""
+
+import json
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+from contextlib import contextmanager
+
+import run_codeql
+from analysis_cache import AnalysisCache
+from artifact_pack import ArtifactPack
+from analysis_pool import CODEQL_BATCH_FAILED, AnalysisPool, CodeQLBatcher, ItemAnalyzer
+
+# Minimal stand-in for the codeql CLI. "database create" runs the build command
+# in the source root and records which sources got built; "database analyze"
+# reports cpp/dangerous-function-overflow for every built file that calls gets()
+# and cpp/missing-check-scanf for every one that calls scanf().
+FAKE_CODEQL = r'''#!/usr/bin/env python3
+import json, os, subprocess, sys
+
+args = sys.argv[1:]
+opts = dict(a[2:].split("=", 1) for a in args if a.startswith("--") and "=" in a)
+if args[:2] == ["database", "create"]:
+    db, source = args[2], opts["source-root"]
+    os.makedirs(db, exist_ok=True)
+    rc = subprocess.run(opts["command"], shell=True, cwd=source).returncode
+    built = []
+    for dirpath, _, files in os.walk(source):
+        if "clean_code.o" in files:
+            built.append(os.path.relpath(os.path.join(dirpath, "clean_code.c"), source))
+    with open(os.path.join(db, "sources.json"), "w") as f:
+        json.dump({"root": source, "files": built}, f)
+    sys.exit(rc if built else 1)
+if args[:2] == ["database", "analyze"]:
+    try:
+        with open(os.path.join(args[2], "sources.json")) as f:
+            info = json.load(f)
+    except FileNotFoundError:
+        sys.exit(2)
+    if not info["files"]:
+        sys.exit(2)
+    results = []
+    for rel in sorted(info["files"]):
+        with open(os.path.join(info["root"], rel)) as f:
+            code = f.read()
+        for needle, rule in (("gets(", "cpp/dangerous-function-overflow"), ("scanf(", "cpp/missing-check-scanf")):
+            for _ in range(code.count(needle)):
+                results.append({"ruleId": rule, "locations": [
+                    {"physicalLocation": {"artifactLocation": {"uri": rel.replace(os.sep, "/")}}}]})
+    with open(opts["output"], "w") as f:
+        json.dump({"runs": [{"results": results}]}, f)
+    sys.exit(0)
+sys.exit(3)
+'''
+
+PROGRAMS = {
+    "item_0": "#include <stdio.h>\nint main() { char b[8]; gets(b); return 0; }\n",
+    "item_1": "#include <stdio.h>\nint main() { int x; scanf(\"%d\", &x); scanf(\"%d\", &x); return x; }\n",
+    "item_2": "int main() { return 0; }\n",
+    "item_3": "int main() { this does not compile }\n",
+}
+
+
+# The item builds use this compiler rather than whichever clang the host has
+CC = shutil.which("cc") or shutil.which("gcc")
+
+
+@contextmanager
+def analysis_cc(cc):
+    """Build the items with cc (ANALYSIS_CC overrides the item Makefile's default)."""
+    saved = os.environ.get("ANALYSIS_CC")
+    os.environ["ANALYSIS_CC"] = cc
+    try:
+        yield
+    finally:
+        if saved is None:
+            del os.environ["ANALYSIS_CC"]
+        else:
+            os.environ["ANALYSIS_CC"] = saved
+
+
+def with_fake_codeql(test):
+    def wrapper():
+        with tempfile.TemporaryDirectory() as tmp, analysis_cc(CC):
+            fake = os.path.join(tmp, "codeql")
+            with open(fake, "w") as f:
+                f.write(FAKE_CODEQL)
+            os.chmod(fake, os.stat(fake).st_mode | stat.S_IEXEC)
+            saved, run_codeql.CODEQL_BIN = run_codeql.CODEQL_BIN, fake
+            try:
+                test(tmp)
+            finally:
+                run_codeql.CODEQL_BIN = saved
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@with_fake_codeql
+def test_batch_splits_results_per_program(tmp):
+    findings = run_codeql.analyze_batch(PROGRAMS, os.path.join(tmp, "batch"), jobs=2)
+    assert findings == {
+        "item_0": ["cpp/dangerous-function-overflow"],
+        "item_1": ["cpp/missing-check-scanf", "cpp/missing-check-scanf"],
+        "item_2": [],
+        "item_3": None,
+    }
+
+
+@with_fake_codeql
+def test_batch_matches_single_runs(tmp):
+    assert run_codeql.verify_batch(PROGRAMS, os.path.join(tmp, "verify")) == []
+
+
+@with_fake_codeql
+def test_batch_with_nothing_built(tmp):
+    findings = run_codeql.analyze_batch({"item_0": "nope"}, os.path.join(tmp, "batch"))
+    assert findings == {"item_0": None}
+
+
+@with_fake_codeql
+def test_batcher_fills_in_findings(tmp):
+    script = os.path.join(tmp, "fake_analysis.sh")
+    with open(script, "w") as f:
+        f.write('[ "$SKIP_CODEQL" = "1" ] || exit 1\n'
+                'cp "$WORK_DIR/generated_code.c" "$WORK_DIR/clean_code.c"\n'
+                'touch "$WORK_DIR/clean_code.bc"\n')
+    pack = ArtifactPack(os.path.join(tmp, "results.run1.pack"))
+    analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, skip_codeql=True,
+                            syntax_gate=False, pack=pack)
+    with CodeQLBatcher(AnalysisPool(2, analyzer), 3, os.path.join(tmp, "batches"), pack=pack) as pool:
+        for name, code in PROGRAMS.items():
+            pool.submit(("model", int(name.split("_")[1])), code)
+        results = dict(pool.completed())
+        results.update(pool.drain())
+    assert {key[1]: r["security_err"] for key, r in results.items()} == {0: True, 1: True, 2: False, 3: False}
+    assert results[("model", 1)]["feedback"] == "cpp/missing-check-scanf\ncpp/missing-check-scanf"
+    assert "clean_source" not in results[("model", 0)] and "artifacts" not in results[("model", 0)]
+    # Each item is packed once, with its own share of the batch's SARIF
+    pack.close()
+    assert sorted(ArtifactPack(pack.path).keys()) == [("model", i) for i in range(4)]
+    artifacts = ArtifactPack(pack.path).get("model", 1)
+    assert artifacts["clean_code.c"].decode() == PROGRAMS["item_1"]
+    assert artifacts["feedback.txt"].decode() == results[("model", 1)]["feedback"]
+    sarif = json.loads(artifacts["results.sarif"])
+    assert [result["ruleId"] for result in sarif["runs"][0]["results"]] == ["cpp/missing-check-scanf"] * 2
+    assert "results.sarif" not in ArtifactPack(pack.path).get("model", 3)
+
+
+def test_failed_batch_is_not_cached():
+    with tempfile.TemporaryDirectory() as tmp, analysis_cc(CC):
+        codeql = os.path.join(tmp, "codeql")
+        with open(codeql, "w") as f:
+            f.write("#!/bin/bash\necho 'A fatal error occurred' >&2\nexit 2\n")
+        os.chmod(codeql, 0o755)
+        script = os.path.join(tmp, "fake_analysis.sh")
+        with open(script, "w") as f:
+            f.write('cp "$WORK_DIR/generated_code.c" "$WORK_DIR/clean_code.c"\n'
+                    'grep -q "does not compile" "$WORK_DIR/clean_code.c" || touch "$WORK_DIR/clean_code.bc"\n')
+        cache = AnalysisCache(os.path.join(tmp, "cache"))
+        analyzer = ItemAnalyzer(os.path.join(tmp, "ws"), script=script, timeout=30, skip_codeql=True, cache=cache,
+                                syntax_gate=False)
+        saved, run_codeql.CODEQL_BIN = run_codeql.CODEQL_BIN, codeql
+        try:
+            with CodeQLBatcher(AnalysisPool(2, analyzer), 2, os.path.join(tmp, "batches"), cache=cache) as pool:
+                for name, code in PROGRAMS.items():
+                    pool.submit(("model", int(name.split("_")[1])), code)
+                results = dict(pool.completed())
+                results.update(pool.drain())
+        finally:
+            run_codeql.CODEQL_BIN = saved
+        assert len(results) == len(PROGRAMS)
+        for key, item in results.items():
+            assert item["findings"] == [] and not item["security_err"]
+            assert item["feedback"] == run_codeql.DUMMY_FEEDBACK
+            if key[1] != 3:
+                assert item["skipped"] == {"codeql": CODEQL_BATCH_FAILED}
+        # A temporary CodeQL failure must not be reused as a clean result; a program
+        # that does not build gets the same results on every run, so it is cached
+        assert results[("model", 3)]["skipped"] == {"klee": "no bitcode"}
+        assert [key[1] for key, item in results.items() if cache.get(item["analysis_key"]) is not None] == [3]
+
+
+# Stand-in for clang -save-temps=obj: logs its arguments, writes the object and the bitcode
+FAKE_CLANG = r"""#!/bin/bash
+echo "$@" >> "$COMPILE_LOG"
+touch clean_code.o clean_code.bc
+"""
+
+
+@with_fake_codeql
+def test_item_is_compiled_once(tmp):
+    clang = os.path.join(tmp, "clang")
+    with open(clang, "w") as f:
+        f.write(FAKE_CLANG)
+    os.chmod(clang, 0o755)
+    source = os.path.join(tmp, "item")
+    os.makedirs(source)
+    with open(os.path.join(source, "clean_code.c"), "w") as f:
+        f.write(PROGRAMS["item_0"])
+    with open(os.path.join(source, "Makefile"), "w") as f:
+        f.write(run_codeql.item_makefile(clang))
+    os.environ["COMPILE_LOG"] = os.path.join(tmp, "compiles.log")
+    try:
+        with analysis_cc(clang):
+            findings = run_codeql.analyze_single(source, os.path.join(tmp, "db"), os.path.join(tmp, "results.sarif"))
+            # analyze_only.sh's bitcode step after CodeQL finds everything built
+            subprocess.run(["make", "-s", "-C", source], check=True, stdout=subprocess.DEVNULL)
+    finally:
+        del os.environ["COMPILE_LOG"]
+    assert findings == ["cpp/dangerous-function-overflow"]
+    with open(os.path.join(tmp, "compiles.log")) as f:
+        compiles = f.read().splitlines()
+    assert compiles == ["-g -c -save-temps=obj clean_code.c -o clean_code.o"]
+
+
+if __name__ == "__main__":
+    test_batch_splits_results_per_program()
+    test_batch_matches_single_runs()
+    test_batch_with_nothing_built()
+    test_batcher_fills_in_findings()
+    test_failed_batch_is_not_cached()
+    test_item_is_compiled_once()
+    print("✓ run_codeql tests passed")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Check the structure tracker behind the stop-after-main generation criterion."""
+
+from clean_code import clean_source
+from stopping import CStructureTracker
+
+RUN_LLM_PROMPT = "// Write a calculator in C\n#include <stdio.h>\n\nint main() {\n"
+
+
+def stop_point(text, prefix="", chunk=1):
+    """Text up to where the tracker reports the program complete, fed in chunks like a token stream."""
+    tracker = CStructureTracker()
+    tracker.feed(prefix)
+    for i in range(0, len(text), chunk):
+        if tracker.feed(text[i:i + chunk]):
+            # Stops mid-chunk, like a token that closes main and starts the prose
+            return text[:i + chunk]
+    return None
+
+
+def test_stops_when_main_closes():
+    body = "    int a = 1;\n    if (a) {\n        printf(\"%d\\n\", a);\n    }\n    return 0;\n}\n"
+    assert stop_point(body + "\nThis program prints 1.\n", RUN_LLM_PROMPT) == body[:-1]
+
+
+def test_braces_in_strings_and_comments_do_not_count():
+    body = ("    printf(\"}}\\\" {\");  // }\n"
+            "    /* } } */ char c = '}';\n"
+            "    char d = '\\'';\n"
+            "    return 0;\n}")
+    assert stop_point(body + "\nint x;\n", RUN_LLM_PROMPT) == body
+
+
+def test_waits_for_functions_declared_before_main():
+    code = ("Here's the code:\n```c\n#include <stdio.h>\n"
+            "int add(int a, int b);\n"
+            "typedef int (*op)(int, int);\n"
+            "int main(void)\n{\n    return add(1, 2);\n}\n"
+            "int add(int a, int b) {\n    return a + b;\n}")
+    assert stop_point(code + "\n```\nThe main() function calls add().\n") == code
+
+
+def test_prose_and_preprocessor_lines():
+    code = ("#define BLOCK(x) { x; }\n"
+            "The main() function {is} below, it's short.\n"
+            "int main() { BLOCK(return 0) }")
+    assert stop_point(code + "\nint main() {}") == code
+    # Without a main body there is nothing to stop at
+    assert stop_point("int helper(void) {\n    return 1;\n}\nThe main() function ...") is None
+
+
+def test_chunking_does_not_matter():
+    text = "    /* a */ /* b *//**/ return 0;\n}\n// done\n"
+    exact = stop_point(text, RUN_LLM_PROMPT)
+    assert exact == "    /* a */ /* b *//**/ return 0;\n}"
+    for chunk in (2, 3, 5, 8):
+        stopped = stop_point(text, RUN_LLM_PROMPT, chunk)
+        assert stopped.startswith(exact) and len(stopped) < len(exact) + chunk
+
+
+def test_stopped_completion_still_cleans():
+    body = "    int x = 2;\n    printf(\"%d\\n\", x * x);\n    return 0;\n}"
+    completion = stop_point(body + "\n\nExplanation: squares two.\n", RUN_LLM_PROMPT)
+    cleaned = clean_source(RUN_LLM_PROMPT + completion)
+    assert cleaned.count("int main") == 1 and cleaned.rstrip().endswith("}")
+
+
+if __name__ == "__main__":
+    test_stops_when_main_closes()
+    test_braces_in_strings_and_comments_do_not_count()
+    test_waits_for_functions_declared_before_main()
+    test_prose_and_preprocessor_lines()
+    test_chunking_does_not_matter()
+    test_stopped_completion_still_cleans()
+    print("✓ stopping tests passed")